@@ -1,12 +1,5 @@
-from argparse import ArgumentParser, RawDescriptionHelpFormatter
-from growbies.cli import device, project, read, session, tag, user
-from growbies.cli import cal
-from growbies.cli import thermal
-from growbies.cli import nvm
-from growbies.cli.common import CMD
-from growbies.service.common import ServiceOp
-import argcomplete
-from . import __doc__ as pkg_doc
+import os
+import sys
 
 """
 This command will evaluate the import time of the CLI tab completion, sorting by cumulative time
@@ -15,65 +8,48 @@ python -X importtime -m growbies 2>&1 \
     | awk -F'|' '{cum=$2; gsub(/ /,"",cum); print cum "|" $0}' \
     | sort -nr \
     | cut -d'|' -f2-
-    
-Note: imports can be triggered by what is received on the queue.    
+
+Note: imports can be triggered by what is received on the queue.
+
+See also tests/cli/test_startup.py for the import time budget.
 """
 
-parser = ArgumentParser(description=pkg_doc, formatter_class=RawDescriptionHelpFormatter)
-parsers = {CMD: parser}
-parser_adder = parser.add_subparsers(dest=CMD, required=True)
+# Execution exits on tab completion with the following lines. Completion is served from a cached
+# specification of the CLI, so that the CLI modules are not imported on every key press.
+if '_ARGCOMPLETE' in os.environ:
+    from growbies.cli.complete import autocomplete
+    autocomplete()
 
-for cmd in ServiceOp:
-    parsers[cmd] = parser_adder.add_parser(cmd, description=cmd.description, help=cmd.help,
-                                           formatter_class=RawDescriptionHelpFormatter)
+from growbies.cli.common import ClientOp, CMD
+from growbies.cli.main import make_cli, select_op
 
-cal.make_cli(parsers[ServiceOp.CAL])
-device.make_cli(parsers[ServiceOp.DEVICE])
-nvm.make_cli(parsers[ServiceOp.NVM])
-project.make_cli(parsers[ServiceOp.PROJECT])
-read.make_cli(parsers[ServiceOp.READ])
-session.make_cli(parsers[ServiceOp.SESSION])
-tag.make_cli(parsers[ServiceOp.TAG])
-thermal.make_cli(parsers[ServiceOp.THERMAL])
-user.make_cli(parsers[ServiceOp.USER])
+# Only the sub-parser of the operation being run is built.
+op = select_op(sys.argv[1:])
+ops = tuple() if op is None else (op,)
+parser, parsers = make_cli(ops=ops)
 
-# Execution exits on tab completion with the following line.
-argcomplete.autocomplete(parser)
+# Execution continues here on execution not invoked by tab.
+known, unknown = parser.parse_known_args(sys.argv[1:])
+kw = vars(known)
+cmd = kw.pop(CMD)
+
+if unknown:
+    parsers[cmd].error(f'Unknown arguments encountered "{unknown}"')
 
 # Delayed import for CLI responsiveness
 import logging
-import sys
 from .common.utils.privileges import drop_privileges
 
-from growbies.protocol.resp import DeviceError
-from growbies.service.common import (ServiceCmd, ServiceOp, ServiceCmdError, TBaseServiceCmd)
-from growbies.service.queue import IDQueue, ServiceQueue
+from growbies.cli.shell import Param as ShellParam
+from growbies.service.client import Client, Shell
+from growbies.service.common import ServiceCmd, ServiceOp
 
 drop_privileges()
 
 logger = logging.getLogger(__name__)
 
-# Execution continues here on execution not invoked by tab.
-known, unknown = parser.parse_known_args(sys.argv[1:])
-kw = vars(known)
-cmd = ServiceOp(kw.pop(CMD))
-
-if unknown:
-    parsers[cmd].error(f'Unknown arguments encountered "{unknown}"')
-
-def _run_cmd(cmd_: TBaseServiceCmd, timeout = cmd.timeout_s):
-    with ServiceQueue() as cmd_q, IDQueue() as resp_q:
-        cmd_.qid = resp_q.qid
-        cmd_q.put(cmd_)
-        try:
-            resp = next(resp_q.get_w_timeout(timeout=timeout))
-        except StopIteration:
-            resp = ServiceCmdError(f'Command {cmd_.op} timeout of {timeout} seconds.')
-    if isinstance(resp, (ServiceCmdError, DeviceError)):
-        sys.stderr.write(f'{resp}\n')
-        sys.stderr.flush()
-        sys.exit(getattr(resp, 'error', 1))
+with Client(parser, parsers, built_ops=ops) as client:
+    if cmd == ClientOp.SHELL:
+        sys.exit(Shell(client, line_protocol=kw[ShellParam.LINE_PROTOCOL]).run())
     else:
-        if resp is not None:
-            print(resp)
-_run_cmd(ServiceCmd(op=cmd, kw=kw))
+        sys.exit(client.exec_cmd(ServiceCmd(op=ServiceOp(cmd), kw=kw)))
@@ -1,5 +1,6 @@
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 from enum import StrEnum
+from growbies.app.common.render import add_render_args
 from growbies.cli.common import BaseParam, Param
 
 
@@ -94,9 +95,12 @@ def make_cli() -> ArgumentParser:
 
         p.add_argument(
             Param.FUZZY_ID,
-            help=Param.FUZZY_ID.help,
+            nargs='+',
+            help=f'{Param.FUZZY_ID.help} Any number of sessions may be plotted.',
         )
 
+        add_render_args(p)
+
     sample_parser = actions.add_parser(
         Action.SAMPLE,
         help=Action.SAMPLE.help,
@@ -7,8 +7,9 @@ import sys
 from matplotlib.dates import DateFormatter
 import matplotlib.pyplot as plt
 
-from growbies.db.models.datapoint import DataPoints
+from growbies.db.models.datapoint import DataPointColumns
 from .cli import Action, PlotAction
+from growbies.app.common.render import get_output, Output, render
 from growbies.cli.common import Param as CommonParam
 from growbies.db.engine import get_db_engine
 from growbies.db.models.session import Session
@@ -22,47 +23,40 @@ logger = logging.getLogger(__name__)
 def execute(args: Namespace):
     returncode = 0
 
-    fuzzy_id = getattr(args, CommonParam.FUZZY_ID)
+    fuzzy_ids = getattr(args, CommonParam.FUZZY_ID)
     plot_type = getattr(args, Action.PLOT)
+    output = get_output(args)
 
     if plot_type == PlotAction.MASS:
-        plot_mass_cal(fuzzy_id)
+        func = plot_mass_cal
     elif plot_type == PlotAction.TEMP:
-        plot_temp_cal(fuzzy_id)
+        func = plot_temp_cal
+    else:
+        raise ValueError(f'Invalid plot type: "{plot_type}"')
+
+    # Made ahead of the jobs, which share it.
+    get_db_engine()
+    render([(func, (fuzzy_id, output)) for fuzzy_id in fuzzy_ids], output)
 
     sys.exit(returncode)
 
 def plot_mass_vs_time(session: Session):
     engine = get_db_engine().session
-    tare_engine = get_db_engine().tare
-    datapoints = engine.get_datapoints(session.id)
+    columns = engine.get_datapoints_columnar(session.id)
 
-    if not datapoints:
+    if not len(columns):
         raise ServiceCmdError(f"No datapoints found for session {session.id}")
 
     # ---- Extract main mass ----
-    timestamps = list()
-    mass_values = list()
-    for dp in datapoints:
-        tare_val = tare_engine.get(dp.tare_id).values[1]
-        timestamps.append(dp.timestamp)
-        mass_values.append(dp.mass - tare_val)
+    timestamps = columns.timestamp
+    mass_values = columns.mass - columns.tare[:, 1]
 
     # ---- Extract per-sensor mass ----
-    max_sensors = len(datapoints[0].mass_sensors)
-
-    sensor_traces = [[] for _ in range(max_sensors)]
-
-    for dp in datapoints:
-        sensors_sorted = sorted(dp.mass_sensors, key=lambda s: s.idx)
-        for i in range(max_sensors):
-            if i < len(sensors_sorted):
-                sensor_traces[i].append(sensors_sorted[i].mass)
-            else:
-                sensor_traces[i].append(None)
+    max_sensors = columns.mass_sensor_count
+    sensor_traces = [columns.sensor_mass[:, i] for i in range(max_sensors)]
 
     # ---- Temperature ----
-    temperature_values = [dp.temperature for dp in datapoints]
+    temperature_values = columns.temperature
 
     # ---- Plot ----
     fig, ax_mass = plt.subplots()
@@ -225,20 +219,18 @@ def plot_mass_vs_temp(session: "Session"):
     plt.show()
 
 
-def plot_mass_cal(fuzzy_id: str):
+def plot_mass_cal(fuzzy_id: str, output: Output = Output()):
     session = get_db_engine().session.get(fuzzy_id)
     mad_k_val = 7
 
     engine = get_db_engine().session
-    datapoints = engine.get_datapoints(session.id)
+    columns = engine.get_datapoints_columnar(session.id)
 
-    if not datapoints:
+    if not len(columns):
         raise ServiceCmdError(f"No datapoints found for session {session.id}")
 
-    max_sensors = len(datapoints[0].mass_sensors)
-
-    for sensor_idx in range(max_sensors):
-        timestamps, masses, ref_masses, temps = _extract_from_datapoints(datapoints, sensor_idx)
+    for sensor_idx in range(columns.mass_sensor_count):
+        timestamps, masses, ref_masses, temps = _extract_from_columns(columns, sensor_idx)
 
         # --- Sort by reference mass (for plotting continuity only) ---
         sort_idx = np.argsort(ref_masses)
@@ -393,11 +385,12 @@ def plot_mass_cal(fuzzy_id: str):
         )
 
         fig.tight_layout()
-        plt.show()
+        output.show(fig, f'{session.name}_mass_sensor_{sensor_idx}')
 
-def _plot_temp_cal(session: "Session", datapoints: DataPoints, sensor_idx: Optional[int] = None):
+def _plot_temp_cal(session: "Session", columns: DataPointColumns,
+                   sensor_idx: Optional[int] = None, output: Output = Output()):
     filter_threshold_grams = 100
-    timestamps, masses, ref_masses, temps = _extract_from_datapoints(datapoints, sensor_idx)
+    timestamps, masses, ref_masses, temps = _extract_from_columns(columns, sensor_idx)
     #
     # outf = open('/home/meyer/tmp/data.csv', 'w')
     # outf.write(f'timestamp,temperature,ref_mass,mass,sensor_0_ref,sensor_0,sensor_1_ref,sensor_1,'
@@ -640,9 +633,10 @@ def _plot_temp_cal(session: "Session", datapoints: DataPoints, sensor_idx: Optio
     )
 
     fig.tight_layout()
-    plt.show()
+    output.show(fig, f'{session.name}_temp_' +
+                ('aggregate' if sensor_idx is None else f'sensor_{sensor_idx}'))
 
-def plot_temp_cal(fuzzy_id: str):
+def plot_temp_cal(fuzzy_id: str, output: Output = Output()):
     """
     Plots temperature correction for all sensors in the session.
 
@@ -656,38 +650,31 @@ def plot_temp_cal(fuzzy_id: str):
 
     engine = get_db_engine().session
     session = engine.get(fuzzy_id)
-    datapoints = engine.get_datapoints(session.id)
+    columns = engine.get_datapoints_columnar(session.id)
 
-    if not datapoints:
+    if not len(columns):
         raise ServiceCmdError(f"No datapoints found for session {session.id}")
 
-    max_sensors = len(datapoints[0].mass_sensors)
-
     # Passing None for the sensor index means "for the aggregate".
-    for sensor_idx in (None,) + tuple(range( max_sensors)):
-        _plot_temp_cal(session, datapoints, sensor_idx)
-
-def _extract_from_datapoints(datapoints, sensor_idx: Optional[int]):
-    timestamps, masses, ref_masses, temps = [], [], [], []
+    for sensor_idx in (None,) + tuple(range(columns.mass_sensor_count)):
+        _plot_temp_cal(session, columns, sensor_idx, output)
 
-    for dp in datapoints:
-        if sensor_idx is None:
-            if dp.ref_mass is not None:
-                timestamps.append(dp.timestamp)
-                masses.append(dp.mass)
-                ref_masses.append(dp.ref_mass)
-                temps.append(dp.temperature)
+def _extract_from_columns(columns: DataPointColumns, sensor_idx: Optional[int]):
+    """Return the timestamps, masses, reference masses and temperatures having a reference mass."""
+    if sensor_idx is None:
+        masses = columns.mass
+        ref_masses = columns.ref_mass
+        temps = columns.temperature
+    else:
+        masses = columns.sensor_mass[:, sensor_idx]  # ADC reading
+        ref_masses = columns.sensor_ref_mass[:, sensor_idx]  # grams
+        if columns.temperature_sensor_count > 1:
+            temps = columns.sensor_temperature[:, sensor_idx]
         else:
-            if dp.mass_sensors[sensor_idx].ref_mass is not None:
-                timestamps.append(dp.timestamp)
-                masses.append(dp.mass_sensors[sensor_idx].mass)  # ADC reading
-                ref_masses.append(dp.mass_sensors[sensor_idx].ref_mass)  # grams
-                if len(dp.temperature_sensors) > 1:
-                    temps.append(dp.temperature_sensors[sensor_idx].temperature)
-                else:
-                    temps.append(dp.temperature_sensors[0].temperature)
-
-    return np.array(timestamps), np.array(masses), np.array(ref_masses), np.array(temps)
+            temps = columns.sensor_temperature[:, 0]
+
+    mask = ~np.isnan(ref_masses)
+    return columns.timestamp[mask], masses[mask], ref_masses[mask], temps[mask]
 
 def _mad_filter(to_be_filtered, k=2.5):
     """
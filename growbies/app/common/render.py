@@ -0,0 +1,144 @@
+"""
+Rendering of figures to image files, without a display, such as for unattended reports. The
+figures are drawn with the non-interactive Agg backend, by a pool of processes, one per core.
+"""
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from enum import StrEnum
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import logging
+import multiprocessing
+import os
+import re
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from growbies.cli.common import BaseParam
+from growbies.service.common import ServiceCmdError
+
+logger = logging.getLogger(__name__)
+
+#: A function drawing figures to an :class:`Output`, and its arguments, which are to be picklable.
+Job_t = tuple[Callable, tuple]
+
+# Characters of names that are replaced in filenames.
+_UNSAFE_RE = re.compile(r'[^\w.-]+')
+
+class ImageFormat(StrEnum):
+    PNG = 'png'
+    SVG = 'svg'
+
+    @property
+    def description(self) -> str:
+        if self == self.PNG:
+            return 'A raster image.'
+        elif self == self.SVG:
+            return 'A vector image, which scales without loss.'
+        else:
+            raise ValueError(f'"{self} is not a valid element')
+
+class RenderParam(BaseParam):
+    OUT = 'out'
+    FORMAT = 'format'
+
+    @property
+    def description(self) -> str:
+        if self == self.OUT:
+            return ('Render the figures to image files in this directory, in parallel and without '
+                    'a display, rather than showing them.')
+        elif self == self.FORMAT:
+            return ('The format of the image files. ' +
+                    ' '.join(f'{format_}: {format_.description}' for format_ in ImageFormat))
+        else:
+            raise ValueError(f'"{self} is not a valid element')
+
+    @property
+    def help(self) -> str:
+        return self.description
+
+@dataclass(frozen=True)
+class Output:
+    """Where figures go: shown, or rendered to files if there is a directory."""
+    directory: Optional[Path] = None
+    format_: ImageFormat = ImageFormat.PNG
+
+    def show(self, fig: Figure, name: str):
+        """Show a figure, or render it to a file named for it and close it."""
+        if self.directory is None:
+            plt.show()
+            return
+        path = self.directory / f'{_UNSAFE_RE.sub("_", name)}.{self.format_}'
+        fig.savefig(path, format=self.format_)
+        plt.close(fig)
+        logger.info(f'Rendered "{path}".')
+
+def add_render_args(parser: ArgumentParser):
+    parser.add_argument(
+        f'--{RenderParam.OUT.kw_cli_name}',
+        default=None,
+        type=Path,
+        help=RenderParam.OUT.help,
+    )
+
+    parser.add_argument(
+        f'--{RenderParam.FORMAT.kw_cli_name}',
+        default=ImageFormat.PNG,
+        type=ImageFormat,
+        choices=list(ImageFormat),
+        help=RenderParam.FORMAT.help,
+    )
+
+def get_output(args: Namespace) -> Output:
+    return Output(getattr(args, RenderParam.OUT), getattr(args, RenderParam.FORMAT))
+
+def render(jobs: Sequence[Job_t], output: Output, processes: Optional[int] = None):
+    """
+    Run jobs drawing figures. With a display, they run one after another in this process. Else
+    they run in parallel in a pool of processes, by default one per core, and a job failing does
+    not stop the others.
+
+    :raises ServiceCmdError: If any job failed, after all have run.
+    """
+    if output.directory is None:
+        for func, args in jobs:
+            func(*args)
+        return
+
+    output.directory.mkdir(parents=True, exist_ok=True)
+    # Before any figure is made, so that no GUI toolkit is loaded.
+    matplotlib.use('Agg')
+    processes = min(len(jobs), processes or os.cpu_count() or 1)
+
+    failures = list()
+    if processes <= 1:
+        for func, args in jobs:
+            try:
+                func(*args)
+            except Exception as err:
+                failures.append(err)
+                logger.error(f'Unable to render: {err}')
+    else:
+        # Forked, so that the workers start with the imports and the state of this process,
+        # such as the Agg backend.
+        with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('fork'),
+                                 initializer=_init_worker) as executor:
+            futures = [executor.submit(func, *args) for func, args in jobs]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as err:
+                    failures.append(err)
+                    logger.error(f'Unable to render: {err}')
+
+    if failures:
+        raise ServiceCmdError(f'Unable to render {len(failures)} of {len(jobs)} jobs, the first '
+                              f'failing with: {failures[0]}')
+
+def _init_worker():
+    # Imported here, only the workers need it.
+    from growbies.db.engine import dispose_after_fork
+    dispose_after_fork()
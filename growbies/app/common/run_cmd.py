@@ -1,33 +1,108 @@
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from typing import Optional, Union
 import shlex, subprocess
 
+from growbies.constants import USERNAME
 from growbies.session import log
 
 logger = log.get_logger(__name__)
 
+_client = None
+
+def _get_client():
+    """Return the client shared by all commands of this process, connecting on first use."""
+    global _client
+    if _client is None:
+        # Delayed import, the client pulls in the whole CLI.
+        from growbies.service.client import Client
+        _client = Client()
+    return _client
+
+def run_client_cmd(cmd: Union[str, list[str]], check=False) -> subprocess.CompletedProcess:
+    """
+    Run a "growbies ..." command over this process's service connection rather than in a
+    subprocess. The result is as from :func:`subprocess.run` with text output.
+
+    raises:
+        :class:`subprocess.CalledProcessError`: If check is true and the return code is non-zero.
+    """
+    argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+    stdout, stderr = StringIO(), StringIO()
+    # Parse errors and help are written by argparse to the standard streams.
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        returncode = _get_client().exec_args(argv, stdout=stdout, stderr=stderr)
+    proc = subprocess.CompletedProcess(argv, returncode, stdout.getvalue(), stderr.getvalue())
+    if check:
+        proc.check_returncode()
+    return proc
+
+def run_client_batch(cmds: list[str], stop_on_error=False) -> list[subprocess.CompletedProcess]:
+    """
+    Run "growbies ..." commands in one submission to the service. The results are as from
+    :func:`run_client_cmd`, in order. With stop_on_error, the results end at the first failed
+    command.
+    """
+    client = _get_client()
+    argvs = [shlex.split(cmd) for cmd in cmds]
+    for cmd in cmds:
+        logger.log(log.STDIN_LEVEL, cmd)
+
+    # Commands that fail to parse are not submitted. Their results are as from the CLI.
+    procs: list[Optional[subprocess.CompletedProcess]] = list()
+    cmds_to_submit = list()
+    for argv in argvs:
+        stdout, stderr = StringIO(), StringIO()
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                cmds_to_submit.append(client.parse(argv))
+        except SystemExit as err:
+            procs.append(subprocess.CompletedProcess(argv, err.code or 0, stdout.getvalue(),
+                                                     stderr.getvalue()))
+            if stop_on_error:
+                break
+        else:
+            procs.append(None)
+
+    resps = iter(client.run_batch(cmds_to_submit, stop_on_error=stop_on_error)
+                 if cmds_to_submit else ())
+    results = list()
+    for argv, proc in zip(argvs, procs):
+        if proc is None:
+            resp = next(resps)
+            stdout, stderr = StringIO(), StringIO()
+            returncode = client.write_resp(resp, stdout=stdout, stderr=stderr)
+            proc = subprocess.CompletedProcess(argv, returncode, stdout.getvalue(),
+                                               stderr.getvalue())
+        _log_output(proc.stdout, proc.stderr)
+        results.append(proc)
+        if stop_on_error and proc.returncode:
+            break
+    return results
+
+def _log_output(stdout: Optional[str], stderr: Optional[str]):
+    if stdout:
+        for line in stdout.splitlines():
+            logger.log(log.STDOUT_LEVEL, line)
+    if stderr:
+        for line in stderr.splitlines():
+            logger.log(log.STDERR_LEVEL, line)
+
 def run_cmd(cmd, check=False) -> tuple[int, str, str]:
     for line in cmd.splitlines():
         logger.log(log.STDIN_LEVEL, line)
+    argv = shlex.split(cmd)
     try:
-        proc = subprocess.run(shlex.split(cmd), stdout=subprocess.PIPE,
-                              stderr=subprocess.PIPE, check=check, encoding='utf-8')
+        if argv and argv[0] == USERNAME:
+            proc = run_client_cmd(argv, check=check)
+        else:
+            proc = subprocess.run(argv, stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, check=check, encoding='utf-8')
     except (subprocess.CalledProcessError, FileNotFoundError) as err:
         logger.exception("Command failed")
-
-        if getattr(err, 'stdout', None):
-            for line in err.stdout.splitlines():
-                logger.log(log.STDOUT_LEVEL, line)
-
-        if getattr(err, 'stderr', None):
-            for line in err.stderr.splitlines():
-                logger.log(log.STDERR_LEVEL, line)
-
+        _log_output(getattr(err, 'stdout', None), getattr(err, 'stderr', None))
         if check:
             raise
     else:
-        if proc.stdout:
-            for line in proc.stdout.splitlines():
-                logger.log(log.STDOUT_LEVEL, line)
-        if proc.stderr:
-            for line in proc.stderr.splitlines():
-                logger.log(log.STDERR_LEVEL, line)
+        _log_output(proc.stdout, proc.stderr)
         return proc.returncode, proc.stdout, proc.stderr
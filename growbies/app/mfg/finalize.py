@@ -3,7 +3,7 @@ import sys
 import time
 
 from argparse import Namespace
-from growbies.app.common.run_cmd import run_cmd
+from growbies.app.common.run_cmd import run_client_batch, run_cmd
 from growbies.cli.common import Param
 from growbies.protocol.common import identify
 from growbies.db.engine import get_db_engine
@@ -66,24 +66,33 @@ class SetIdentification:
         return serial_number.replace(':', '')
 
 
+    def _serial_number_cmd(self) -> str:
+        return (f'growbies nvm id {self._fuzzy_id} '
+                f'--serial_number {self._format_serial_number(self._dev.serial)}')
+
+    def _manufacture_date_cmd(self) -> str:
+        return f'growbies nvm id {self._fuzzy_id} --manufacture_date {time.time()}'
+
+    def _default_cmds(self) -> list[str]:
+        return [f'growbies nvm id {self._fuzzy_id} --{key} {value}'
+                for key, value in self._defaults.items()]
+
+    def _run(self, cmds: list[str]):
+        for proc in run_client_batch(cmds):
+            self._returncode |= proc.returncode
+
     def serial_number(self):
-        rc, _, _ = run_cmd(f'growbies nvm id {self._fuzzy_id} '
-                           f'--serial_number {self._format_serial_number(self._dev.serial)}')
-        self._returncode |= rc
+        self._run([self._serial_number_cmd()])
 
     def manufacture_date(self):
-        rc, _, _ = run_cmd(f'growbies nvm id {self._fuzzy_id} --manufacture_date {time.time()}')
-        self._returncode |= rc
+        self._run([self._manufacture_date_cmd()])
 
     def set_defaults(self):
-        for key, value in self._defaults.items():
-            rc, _, _ = run_cmd(f'growbies nvm id {self._fuzzy_id} --{key} {value}')
-            self._returncode |= rc
+        self._run(self._default_cmds())
 
     def set_all(self):
-        self.serial_number()
-        self.manufacture_date()
-        self.set_defaults()
+        # One submission to the service for all fields.
+        self._run([self._serial_number_cmd(), self._manufacture_date_cmd(), *self._default_cmds()])
 
 def execute(args: Namespace):
     returncode = 0
@@ -1,9 +1,10 @@
 #!/usr/bin/python3
 
 import subprocess
-import shlex
 import sys
 
+from growbies.app.common.run_cmd import run_client_cmd
+
 def main():
     fuzzy_id = 'cbd'
 
@@ -51,13 +52,7 @@ def _parse_table(existing_table: str):
 def run(cmd: str) -> subprocess.CompletedProcess:
     print(f"\n$ {cmd}", flush=True)
 
-    proc = subprocess.run(
-        shlex.split(cmd),
-        encoding="utf-8",
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        check=True,
-    )
+    proc = run_client_cmd(cmd, check=True)
 
     if proc.stdout:
         print(proc.stdout, end="" if proc.stdout.endswith("\n") else "\n")
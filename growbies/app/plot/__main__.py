@@ -1,7 +1,9 @@
 import sys
 
 from .cli import make_cli, PlotParam, PlotType
+from growbies.app.common.render import get_output, render, RenderParam
 from growbies.cli.common import Param
+from growbies.db.engine import get_db_engine
 from growbies.session import log
 
 log.start()
@@ -13,12 +15,27 @@ def main(argv=None):
     parser = make_cli()
     args, forward_args = parser.parse_known_args(argv)
     plot_type = getattr(args, PlotParam.TYPE)
-    fuzzy_id = getattr(args, Param.FUZZY_ID)
+    fuzzy_ids = getattr(args, Param.FUZZY_ID)
     start_time = getattr(args, PlotParam.START_TIME)
     end_time = getattr(args, PlotParam.END_TIME)
+    method = getattr(args, PlotParam.DOWNSAMPLE)
+    max_points = getattr(args, PlotParam.MAX_POINTS)
+    cache = not getattr(args, PlotParam.NO_CACHE)
+    live = getattr(args, PlotParam.LIVE)
+    interval = getattr(args, PlotParam.INTERVAL)
+    output = get_output(args)
+
+    if live and output.directory is not None:
+        parser.error(f'--{PlotParam.LIVE.kw_cli_name} shows the plot, so is not with '
+                     f'--{RenderParam.OUT.kw_cli_name}.')
 
     if plot_type == PlotType.TIME:
-        time_series.plot_time_series(fuzzy_id, start_time, end_time)
+        # Made ahead of the jobs, which share it.
+        get_db_engine()
+        render([(time_series.plot_time_series,
+                 (fuzzy_id, start_time, end_time, method, max_points, cache, output, live,
+                  interval))
+                for fuzzy_id in fuzzy_ids], output)
     else:
         raise TypeError(f'Invalid plotting type: "{plot_type}"')
 
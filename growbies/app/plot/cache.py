@@ -0,0 +1,243 @@
+"""
+An on-disk cache of the series read for plotting, so that plotting a device again reads only what
+was recorded since.
+
+There is an entry per device and resolution, of the series from a start time up to the latest
+datapoint, or rollup bucket, read: the high-water mark. Plotting from at or after the start of an
+entry reads only what is past its high-water mark, and appends it. An entry is read anew if its
+range has since been rewritten, such as by an import or by retention, see
+:class:`growbies.db.models.rewrite.DataPointRewrite`. The least recently used entries are evicted
+beyond a total size.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import logging
+import os
+import zipfile
+
+import numpy as np
+from sqlalchemy.engine.row import Row
+
+from growbies.common.utils import timestamp
+from growbies.common.utils.types import DeviceID
+from growbies.constants import USERNAME
+from growbies.db.engine import DBEngine
+from growbies.db.models.rollup import Resolution
+
+logger = logging.getLogger(__name__)
+
+#: The most bytes of entries kept.
+CACHE_MAX_SIZE = 256 * 1024 * 1024
+
+#: Columns by name, such as "timestamp" and "mass". Timestamps are UTC, as datetime64[us].
+Columns_t = dict[str, np.ndarray]
+#: The datapoints, the mass sensor readings and the temperature sensor readings, as read by
+#: :meth:`growbies.db.models.datapoint.DataPointEngine.get_device_datapoints` or
+#: :meth:`growbies.db.models.rollup.RollupEngine.get_device_rollups`.
+Series_t = tuple[Columns_t, Columns_t, Columns_t]
+
+TIMESTAMP = 'timestamp'
+
+# Entries of other versions are read anew.
+_VERSION = 1
+_SERIES_NAMES = ('datapoint', 'mass_sensor', 'temperature_sensor')
+_INTEGER_COLUMNS = ('idx', 'count')
+# The units of datetime64 that the timestamps of each resolution are truncated to.
+_RESOLUTION_UNITS = {
+    Resolution.MINUTE: 'm',
+    Resolution.HOUR: 'h',
+    Resolution.DAY: 'D',
+}
+
+def get_cache_dir() -> Path:
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return Path(cache_dir, USERNAME, 'plot')
+
+def read_series(engine: DBEngine, device_id: DeviceID, resolution: Optional[Resolution],
+                start_time: datetime, end_time: datetime) -> Series_t:
+    """Read the series of a device from the database, from the rollups unless the resolution is
+    None."""
+    if resolution is None:
+        rows = engine.datapoint.get_device_datapoints(device_id, start_time, end_time)
+    else:
+        rows = engine.rollup.get_device_rollups(device_id, resolution, start_time, end_time)
+    return tuple(to_columns(series_rows) for series_rows in rows)
+
+def to_columns(rows: Sequence[Row]) -> Columns_t:
+    """Return rows as columns. Empty, without any columns, if there are no rows."""
+    if not rows:
+        return dict()
+    columns = dict()
+    for idx, key in enumerate(rows[0]._fields):
+        if key == TIMESTAMP:
+            columns[key] = np.array([_to_naive_utc(row[idx]) for row in rows],
+                                    dtype='datetime64[us]')
+        elif key in _INTEGER_COLUMNS:
+            columns[key] = np.array([row[idx] for row in rows], dtype=np.int64)
+        else:
+            # NULL is NaN.
+            columns[key] = np.array([row[idx] for row in rows], dtype=float)
+    return columns
+
+@dataclass
+class _Entry:
+    start: np.datetime64
+    rewrite_id: int
+    series: Series_t
+
+    @property
+    def high_water_mark(self) -> Optional[np.datetime64]:
+        datapoints = self.series[0]
+        return datapoints[TIMESTAMP][-1] if datapoints else None
+
+class PlotCache:
+    def __init__(self, engine: DBEngine, directory: Optional[Path] = None,
+                 max_size: int = CACHE_MAX_SIZE):
+        self._engine = engine
+        self._directory = get_cache_dir() if directory is None else Path(directory)
+        self._max_size = max_size
+
+    def get(self, device_id: DeviceID, resolution: Optional[Resolution], start_time: datetime,
+            end_time: datetime) -> Series_t:
+        """As :func:`read_series`, reading only what is not cached."""
+        start = _floor(start_time, resolution)
+        end = np.datetime64(_to_naive_utc(end_time), 'us')
+        path = self._directory / f'{device_id}.{resolution or "full"}.npz'
+
+        entry = self._read(path)
+        if entry is not None and entry.start <= start and entry.high_water_mark is not None:
+            rewrite_id, rewritten = self._engine.rewrite.get_rewritten(
+                device_id, _to_datetime(entry.start), _to_datetime(entry.high_water_mark),
+                entry.rewrite_id)
+            if rewritten:
+                entry = None
+        else:
+            entry = None
+
+        if entry is None:
+            # The last rewrite is noted before reading, so that any during are found next time.
+            rewrite_id, _ = self._engine.rewrite.get_rewritten(device_id, start_time, end_time)
+            series = read_series(self._engine, device_id, resolution, start_time, end_time)
+            series = tuple(_select(columns, lambda times: times >= start) for columns in series)
+            entry_start = start
+            changed = True
+        else:
+            if resolution is None:
+                read_start = entry.high_water_mark + np.timedelta64(1, 'us')
+            else:
+                # The bucket of the high-water mark may have had more datapoints rolled up since,
+                # so is read again.
+                read_start = entry.high_water_mark
+            series = tuple(_select(columns, lambda times: times < read_start)
+                           for columns in entry.series)
+            if read_start <= end:
+                series = tuple(map(_concat, series, read_series(
+                    self._engine, device_id, resolution, _to_datetime(read_start), end_time)))
+            # The entry keeps its start, so that plotting from later does not drop what is cached
+            # before.
+            entry_start = entry.start
+            changed = (entry.rewrite_id != rewrite_id
+                       or any(_len(columns) != _len(entry_columns) for columns, entry_columns
+                              in zip(series, entry.series)))
+
+        if changed:
+            self._write(path, _Entry(entry_start, rewrite_id, series))
+        else:
+            self._touch(path)
+        return tuple(_select(columns, lambda times: (times >= start) & (times <= end))
+                     for columns in series)
+
+    def _read(self, path: Path) -> Optional[_Entry]:
+        try:
+            with np.load(path) as file:
+                if int(file['version']) != _VERSION:
+                    return None
+                series = tuple(dict() for _ in _SERIES_NAMES)
+                for key in file.files:
+                    name, _, column = key.partition('.')
+                    if column:
+                        series[_SERIES_NAMES.index(name)][column] = file[key]
+                entry = _Entry(file['start'][()], int(file['rewrite_id']), series)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as err:
+            logger.warning(f'Unable to read the plot cache entry "{path}": {err}')
+            return None
+        return entry
+
+    def _write(self, path: Path, entry: _Entry):
+        arrays = {'version': np.array(_VERSION), 'start': np.array(entry.start),
+                  'rewrite_id': np.array(entry.rewrite_id)}
+        for name, columns in zip(_SERIES_NAMES, entry.series):
+            arrays.update({f'{name}.{column}': values for column, values in columns.items()})
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as file:
+                np.savez(file, **arrays)
+            # Atomic, readers never see a partial file.
+            os.replace(tmp_path, path)
+        except OSError as err:
+            logger.warning(f'Unable to write the plot cache entry "{path}": {err}')
+            return
+        self._evict()
+
+    @staticmethod
+    def _touch(path: Path):
+        # The modification time of an entry is when it was last used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Remove the least recently used entries beyond the maximum total size."""
+        entries = list()
+        for path in self._directory.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries, key=lambda entry: entry[0]):
+            if size <= self._max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            logger.debug(f'Evicted the plot cache entry "{path}".')
+
+def _concat(columns: Columns_t, other: Columns_t) -> Columns_t:
+    if not columns:
+        return other
+    if not other:
+        return columns
+    return {key: np.concatenate((values, other[key])) for key, values in columns.items()}
+
+def _len(columns: Columns_t) -> int:
+    return len(columns[TIMESTAMP]) if columns else 0
+
+def _select(columns: Columns_t, condition: Callable[[np.ndarray], np.ndarray]) -> Columns_t:
+    """Return the rows whose timestamps meet a condition."""
+    if not columns:
+        return dict()
+    selected = condition(columns[TIMESTAMP])
+    if not selected.any():
+        return dict()
+    return {key: values[selected] for key, values in columns.items()}
+
+def _floor(dt: datetime, resolution: Optional[Resolution]) -> np.datetime64:
+    """Return a timestamp as datetime64[us], truncated to the buckets of a resolution."""
+    value = np.datetime64(_to_naive_utc(dt), 'us')
+    if resolution is not None:
+        value = value.astype(f'datetime64[{_RESOLUTION_UNITS[resolution]}]').astype(value.dtype)
+    return value
+
+def _to_naive_utc(dt: datetime) -> datetime:
+    return timestamp.get_utc_dt(dt).replace(tzinfo=None)
+
+def _to_datetime(value: np.datetime64) -> datetime:
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(
+        microseconds=int(value.astype('datetime64[us]').astype(np.int64)))
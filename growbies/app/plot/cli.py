@@ -1,6 +1,9 @@
 from argparse import ArgumentParser
 from enum import StrEnum
 
+from .downsample import Method
+from .live import LIVE_INTERVAL_SEC
+from growbies.app.common.render import add_render_args
 from growbies.cli.common import BaseParam, Param
 from growbies.common.utils import timestamp
 
@@ -8,6 +11,11 @@ class PlotParam(BaseParam):
     TYPE = 'type'
     START_TIME = 'start_time'
     END_TIME = 'end_time'
+    DOWNSAMPLE = 'downsample'
+    MAX_POINTS = 'max_points'
+    NO_CACHE = 'no_cache'
+    LIVE = 'live'
+    INTERVAL = 'interval'
 
     @property
     def description(self) -> str:
@@ -17,6 +25,21 @@ class PlotParam(BaseParam):
             return 'The start of the time series to plot. '
         elif self == self.END_TIME:
             return f'The end of hte time series to plot.'
+        elif self == self.DOWNSAMPLE:
+            return ('How each series is downsampled for drawing. ' +
+                    ' '.join(f'{method}: {method.description}' for method in Method))
+        elif self == self.MAX_POINTS:
+            return ('The most points drawn per series. By default, this is set by the width of '
+                    'the plot in pixels.')
+        elif self == self.NO_CACHE:
+            return ('Read everything from the database, rather than only what is newer than the '
+                    'plot cache, and leave the cache as is.')
+        elif self == self.LIVE:
+            return ('Keep polling for datapoints recorded since, and append them to the plot. It '
+                    'keeps a sliding window of the span of the time range, so a short range, such '
+                    'as "-10 minutes", suits watching a calibration or thermal run.')
+        elif self == self.INTERVAL:
+            return f'The seconds between polls of a live plot. Default: {LIVE_INTERVAL_SEC}.'
         else:
             raise ValueError(f'"{self} is not a valid element')
 
@@ -46,7 +69,8 @@ def make_cli() -> ArgumentParser:
 
     parser.add_argument(
         Param.FUZZY_ID,
-        help=Param.FUZZY_ID.help,
+        nargs="+",
+        help=f"{Param.FUZZY_ID.help} Any number of devices may be plotted.",
     )
 
     parser.add_argument(
@@ -71,4 +95,42 @@ def make_cli() -> ArgumentParser:
         ),
     )
 
+    parser.add_argument(
+        f"--{PlotParam.DOWNSAMPLE.kw_cli_name}",
+        default=Method.LTTB,
+        type=Method,
+        choices=list(Method),
+        help=PlotParam.DOWNSAMPLE.help,
+    )
+
+    parser.add_argument(
+        f"--{PlotParam.MAX_POINTS.kw_cli_name}",
+        default=None,
+        type=int,
+        help=PlotParam.MAX_POINTS.help,
+    )
+
+    parser.add_argument(
+        f"--{PlotParam.NO_CACHE.kw_cli_name}",
+        default=False,
+        action="store_true",
+        help=PlotParam.NO_CACHE.help,
+    )
+
+    parser.add_argument(
+        f"--{PlotParam.LIVE.kw_cli_name}",
+        default=False,
+        action="store_true",
+        help=PlotParam.LIVE.help,
+    )
+
+    parser.add_argument(
+        f"--{PlotParam.INTERVAL.kw_cli_name}",
+        default=LIVE_INTERVAL_SEC,
+        type=float,
+        help=PlotParam.INTERVAL.help,
+    )
+
+    add_render_args(parser)
+
     return parser
\ No newline at end of file
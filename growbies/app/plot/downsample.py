@@ -0,0 +1,108 @@
+"""
+Downsampling of time series for plotting. A line is drawn at most a few points per pixel, so
+plotting more points takes longer without looking different.
+
+The functions return the indices of the points to keep, such that the timestamps and the values
+of a series are indexed alike. Non-finite values are not kept.
+"""
+from enum import StrEnum
+
+import numpy as np
+
+class Method(StrEnum):
+    LTTB = 'lttb'
+    MIN_MAX = 'min-max'
+    NONE = 'none'
+
+    @property
+    def description(self) -> str:
+        if self == self.LTTB:
+            return ('Largest-Triangle-Three-Buckets, keeping the points that best preserve the '
+                    'shape of the line.')
+        elif self == self.MIN_MAX:
+            return 'Keep the minimum and maximum of each bucket, preserving the envelope and spikes.'
+        elif self == self.NONE:
+            return 'Read and draw every datapoint, at full resolution.'
+        else:
+            raise ValueError(f'"{self} is not a valid element')
+
+    def points_per_pixel(self) -> int:
+        """The default number of points kept per horizontal pixel of an axis."""
+        if self == self.MIN_MAX:
+            return 2
+        return 1
+
+def downsample(method: Method, x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Return the indices of at most max_points points of a series, by the given method."""
+    finite = np.flatnonzero(np.isfinite(y))
+    if method == Method.NONE or len(finite) <= max_points:
+        return finite
+    if method == Method.LTTB:
+        return finite[lttb(x[finite], y[finite], max_points)]
+    elif method == Method.MIN_MAX:
+        return finite[min_max(y[finite], max_points)]
+    else:
+        raise ValueError(f'Invalid downsampling method: "{method}"')
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Return the indices of the points kept by Largest-Triangle-Three-Buckets. The first and last
+    points are kept, and from each bucket between, the point forming the largest triangle with the
+    point kept from the previous bucket and the mean of the next bucket.
+
+    :param x: Ascending. Datetimes are supported.
+    :param y: Finite.
+    """
+    count = len(y)
+    if max_points >= count:
+        return np.arange(count)
+    elif max_points < 3:
+        return np.array([0, count - 1][:max_points], dtype=int)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    # The bucket edges, excluding the first and the last points.
+    edges = np.linspace(1, count - 1, max_points - 1).astype(int)
+
+    kept = np.empty(max_points, dtype=int)
+    kept[0] = 0
+    kept[-1] = count - 1
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = count - 1, count
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        prev_x, prev_y = x[kept[bucket]], y[kept[bucket]]
+        areas = np.abs((prev_x - next_x) * (y[start:end] - prev_y)
+                       - (prev_x - x[start:end]) * (next_y - prev_y))
+        kept[bucket + 1] = start + int(np.argmax(areas))
+    return kept
+
+def min_max(y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Return the indices of the minimum and the maximum of each of max_points / 2 buckets, in order.
+
+    :param y: Finite.
+    """
+    count = len(y)
+    buckets = max(max_points // 2, 1)
+    if count <= max_points:
+        return np.arange(count)
+
+    edges = np.linspace(0, count, buckets + 1).astype(int)
+    kept = list()
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start == end:
+            continue
+        segment = y[start:end]
+        kept.extend(sorted({start + int(np.argmin(segment)), start + int(np.argmax(segment))}))
+    return np.array(kept, dtype=int)
+
+def _as_float(x: np.ndarray) -> np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ms]').astype(float)
+    return np.asarray(x, dtype=float)
@@ -0,0 +1,78 @@
+"""
+Buffers of live plots, which are appended to as datapoints are recorded and keep a sliding window
+of the latest, see :func:`growbies.app.plot.time_series.plot_time_series`.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from .cache import Series_t
+
+#: The most points kept per series of a live plot.
+LIVE_CAPACITY = 10_000
+
+#: The seconds between polls for new datapoints.
+LIVE_INTERVAL_SEC = 1.0
+
+@dataclass
+class LiveSource:
+    """Where a live plot polls for datapoints, and how many it keeps."""
+    # Read the series recorded after a timestamp.
+    poll: Callable[[np.datetime64], Series_t]
+    # The timestamp to first poll after, that of the latest datapoint plotted.
+    after: np.datetime64
+    # The span of the sliding window, back from the latest datapoint.
+    window: np.timedelta64
+    interval: float = LIVE_INTERVAL_SEC
+    capacity: int = LIVE_CAPACITY
+
+class LiveBuffer:
+    """
+    The timestamps and values of a series over a sliding window, in arrays allocated up front at
+    twice the capacity. Points are appended past the end of the window, and only when the arrays
+    are full is the window moved back to their start, so that each point is copied about once.
+    """
+    def __init__(self, capacity: int = LIVE_CAPACITY, times: np.ndarray = None,
+                 values: np.ndarray = None):
+        self.capacity = capacity
+        self._times = np.empty(2 * capacity, dtype='datetime64[us]')
+        self._values = np.empty(2 * capacity, dtype=float)
+        self._start = 0
+        self._end = 0
+        if times is not None:
+            self.append(times, values)
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def times(self) -> np.ndarray:
+        """A view of the timestamps of the window, valid until the next append."""
+        return self._times[self._start:self._end]
+
+    @property
+    def values(self) -> np.ndarray:
+        """A view of the values of the window, valid until the next append."""
+        return self._values[self._start:self._end]
+
+    def append(self, times: np.ndarray, values: np.ndarray):
+        """Append points, later than those in the window. The earliest are dropped beyond the
+        capacity."""
+        times = times[-self.capacity:]
+        values = values[-self.capacity:]
+        count = len(times)
+        if self._end + count > len(self._times):
+            # Move what is kept of the window back to the start.
+            kept = min(len(self), self.capacity - count)
+            self._times[:kept] = self._times[self._end - kept:self._end]
+            self._values[:kept] = self._values[self._end - kept:self._end]
+            self._start, self._end = 0, kept
+        self._times[self._end:self._end + count] = times
+        self._values[self._end:self._end + count] = values
+        self._end += count
+        self._start = max(self._start, self._end - self.capacity)
+
+    def trim(self, start: np.datetime64):
+        """Drop the points before a time."""
+        self._start += int(np.searchsorted(self.times, start, side='left'))
@@ -1,62 +1,97 @@
 from datetime import datetime, timezone
 from collections import defaultdict
+from typing import Optional
 
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.dates import DateFormatter, AutoDateLocator, num2date
-from sqlalchemy.engine.row import Row
 
+from .cache import Columns_t, PlotCache, read_series, TIMESTAMP
+from .downsample import downsample, Method
+from .live import LIVE_INTERVAL_SEC, LiveBuffer, LiveSource
+from growbies.app.common.render import Output
 from growbies.db.engine import get_db_engine
+from growbies.db.models.rollup import MIN_POINTS, Resolution
 from growbies.common.utils.timestamp import get_elapsed_str
 
 
-def plot_time_series(fuzzy_id: str, start_time: datetime, end_time: datetime):
+def plot_time_series(fuzzy_id: str, start_time: datetime, end_time: datetime,
+                     method: Method = Method.LTTB, max_points: Optional[int] = None,
+                     cache: bool = True, output: Output = Output(), live: bool = False,
+                     interval: float = LIVE_INTERVAL_SEC):
+    """
+    :param method: How each series is downsampled for drawing. With :attr:`Method.NONE`, every
+        datapoint is read and drawn, at full resolution.
+    :param max_points: The most points drawn per series. By default, this is set by the width of
+        the plot in pixels, such that the time to draw does not depend on the amount of data.
+    :param cache: Whether to read through the plot cache, see :mod:`growbies.app.plot.cache`.
+    :param output: Where the figure goes, shown by default.
+    :param live: Whether to poll for datapoints recorded since, every interval seconds, and append
+        them. The plot keeps a sliding window, of the span of the time range, of at most
+        :data:`growbies.app.plot.live.LIVE_CAPACITY` points per series.
+    """
     db_engine = get_db_engine()
     device = db_engine.device.get(fuzzy_id)
     device_id = device.id
 
 
-    datapoints, mass_sensor_datapoints, temp_sensor_datapoints = \
-        db_engine.datapoint.get_device_datapoints(
-            device_id,
-            start_time,
-            end_time,
-        )
+    # Long time ranges are read from the coarsest rollup that still has enough points.
+    if method == Method.NONE:
+        resolution = None
+    else:
+        resolution = Resolution.select(start_time, end_time, max(max_points or 0, MIN_POINTS))
+        # Ranges without rollups, such as of datapoints not yet rolled up, are read at full
+        # resolution, see :meth:`growbies.db.models.rollup.RollupEngine.catch_up`.
+        if resolution is not None and not db_engine.rollup.has_rollups(
+                device_id, resolution, start_time, end_time):
+            resolution = None
+    if cache:
+        series = PlotCache(db_engine).get(device_id, resolution, start_time, end_time)
+    else:
+        series = read_series(db_engine, device_id, resolution, start_time, end_time)
+
+    live_source = None
+    if live:
+        def poll(after: np.datetime64):
+            return read_series(db_engine, device_id, None,
+                               (after + np.timedelta64(1, "us")).item().replace(
+                                   tzinfo=timezone.utc),
+                               datetime.now(timezone.utc))
+
+        # Polled from the latest datapoint, or from the end of the latest rollup bucket.
+        after = np.datetime64(end_time.astimezone(timezone.utc).replace(tzinfo=None), "us")
+        if resolution is None and series[0]:
+            after = series[0][TIMESTAMP][-1]
+        live_source = LiveSource(poll, after, np.timedelta64(end_time - start_time), interval)
 
     _plot_time_series(
-        datapoints,
-        mass_sensor_datapoints,
-        temp_sensor_datapoints,
+        *series,
         device.name,
-        device.serial
+        device.serial,
+        method,
+        max_points,
+        output,
+        live_source,
     )
 
 
 def _plot_time_series(
-        datapoints: list[Row],
-        mass_sensor_datapoints: list[Row],
-        temp_sensor_datapoints: list[Row],
+        datapoints: Columns_t,
+        mass_sensor_datapoints: Columns_t,
+        temp_sensor_datapoints: Columns_t,
         device_name: str,
         device_serial: str,
+        method: Method = Method.LTTB,
+        max_points: Optional[int] = None,
+        output: Output = Output(),
+        live: Optional[LiveSource] = None,
 ):
 
-    timestamps = np.fromiter(
-        (dp.timestamp for dp in datapoints),
-        dtype="datetime64[ms]",
-        count=len(datapoints),
-    )
+    timestamps = datapoints.get(TIMESTAMP, np.empty(0, dtype="datetime64[us]"))
 
-    mass = np.fromiter(
-        (dp.mass for dp in datapoints),
-        dtype=float,
-        count=len(datapoints),
-    )
+    mass = datapoints.get("mass", np.empty(0))
 
-    temperature = np.fromiter(
-        (dp.temperature for dp in datapoints),
-        dtype=float,
-        count=len(datapoints),
-    )
+    temperature = datapoints.get("temperature", np.empty(0))
 
     fig, (
         (ax_mass, ax_sensor_mass),
@@ -82,7 +117,7 @@ def _plot_time_series(
     # Aggregate plots
     # -------------------------
 
-    ax_mass.plot(
+    mass_line, = ax_mass.plot(
         timestamps,
         mass,
         color="blue",
@@ -92,7 +127,7 @@ def _plot_time_series(
     ax_mass.set_title("Aggregate Mass")
 
 
-    ax_temp.plot(
+    temp_line, = ax_temp.plot(
         timestamps,
         temperature,
         color="red",
@@ -115,36 +150,17 @@ def _plot_time_series(
     sensor_mass_arrays = {}
     sensor_temp_arrays = {}
 
-    sensor_mass_lists = defaultdict(lambda: ([], []))
-    sensor_temp_lists = defaultdict(lambda: ([], []))
+    sensor_mass_lines = {}
+    sensor_temp_lines = {}
 
-    for row in mass_sensor_datapoints:
-        sensor_mass_lists[row.idx][0].append(row.timestamp)
-        sensor_mass_lists[row.idx][1].append(row.mass)
-
-    for row in temp_sensor_datapoints:
-        sensor_temp_lists[row.idx][0].append(row.timestamp)
-        sensor_temp_lists[row.idx][1].append(row.temperature)
-
-
-    for idx, (times, values) in sensor_mass_lists.items():
-
-        times = np.asarray(
-            times,
-            dtype="datetime64[ms]",
-        )
-
-        values = np.asarray(
-            values,
-            dtype=float,
-        )
+    for idx, (times, values) in _split_sensors(mass_sensor_datapoints, "mass").items():
 
         sensor_mass_arrays[idx] = (
             times,
             values,
         )
 
-        ax_sensor_mass.plot(
+        sensor_mass_lines[idx], = ax_sensor_mass.plot(
             times,
             values,
             color=sensor_colors[idx % len(sensor_colors)],
@@ -152,24 +168,14 @@ def _plot_time_series(
         )
 
 
-    for idx, (times, values) in sensor_temp_lists.items():
-
-        times = np.asarray(
-            times,
-            dtype="datetime64[ms]",
-        )
-
-        values = np.asarray(
-            values,
-            dtype=float,
-        )
+    for idx, (times, values) in _split_sensors(temp_sensor_datapoints, "temperature").items():
 
         sensor_temp_arrays[idx] = (
             times,
             values,
         )
 
-        ax_sensor_temp.plot(
+        sensor_temp_lines[idx], = ax_sensor_temp.plot(
             times,
             values,
             color=sensor_colors[idx % len(sensor_colors)],
@@ -217,12 +223,13 @@ def _plot_time_series(
     plot_series = []
 
 
-    def add_series(name, axis, times, values):
+    def add_series(name, axis, line, times, values):
 
         plot_series.append(
             (
                 name,
                 axis,
+                line,
                 times,
                 values,
             )
@@ -232,6 +239,7 @@ def _plot_time_series(
     add_series(
         "Aggregate Mass",
         ax_mass,
+        mass_line,
         timestamps,
         mass,
     )
@@ -239,6 +247,7 @@ def _plot_time_series(
     add_series(
         "Aggregate Temperature",
         ax_temp,
+        temp_line,
         timestamps,
         temperature,
     )
@@ -248,6 +257,7 @@ def _plot_time_series(
         add_series(
             f"Mass Sensor {idx}",
             ax_sensor_mass,
+            sensor_mass_lines[idx],
             times,
             values,
         )
@@ -257,6 +267,7 @@ def _plot_time_series(
         add_series(
             f"Temperature Sensor {idx}",
             ax_sensor_temp,
+            sensor_temp_lines[idx],
             times,
             values,
         )
@@ -333,6 +344,12 @@ def _plot_time_series(
         return start, end
 
 
+    def points_budget(ax):
+        if max_points is not None:
+            return max_points
+        return max(int(ax.get_window_extent().width) * method.points_per_pixel(), 1)
+
+
     busy = False
 
 
@@ -360,7 +377,7 @@ def _plot_time_series(
             axis_values = defaultdict(list)
 
 
-            for name, axis, times, values in plot_series:
+            for name, axis, line, times, values in plot_series:
                 start_idx = np.searchsorted(
                     times,
                     start,
@@ -374,9 +391,16 @@ def _plot_time_series(
                 )
 
                 if start_idx >= end_idx:
+                    line.set_data([], [])
                     continue
 
                 visible = values[start_idx:end_idx]
+
+                # Only the visible points are drawn, downsampled to the budget.
+                visible_times = times[start_idx:end_idx]
+                kept = downsample(method, visible_times, visible, points_budget(axis))
+                line.set_data(visible_times[kept], visible[kept])
+
                 finite = finite_values(visible)
                 if not len(finite):
                     continue
@@ -428,6 +452,111 @@ def _plot_time_series(
         lambda event: update_view(),
     )
 
+    # Also on the toolbar home, back and forward buttons, which change the limits without
+    # interacting with the plot. The visible points are drawn anew.
+    ax_mass.callbacks.connect(
+        "xlim_changed",
+        lambda ax: update_view(),
+    )
+
+
+    # -------------------------
+    # Live updates
+    # -------------------------
+
+    if live is not None:
+
+        latest = live.after
+
+        headroom = live.window / 10
+
+        # The series are kept in buffers, and drawn without redrawing the rest of the figure,
+        # unless new points are beyond the limits of their axes.
+        buffers = {}
+        buffer_axes = {}
+
+        for i, (name, axis, line, times, values) in enumerate(plot_series):
+            buffers[name] = LiveBuffer(live.capacity, times, values)
+            buffer_axes[name] = axis
+            plot_series[i] = (name, axis, line, buffers[name].times, buffers[name].values)
+            line.set_animated(True)
+
+        background = None
+
+
+        def draw_lines():
+            for _, axis, line, _, _ in plot_series:
+                axis.draw_artist(line)
+
+
+        def on_draw(event):
+            nonlocal background
+            background = fig.canvas.copy_from_bbox(fig.bbox)
+            draw_lines()
+
+
+        def split_polled(polled):
+            new_datapoints, new_mass_sensors, new_temp_sensors = polled
+            split = {}
+            if new_datapoints:
+                split["Aggregate Mass"] = (new_datapoints[TIMESTAMP], new_datapoints["mass"])
+                split["Aggregate Temperature"] = (new_datapoints[TIMESTAMP],
+                                                  new_datapoints["temperature"])
+            for idx, arrays in _split_sensors(new_mass_sensors, "mass").items():
+                split[f"Mass Sensor {idx}"] = arrays
+            for idx, arrays in _split_sensors(new_temp_sensors, "temperature").items():
+                split[f"Temperature Sensor {idx}"] = arrays
+            return split
+
+
+        def poll_update():
+
+            nonlocal latest
+
+            polled = live.poll(latest)
+            if not polled[0]:
+                return
+            latest = polled[0][TIMESTAMP][-1]
+
+            in_limits = True
+
+            # Sensors not in the plot from the start are not drawn.
+            for name, (times, values) in split_polled(polled).items():
+                if name not in buffers:
+                    continue
+                buffers[name].append(times, values)
+                finite = finite_values(values)
+                if len(finite):
+                    y_min, y_max = buffer_axes[name].get_ylim()
+                    in_limits = in_limits and y_min <= np.min(finite) and np.max(finite) <= y_max
+
+            for i, (name, axis, line, _, _) in enumerate(plot_series):
+                buffer = buffers[name]
+                buffer.trim(latest - live.window)
+                plot_series[i] = (name, axis, line, buffer.times, buffer.values)
+                line.set_data(buffer.times, buffer.values)
+
+            _, x_max = visible_range(ax_mass)
+
+            if latest > x_max:
+                # Slides the window, which draws anew.
+                ax_mass.set_xlim(latest - live.window, latest + headroom)
+            elif not in_limits or background is None:
+                update_view()
+            else:
+                fig.canvas.restore_region(background)
+                draw_lines()
+                fig.canvas.blit(fig.bbox)
+
+
+        fig.canvas.mpl_connect("draw_event", on_draw)
+
+        ax_mass.set_xlim(latest - live.window, latest + headroom)
+
+        timer = fig.canvas.new_timer(interval=int(live.interval * 1000))
+        timer.add_callback(poll_update)
+        timer.start()
+
 
     update_view()
 
@@ -443,4 +572,19 @@ def _plot_time_series(
         wspace=0.15,
     )
 
-    plt.show()
\ No newline at end of file
+    output.show(fig, device_name)
+
+
+def _split_sensors(sensor_datapoints: Columns_t,
+                   value: str) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """Return the timestamps and the values of each sensor, by index."""
+    if not sensor_datapoints:
+        return {}
+    indexes = sensor_datapoints["idx"]
+    return {
+        int(idx): (
+            sensor_datapoints[TIMESTAMP][indexes == idx],
+            sensor_datapoints[value][indexes == idx],
+        )
+        for idx in np.unique(indexes)
+    }
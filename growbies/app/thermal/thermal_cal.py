@@ -8,6 +8,8 @@ from pathlib import Path
 
 from prettytable import PrettyTable
 
+from growbies.app.common.run_cmd import run_client_cmd
+
 
 OUTPUT_FILE = Path("/tmp/thermal_cal.csv")
 COMMAND = ["growbies", "thermal", "thermal-chamber-1"]
@@ -184,12 +186,7 @@ def null_row(error):
 
 def run_command(stats):
     try:
-        result = subprocess.run(
-            COMMAND,
-            capture_output=True,
-            text=True,
-            check=True,
-        )
+        result = run_client_cmd(COMMAND, check=True)
 
         stats.samples += 1
 
@@ -18,6 +18,8 @@ class Account:
 class Database:
     """Database configuration."""
     address: str = ''
+    # Datapoints older than this many whole months are dropped. 0 keeps datapoints forever.
+    retention_months: int = 0
 
 @dataclass
 class Gateway:
@@ -37,6 +39,7 @@ class Cfg:
 
     class DatabaseSectionKey(StrEnum):
         ADDRESS = 'address'
+        RETENTION_MONTHS = 'retention_months'
 
     class GatewaySectionKey(StrEnum):
         NAME = 'name'
@@ -57,6 +60,9 @@ class Cfg:
                                         fallback=self.account.name)
             self.database.address = cfg.get(self.Section.DATABASE, self.DatabaseSectionKey.ADDRESS,
                                             fallback=self.database.address)
+            self.database.retention_months = cfg.getint(
+                self.Section.DATABASE, self.DatabaseSectionKey.RETENTION_MONTHS,
+                fallback=self.database.retention_months)
             self.gateway.name = cfg.get(self.Section.GATEWAY, self.GatewaySectionKey.NAME,
                                         fallback=self.gateway.name)
 
@@ -65,7 +71,9 @@ class Cfg:
         cfg = configparser.ConfigParser()
 
         cfg[self.Section.ACCOUNT] = {self.AccountSectionKey.NAME: self.account.name}
-        cfg[self.Section.DATABASE] = {self.DatabaseSectionKey.ADDRESS: self.database.address}
+        cfg[self.Section.DATABASE] = {
+            self.DatabaseSectionKey.ADDRESS: self.database.address,
+            self.DatabaseSectionKey.RETENTION_MONTHS: str(self.database.retention_months)}
         cfg[self.Section.GATEWAY] = {self.GatewaySectionKey.NAME: self.gateway.name}
 
         with open(self.PATH, 'w') as f:
@@ -75,7 +83,8 @@ class Cfg:
         parts = [f"# {APPNAME.capitalize()} configuration.\n",
                  f"[{self.Section.ACCOUNT}]\n{self.AccountSectionKey.NAME} = {self.account.name}\n",
                  f"[{self.Section.DATABASE}]\n{self.DatabaseSectionKey.ADDRESS} = "
-                 f"{self.database.address}\n",
+                 f"{self.database.address}\n{self.DatabaseSectionKey.RETENTION_MONTHS} = "
+                 f"{self.database.retention_months}\n",
                  f"[{self.Section.GATEWAY}]\n{self.GatewaySectionKey.NAME} = {self.gateway.name}\n"]
         return ''.join(parts)
 
@@ -1,8 +1,14 @@
+from argparse import ArgumentParser
 from enum import StrEnum
 
 CMD = 'cmd'
 SUBCMD = 'subcmd'
 
+#: The actions of exporting the datapoints of an entity to a file, and of importing them from one.
+#: These are run by the client, see :meth:`growbies.service.client.Client.exec_cmd`.
+EXPORT = 'export'
+IMPORT = 'import'
+
 class BaseParam(StrEnum):
     @property
     def kw_cli_name(self):
@@ -21,3 +27,80 @@ class Param(BaseParam):
             return 'The action to take.'
         else:
             return ''
+
+class ExportFormat(StrEnum):
+    ARROW = 'arrow'
+    PARQUET = 'parquet'
+
+    @property
+    def description(self) -> str:
+        if self == self.ARROW:
+            return 'Arrow IPC file, for memory mapping.'
+        elif self == self.PARQUET:
+            return 'Parquet file, compressed.'
+        else:
+            return ''
+
+    @property
+    def suffix(self) -> str:
+        return f'.{self}'
+
+class ExportParam(BaseParam):
+    OUT = 'out'
+    FORMAT = 'format'
+    START = 'start'
+    END = 'end'
+
+    @property
+    def help(self) -> str:
+        if self == self.OUT:
+            return ('The file to export to. By default, this is named after the entity, in the '
+                    'current directory.')
+        elif self == self.FORMAT:
+            return 'The file format. ' + ' '.join(f'{format_}: {format_.description}'
+                                                   for format_ in ExportFormat)
+        elif self == self.START:
+            return ("The start of the datapoints to export. Examples: '-7 days', "
+                    "'-1 hour 5 seconds'. Default: the first datapoint.")
+        elif self == self.END:
+            return ("The end of the datapoints to export. Examples: 'now', '-5 minutes'. "
+                    "Default: now.")
+        else:
+            return ''
+
+def add_export_args(parser: ArgumentParser, time_range: bool = False):
+    """Add the arguments of an :data:`EXPORT` action to its sub-parser."""
+    parser.add_argument(f'--{ExportParam.OUT}', default=None, help=ExportParam.OUT.help)
+    parser.add_argument(f'--{ExportParam.FORMAT}', default=ExportFormat.PARQUET, type=ExportFormat,
+                        choices=list(ExportFormat), help=ExportParam.FORMAT.help)
+    if time_range:
+        # Imported here, as only this action needs it.
+        from growbies.common.utils.timestamp import parse_relative_time
+        parser.add_argument(f'--{ExportParam.START}', default=None, type=parse_relative_time,
+                            help=ExportParam.START.help)
+        parser.add_argument(f'--{ExportParam.END}', default=None, type=parse_relative_time,
+                            help=ExportParam.END.help)
+
+class ClientOp(StrEnum):
+    """Operations that are handled by the client, as opposed to :class:`ServiceOp`."""
+    SHELL = 'shell'
+
+    @property
+    def help(self) -> str:
+        if self == self.SHELL:
+            return 'Run commands back to back over one service connection.'
+        else:
+            return ''
+
+    @property
+    def description(self) -> str:
+        desc = ''
+        if self == self.SHELL:
+            desc = ('Commands are entered without the leading "growbies", e.g. "device ls". '
+                    'When standard input is a terminal, an interactive prompt is shown. '
+                    'Otherwise, one command is read per line and the output of each command is '
+                    'terminated with a line made of the ASCII record separator character (0x1E) '
+                    'followed by the return code of the command.')
+        return (f'{self.help}\n'
+                f'\n'
+                f'{desc}')
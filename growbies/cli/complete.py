@@ -0,0 +1,203 @@
+"""
+Tab completion served from a cached specification of the command line interface.
+
+Building the full interface imports every CLI module, and through some of them, the device
+protocol. That is too slow to do on every key press, so the interface is walked once into a plain
+specification that is cached as JSON. The cache is rebuilt when the sources of the interface
+change.
+
+argcomplete completes from a parser made of the specification, which has the arguments of the
+interface and none of its imports.
+"""
+from typing import Callable, Optional, TextIO, TYPE_CHECKING
+import json
+import os
+
+from growbies.cli.common import Param
+from growbies.common.utils.report import short_uuid
+from growbies.constants import USERNAME
+from growbies.service.common import ServiceOp
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser
+
+__all__ = ['autocomplete', 'get_spec', 'make_parser', 'make_spec']
+
+SPEC_VERSION = 1
+SPEC_FILENAME = 'cli_spec.json'
+
+_PKG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The interface is built from these, see :func:`_get_sources_key`.
+_SPEC_SOURCES = (os.path.join(_PKG_DIR, 'cli'),
+                 os.path.join(_PKG_DIR, 'protocol', 'common'),
+                 os.path.join(_PKG_DIR, 'service', 'common.py'))
+
+# The entity of the fuzzy ID argument of each operation, completed from the ID index.
+_FUZZY_ID_ENTITIES = {
+    ServiceOp.DEVICE: ServiceOp.DEVICE,
+    ServiceOp.NVM: ServiceOp.DEVICE,
+    ServiceOp.PROJECT: ServiceOp.PROJECT,
+    ServiceOp.READ: ServiceOp.DEVICE,
+    ServiceOp.SESSION: ServiceOp.SESSION,
+    ServiceOp.TAG: ServiceOp.TAG,
+    ServiceOp.THERMAL: ServiceOp.DEVICE,
+    ServiceOp.USER: ServiceOp.USER,
+}
+# Options named after an entity, such as "session add --device", take IDs of the entity.
+_INDEXED_ENTITIES = frozenset(_FUZZY_ID_ENTITIES.values())
+
+def make_spec(parser: 'ArgumentParser') -> dict:
+    """
+    Walk a parser into a plain specification:
+
+    - options: Option string to a mapping with "nargs", "choices", "dest" and "help".
+    - positionals: A list of mappings with "nargs", "choices", "dest" and "help". Sub-parsers are
+      a positional with "cmds", a mapping of name to the specification of the sub-parser.
+    """
+    from argparse import SUPPRESS, _SubParsersAction
+
+    spec = {'options': dict(), 'positionals': list()}
+    for action in parser._actions:
+        help_ = '' if action.help in (None, SUPPRESS) else str(action.help)
+        item = {'nargs': action.nargs, 'dest': action.dest, 'help': help_,
+                'choices': None if action.choices is None else [str(c) for c in action.choices]}
+        if isinstance(action, _SubParsersAction):
+            helps = {choice.dest: choice.help or '' for choice in action._choices_actions}
+            item['choices'] = None
+            item['cmds'] = dict()
+            for name, sub_parser in action.choices.items():
+                item['cmds'][name] = make_spec(sub_parser)
+                item['cmds'][name]['help'] = helps.get(name, '')
+            spec['positionals'].append(item)
+        elif action.option_strings:
+            for option_string in action.option_strings:
+                spec['options'][option_string] = item
+        else:
+            spec['positionals'].append(item)
+    return spec
+
+def _get_spec_path() -> str:
+    cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_dir, USERNAME, SPEC_FILENAME)
+
+def _get_sources_key() -> int:
+    """Return the latest modification time of the sources of the interface."""
+    latest = 0
+    for path in _SPEC_SOURCES:
+        if os.path.isfile(path):
+            latest = max(latest, os.stat(path).st_mtime_ns)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [name for name in dirnames if name != '__pycache__']
+            for filename in filenames:
+                if filename.endswith('.py'):
+                    latest = max(latest, os.stat(os.path.join(dirpath, filename)).st_mtime_ns)
+    return latest
+
+def get_spec() -> dict:
+    """Return the specification of the interface, from the cache if it is fresh."""
+    path = _get_spec_path()
+    key = [SPEC_VERSION, _get_sources_key()]
+    try:
+        with open(path) as file:
+            cached = json.load(file)
+        if cached.get('key') == key:
+            return cached['spec']
+    except (OSError, ValueError):
+        pass
+
+    from growbies.cli.main import make_cli
+    parser, _ = make_cli()
+    spec = make_spec(parser)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'key': key, 'spec': spec}, file)
+        os.replace(tmp_path, path)
+    except OSError:
+        # A read only home directory is served, just not from the cache.
+        pass
+    return spec
+
+def _complete_id(entries: list[list[Optional[str]]], prefix: str) -> dict[str, str]:
+    """Complete the names of entities, and the short IDs of those matching by ID or unnamed."""
+    completions = dict()
+    for id_, name in entries:
+        short_id = short_uuid(id_)
+        if name == id_:
+            # Devices are named by their ID until renamed.
+            name = None
+        if name and name.startswith(prefix):
+            completions[name] = short_id
+        if (prefix or not name) and id_.startswith(prefix):
+            completions[id_ if len(prefix) >= len(short_id) else short_id] = name or ''
+    return completions
+
+def make_parser(spec: dict, read_id_index: Callable[[], dict] = dict,
+                _parser: Optional['ArgumentParser'] = None,
+                _op: Optional[str] = None) -> 'ArgumentParser':
+    """
+    Make a parser of a specification, for argcomplete to complete from. It has the arguments of the
+    interface, but none of their types or actions, so it is quick to make.
+
+    :param spec: As from :func:`make_spec`.
+    :param read_id_index: Return the entries of the ID index, see
+        :meth:`growbies.db.id_index.IdIndex.read`. Only called to complete fuzzy IDs.
+    """
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(add_help=False) if _parser is None else _parser
+
+    def id_completer(entity: str):
+        def complete_id(prefix: str, **_) -> dict[str, str]:
+            return _complete_id(read_id_index().get(entity, list()), prefix)
+        return complete_id
+
+    options = dict()
+    for option_string, option in spec['options'].items():
+        # Each option string of an option has a copy of its specification.
+        options.setdefault(json.dumps(option, sort_keys=True), list()).append(option_string)
+    for option_strings in options.values():
+        option = spec['options'][option_strings[0]]
+        if option['nargs'] == 0:
+            action = parser.add_argument(*option_strings, action='store_true', help=option['help'])
+        else:
+            action = parser.add_argument(*option_strings, nargs=option['nargs'],
+                                         choices=option['choices'], help=option['help'])
+            if option['dest'] in _INDEXED_ENTITIES:
+                action.completer = id_completer(option['dest'])
+
+    for positional in spec['positionals']:
+        if 'cmds' in positional:
+            sub = parser.add_subparsers(dest=positional['dest'])
+            for name, cmd in positional['cmds'].items():
+                make_parser(cmd, read_id_index, sub.add_parser(name, help=cmd['help'],
+                                                               add_help=False),
+                            name if _op is None else _op)
+            continue
+        action = parser.add_argument(positional['dest'], nargs=positional['nargs'],
+                                     choices=positional['choices'], help=positional['help'])
+        if positional['dest'] == Param.FUZZY_ID and _op in _FUZZY_ID_ENTITIES:
+            action.completer = id_completer(_FUZZY_ID_ENTITIES[_op])
+    return parser
+
+def _read_id_index() -> dict:
+    # Delayed import, only needed to complete fuzzy IDs.
+    from growbies.db.id_index import IdIndex
+    return IdIndex.read()
+
+def autocomplete(output_stream: Optional[TextIO] = None,
+                 exit_method: Callable[[int], None] = os._exit):
+    """
+    Write the completions of the command line in the environment and exit, see
+    :func:`argcomplete.autocomplete`. Returns without doing anything if not invoked for
+    completion.
+    """
+    if '_ARGCOMPLETE' not in os.environ:
+        return
+
+    import argcomplete
+    argcomplete.autocomplete(make_parser(get_spec(), read_id_index=_read_id_index),
+                             output_stream=output_stream, exit_method=exit_method)
@@ -1,14 +1,17 @@
 from argparse import ArgumentParser
 from enum import StrEnum
 
-from .common import Param
+from .common import add_export_args, EXPORT, IMPORT, Param
 
 class Action(StrEnum):
     ACTIVATE = 'activate'
     DEACTIVATE = 'deactivate'
+    EXPORT = EXPORT
+    IMPORT = IMPORT
     LS = 'ls'
     MOD = 'mod'
     READ = 'read'
+    RECOUNT = 'recount'
 
     @property
     def help(self) -> str:
@@ -17,12 +20,20 @@ class Action(StrEnum):
                     'time.')
         elif self == self.DEACTIVATE:
             return 'Deactivate a device. Update/set the end time.'
+        elif self == self.EXPORT:
+            return 'Export the datapoints of a device over a time range to a Parquet or Arrow file.'
+        elif self == self.IMPORT:
+            return ('Import the datapoints of a device, or the states of a thermal device, from a '
+                    'CSV, Parquet or Arrow file. Rows at timestamps already recorded are skipped.')
         elif self == self.LS:
             return 'List the details of a device.'
         elif self == self.MOD:
             return 'Modify a device.'
         elif self == self.READ:
             return 'Read data from a device'
+        elif self == self.RECOUNT:
+            return ('Recount the datapoints of a device and of its sessions, such as after an '
+                    'import.')
         else:
             return ''
 
@@ -36,6 +47,20 @@ class ModParam(StrEnum):
         else:
             return ''
 
+class ImportParam(StrEnum):
+    PATH = 'path'
+    THERMAL = 'thermal'
+
+    @property
+    def help(self) -> str:
+        if self == self.PATH:
+            return ('The file to import, by suffix one of .csv, .parquet or .arrow. The columns '
+                    'are those of an export.')
+        elif self == self.THERMAL:
+            return ('Import the states of a thermal device instead, with the columns of the '
+                    'thermal calibration application.')
+        return ''
+
 class ReadParam(StrEnum):
     TIMES = 'times'
     RAW = 'raw'
@@ -50,9 +75,16 @@ class ReadParam(StrEnum):
 
 def make_cli(parser: ArgumentParser):
     subparsers = parser.add_subparsers(dest=Param.ACTION, required=False, help=Param.ACTION.help,)
-    for act in (Action.ACTIVATE, Action.DEACTIVATE, Action.LS, Action.MOD, Action.READ):
+    for act in (Action.ACTIVATE, Action.DEACTIVATE, Action.EXPORT, Action.IMPORT, Action.LS,
+                Action.MOD, Action.READ, Action.RECOUNT):
         act_parser = subparsers.add_parser(act, help=act.help)
         act_parser.add_argument(Param.FUZZY_ID, help=Param.FUZZY_ID.help)
+        if act == Action.EXPORT:
+            add_export_args(act_parser, time_range=True)
+        if act == Action.IMPORT:
+            act_parser.add_argument(ImportParam.PATH, help=ImportParam.PATH.help)
+            act_parser.add_argument(f'--{ImportParam.THERMAL}', action='store_true',
+                                    help=ImportParam.THERMAL.help)
         if act == Action.MOD:
             act_parser.add_argument(f'--{ModParam.NAME}', type=str, help=ModParam.NAME.help)
         if act == Action.READ:
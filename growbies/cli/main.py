@@ -0,0 +1,59 @@
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+from importlib import import_module
+from typing import Iterable, Optional
+
+from growbies import __doc__ as pkg_doc
+from growbies.cli.common import ClientOp, CMD
+from growbies.service.common import ServiceOp
+
+__all__ = ['OPS', 'make_cli', 'make_op_cli', 'select_op']
+
+OPS = (*ServiceOp, *ClientOp)
+
+# The command line interface of each operation is only imported when the operation is used. Some,
+# such as "nvm", pull in the device protocol.
+_OP_CLI_MODULES = {
+    ServiceOp.CAL: 'growbies.cli.cal',
+    ServiceOp.DEVICE: 'growbies.cli.device',
+    ServiceOp.NVM: 'growbies.cli.nvm',
+    ServiceOp.PROJECT: 'growbies.cli.project',
+    ServiceOp.READ: 'growbies.cli.read',
+    ServiceOp.SESSION: 'growbies.cli.session',
+    ServiceOp.TAG: 'growbies.cli.tag',
+    ServiceOp.THERMAL: 'growbies.cli.thermal',
+    ServiceOp.USER: 'growbies.cli.user',
+    ClientOp.SHELL: 'growbies.cli.shell',
+}
+
+def select_op(argv: list[str]) -> Optional[str]:
+    """Return the top level operation of command line arguments, if any."""
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg if arg in OPS else None
+    return None
+
+def make_cli(ops: Optional[Iterable[str]] = None) \
+        -> tuple[ArgumentParser, dict[str, ArgumentParser]]:
+    """
+    Return the root parser and a mapping of the top level operations to their sub-parsers. The
+    root parser is also mapped, by :data:`CMD`.
+
+    :param ops: The operations to fully build sub-parsers for. All are built if not provided. The
+        others only have their help text, see :func:`make_op_cli`.
+    """
+    parser = ArgumentParser(description=pkg_doc, formatter_class=RawDescriptionHelpFormatter)
+    parsers = {CMD: parser}
+    parser_adder = parser.add_subparsers(dest=CMD, required=True)
+
+    for cmd in OPS:
+        parsers[cmd] = parser_adder.add_parser(cmd, description=cmd.description, help=cmd.help,
+                                               formatter_class=RawDescriptionHelpFormatter)
+
+    for cmd in (OPS if ops is None else ops):
+        make_op_cli(parsers, cmd)
+
+    return parser, parsers
+
+def make_op_cli(parsers: dict[str, ArgumentParser], op: str):
+    """Build the sub-parser of an operation, as returned by :func:`make_cli`."""
+    import_module(_OP_CLI_MODULES[op]).make_cli(parsers[op])
@@ -1,7 +1,7 @@
 from argparse import ArgumentParser
 from enum import StrEnum
 
-from growbies.cli.common import Param as commonParam
+from growbies.cli.common import add_export_args, EXPORT, Param as commonParam
 
 class Param(StrEnum):
     ACTION = 'action'
@@ -21,6 +21,7 @@ class Action(StrEnum):
     ACTIVATE = 'activate'
     ADD = 'add'
     DEACTIVATE = 'deactivate'
+    EXPORT = EXPORT
     LS = 'ls'
     MOD = 'mod'
     NEW = 'new'
@@ -35,6 +36,8 @@ class Action(StrEnum):
             return 'Add/associate an entity with a session.'
         elif self == self.DEACTIVATE:
             return 'Deactivate a session. Update/set the end time.'
+        elif self == self.EXPORT:
+            return 'Export the datapoints of a session to a Parquet or Arrow file.'
         elif self == self.LS:
             return 'List the details of a session.'
         elif self == self.MOD:
@@ -70,6 +73,11 @@ def make_cli(parser: ArgumentParser):
         act_parser.add_argument(commonParam.FUZZY_ID, nargs='?', default=None,
                                 help='Session to operate on.')
 
+    # Export
+    export_parser = subparsers.add_parser(Action.EXPORT, help=Action.EXPORT.help)
+    export_parser.add_argument(commonParam.FUZZY_ID, help='Session to operate on.')
+    add_export_args(export_parser)
+
     # Add / Remove
     for cmd in (Action.ADD, Action.RM):
         cmd_parser = subparsers.add_parser(cmd, help=cmd.help)
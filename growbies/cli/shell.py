@@ -0,0 +1,16 @@
+from argparse import ArgumentParser
+
+from .common import BaseParam
+
+class Param(BaseParam):
+    LINE_PROTOCOL = 'line_protocol'
+
+    @property
+    def help(self) -> str:
+        if self == self.LINE_PROTOCOL:
+            return 'Use the line protocol, even if standard input is a terminal.'
+        return ''
+
+def make_cli(parser: ArgumentParser):
+    parser.add_argument(f'--{Param.LINE_PROTOCOL.kw_cli_name}', dest=Param.LINE_PROTOCOL,
+                        action='store_true', help=Param.LINE_PROTOCOL.help)
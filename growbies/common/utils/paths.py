@@ -88,6 +88,7 @@ class InstallPaths(Enum):
     RUN = Path('/run')
     RUN_GROWBIES = RUN / 'growbies'
     RUN_GROWBIES_CMD_Q = RUN_GROWBIES / 'cmd_queue.pkl'
+    RUN_GROWBIES_ID_INDEX = RUN_GROWBIES / 'id_index.json'
 
     # /etc
     ETC = Path(f'/etc')
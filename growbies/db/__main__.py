@@ -4,16 +4,23 @@ import sys
 
 from . import __doc__ as pkg_doc
 from .init_db_and_user import init_db_and_user
+from growbies.cfg import get_cfg
 from growbies.cli.common import CMD
 from growbies.db.engine import get_db_engine
 from growbies.constants import APPNAME, USERNAME
 
 class Param:
+    DROP = 'drop'
     KEEP_PRIVILEGES = 'keep_privileges'
 
 class SubCmd(StrEnum):
     INIT_DB_AND_USER = 'init_db_and_user'
     INIT_TABLES = 'init_tables'
+    PARTITION = 'partition'
+    RECONCILE = 'reconcile'
+    RETENTION = 'retention'
+    ROLLUP = 'rollup'
+    SENSOR_ARRAYS = 'sensor_arrays'
 
     @classmethod
     def get_help_str(cls, sub_cmd_: 'SubCmd') -> str:
@@ -21,13 +28,34 @@ class SubCmd(StrEnum):
             return f'Initialize the {APPNAME} database.'
         elif sub_cmd_ == cls.INIT_TABLES:
             return f'Initialize tables for {APPNAME} database.'
+        elif sub_cmd_ == cls.PARTITION:
+            return (f'Migrate the {APPNAME} datapoint tables of a database made before they were '
+                    f'partitioned by month.')
+        elif sub_cmd_ == cls.RECONCILE:
+            return (f'Recount the {APPNAME} datapoints of every device and session. The counts '
+                    f'are kept as datapoints are recorded, this corrects any drift.')
+        elif sub_cmd_ == cls.RETENTION:
+            return (f'Drop the {APPNAME} datapoints older than the "retention_months" of the '
+                    f'database configuration, a month at a time.')
+        elif sub_cmd_ == cls.ROLLUP:
+            return (f'Rebuild the rollups of the {APPNAME} datapoints. Datapoints are rolled up '
+                    f'as they are recorded, this catches up on those that were not.')
+        elif sub_cmd_ == cls.SENSOR_ARRAYS:
+            return (f'Move the {APPNAME} sensor readings recorded as rows, before datapoints had '
+                    f'sensor arrays, into the arrays. The datapoint tables are partitioned first, '
+                    f'see "{cls.PARTITION}". The emptied sensor tables are kept, unless '
+                    f'--{Param.DROP} is given.')
         else:
             raise ValueError(f'Database sub-command "{sub_cmd_}" does not exist')
 
 parser = ArgumentParser(description=pkg_doc, formatter_class=RawTextHelpFormatter)
 sub = parser.add_subparsers(dest=CMD, required=True)
 for sub_cmd in SubCmd:
-    sub.add_parser(sub_cmd, help=SubCmd.get_help_str(sub_cmd), add_help=False)
+    sub_parser = sub.add_parser(sub_cmd, help=SubCmd.get_help_str(sub_cmd), add_help=False)
+    if sub_cmd == SubCmd.SENSOR_ARRAYS:
+        sub_parser.add_argument(f'--{Param.DROP}', default=False, action='store_true',
+                                help='Then drop the sensor tables. This is not reversible, and is '
+                                     f'for when the {APPNAME} service is stopped.')
 
 parser.add_argument(f'--{Param.KEEP_PRIVILEGES}', default=False, action='store_true',
                     help=f'By default, if the program is executed with root privileges, these will '
@@ -40,4 +68,14 @@ sub_cmd = ns_dict[CMD]
 if SubCmd.INIT_DB_AND_USER == sub_cmd:
     init_db_and_user()
 elif SubCmd.INIT_TABLES == sub_cmd:
-    get_db_engine()
+    get_db_engine().init()
+elif SubCmd.PARTITION == sub_cmd:
+    get_db_engine().partition.migrate()
+elif SubCmd.RECONCILE == sub_cmd:
+    get_db_engine().counter.reconcile()
+elif SubCmd.RETENTION == sub_cmd:
+    get_db_engine().partition.apply_retention(get_cfg().database.retention_months)
+elif SubCmd.ROLLUP == sub_cmd:
+    get_db_engine().rollup.catch_up()
+elif SubCmd.SENSOR_ARRAYS == sub_cmd:
+    get_db_engine().datapoint.migrate_sensor_arrays(drop=ns_dict[Param.DROP])
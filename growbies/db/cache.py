@@ -0,0 +1,118 @@
+from threading import Lock
+from typing import Any, Optional
+from uuid import UUID
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EntityCache:
+    """
+    A service local cache of named database records, such as devices and sessions, keyed by ID,
+    name and the fuzzy IDs that they have been looked up by.
+
+    The engines invalidate the cache on their own writes, see
+    :meth:`growbies.db.models.common.BaseNamedTableEngine.upsert`. The service does all writing,
+    so the cache is only enabled there, see :meth:`growbies.db.engine.DBEngine.enable_cache`.
+
+    Cached records are shared. They must only be modified to be written back through their engine,
+    which invalidates them.
+    """
+    def __init__(self, related: Optional[dict[str, tuple[str, ...]]] = None):
+        """
+        :param related: Entity to the entities whose cached records embed records of it, through
+            relationships. Writing a record invalidates these.
+        """
+        self._lock = Lock()
+        self._enabled = False
+        self._related = related if related is not None else dict()
+        # Entity to ID to record.
+        self._records: dict[str, dict[UUID, Any]] = dict()
+        # Entity to lookup key to ID.
+        self._keys: dict[str, dict[str, UUID]] = dict()
+        self._hits: dict[str, int] = dict()
+        self._misses: dict[str, int] = dict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self):
+        self._enabled = True
+
+    def get(self, entity: str, fuzzy_id: str | UUID) -> Optional[Any]:
+        """Return the cached record looked up by the fuzzy ID, else None."""
+        if not self._enabled:
+            return None
+        with self._lock:
+            id_ = self._keys.get(entity, dict()).get(str(fuzzy_id))
+            record = None if id_ is None else self._records.get(entity, dict()).get(id_)
+            if record is None:
+                self._misses[entity] = self._misses.get(entity, 0) + 1
+            else:
+                self._hits[entity] = self._hits.get(entity, 0) + 1
+            return record
+
+    def put(self, entity: str, fuzzy_id: str | UUID, record: Any):
+        """Cache a record, by the fuzzy ID it was looked up by, its ID and its name."""
+        if not self._enabled:
+            return
+        with self._lock:
+            self._records.setdefault(entity, dict())[record.id] = record
+            keys = self._keys.setdefault(entity, dict())
+            keys[str(fuzzy_id)] = record.id
+            keys[str(record.id)] = record.id
+            if getattr(record, 'name', None):
+                keys[record.name] = record.id
+
+    def update(self, entity: str, id_: UUID, **values):
+        """
+        Set attributes of a cached record in place, if it is cached. This is for values derived by
+        other engines, such as the datapoint count of a session, which change too often to drop
+        the record on each change.
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            record = self._records.get(entity, dict()).get(id_)
+            if record is not None:
+                for key, value in values.items():
+                    setattr(record, key, value)
+
+    def invalidate(self, entity: Optional[str], id_: Optional[UUID] = None,
+                   keys: bool = False, related: bool = True):
+        """
+        Drop a cached record and the cached records of the related entities.
+
+        :param entity: The entity written to. Nothing is done if None.
+        :param id_: The record written to. All records of the entity are dropped if None.
+        :param keys: Also drop the lookup keys of the entity. This is needed when a record is
+            added, renamed or removed, as the record a fuzzy ID resolves to may change.
+        :param related: Also drop the records of the related entities, which may embed the record.
+        """
+        if not self._enabled or entity is None:
+            return
+        with self._lock:
+            if id_ is None:
+                self._records.pop(entity, None)
+            else:
+                self._records.get(entity, dict()).pop(id_, None)
+            if keys:
+                self._keys.pop(entity, None)
+            if related:
+                for related_entity in self._related.get(entity, tuple()):
+                    self._records.pop(related_entity, None)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._keys.clear()
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """Return entity to the counts of hits and misses."""
+        with self._lock:
+            return {entity: (self._hits.get(entity, 0), self._misses.get(entity, 0))
+                    for entity in sorted(set(self._hits) | set(self._misses))}
+
+    def __str__(self):
+        return ', '.join(f'{entity}: {hits} hits / {misses} misses'
+                         for entity, (hits, misses) in self.stats().items())
@@ -2,30 +2,95 @@ from contextlib import contextmanager
 import logging
 from typing import Any, Generator
 
-from sqlalchemy import Engine
+from sqlalchemy import Engine, inspect, text
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import create_engine, Session, SQLModel
 
-from .models import account, gateway, device, datapoint, link, project, session, tag, tare, user
+from .cache import EntityCache
+from .id_index import IdIndex
+from .models import (account, counter, gateway, device, datapoint, link, membership, partition,
+                     project, rewrite, rollup, session, tag, tare, user)
+from .models.common import BaseNamedTableEngine
 from growbies.constants import SQLMODEL_ADDRESS_FMT
 from growbies.cfg import get_cfg
+from growbies.service.common import ServiceOp
 
 logger = logging.getLogger(__name__)
 
+# Of the PostgreSQL advisory lock held while setting up the schema, see :meth:`DBEngine.init`.
+_INIT_LOCK_KEY = 0x67726f77
+
 class DBEngine:
     def __init__(self):
+        # Nothing is written here, as every process makes an engine. See :meth:`init`.
         self._engine = self._create_engine()
-        self._init_tables()
+
+        self.id_index = IdIndex()
+        # Sessions embed their devices, projects, tags and users, and each of those its sessions.
+        self.cache = EntityCache(related={
+            ServiceOp.DEVICE: (ServiceOp.SESSION,),
+            ServiceOp.PROJECT: (ServiceOp.SESSION,),
+            ServiceOp.SESSION: (ServiceOp.DEVICE, ServiceOp.PROJECT, ServiceOp.TAG,
+                                ServiceOp.USER),
+            ServiceOp.TAG: (ServiceOp.SESSION,),
+            ServiceOp.USER: (ServiceOp.SESSION,),
+        })
 
         self.account = account.AccountEngine(self)
+        self.counter = counter.CounterEngine(self)
         self.datapoint = datapoint.DataPointEngine(self)
         self.gateway = gateway.GatewayEngine(self)
         self.device = device.DeviceEngine(self)
         self.project = project.ProjectEngine(self)
+        self.rewrite = rewrite.RewriteEngine(self)
+        self.rollup = rollup.RollupEngine(self)
         self.session = session.SessionEngine(self)
         self.tag = tag.TagEngine(self)
         self.tare = tare.TareEngine(self)
         self.user = user.UserEngine(self)
         self.link = link.LinkEngine(self)
+        self.membership = membership.MembershipEngine(self)
+        self.partition = partition.PartitionEngine(self)
+
+    def init(self):
+        """
+        Create the tables and indexes, migrate a database made by an earlier version, and catch up
+        on the maintenance of the datapoints. This is for the service, at start, and for
+        "python -m growbies.db init_tables". It is serialized across processes.
+        """
+        with self._engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _INIT_LOCK_KEY})
+            try:
+                self._init_tables()
+                self._init_indexes()
+                self.tag.init()
+                self.datapoint.init_sensor_arrays()
+                self.partition.init()
+                self.membership.sync()
+                self.counter.init()
+                self.rollup.init()
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _INIT_LOCK_KEY})
+
+    def enable_id_index(self):
+        """
+        Rebuild the ID index from the database and keep it fresh from here on. This is for the
+        service, which does all upserting and removing.
+        """
+        self.id_index.enable({engine.entity: engine.get_ids_and_names()
+                              for engine in self._named_engines})
+
+    def enable_cache(self):
+        """
+        Cache the records looked up by the named engines. This is for the service, which does all
+        writing, so that the engines invalidate the cache, see
+        :class:`growbies.db.cache.EntityCache`.
+        """
+        self.cache.enable()
+
+    @property
+    def _named_engines(self) -> tuple[BaseNamedTableEngine, ...]:
+        return self.device, self.project, self.session, self.tag, self.user
 
     @staticmethod
     def _create_engine() -> Engine:
@@ -35,12 +100,38 @@ class DBEngine:
 
 
     def _init_tables(self):
-        # All table models found in the import space at this point will be created.
+        # All table models found in the import space at this point will be created. Except for the
+        # sensor tables of a database that they have been dropped from, see
+        # :meth:`growbies.db.models.datapoint.DataPointEngine.migrate_sensor_arrays`.
+        tables = None
+        inspector = inspect(self._engine)
+        if (inspector.has_table(datapoint.DataPoint.__tablename__)
+                and not inspector.has_table(datapoint.DataPointMassSensor.__tablename__)):
+            tables = [table for table in SQLModel.metadata.sorted_tables
+                      if table.name not in datapoint.SENSOR_TABLES]
         with Session(self._engine) as sess:
-            SQLModel.metadata.create_all(self._engine)
+            SQLModel.metadata.create_all(self._engine, tables=tables)
             sess.commit()
             sess.close()
 
+    def _init_indexes(self):
+        # The trigram indexes of the fuzzy name lookups need the pg_trgm extension. It is trusted,
+        # so the database owner can create it, but it may not be installed.
+        with Session(self._engine) as sess:
+            try:
+                sess.exec(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+                sess.commit()
+                trigram = True
+            except DBAPIError as err:
+                sess.rollback()
+                logger.warning(f'Fuzzy name lookups will not be indexed, pg_trgm is not available: '
+                               f'{err.orig}')
+                trigram = False
+
+            for engine in self._named_engines:
+                engine.init_indexes(sess, trigram)
+            sess.commit()
+
     @contextmanager
     def new_session(self) -> Generator[Session, Any, None]:
         sess = Session(self._engine)
@@ -57,3 +148,11 @@ def get_db_engine():
     if _db_engine is None:
         _db_engine = DBEngine()
     return _db_engine
+
+def dispose_after_fork():
+    """
+    Drop the pooled database connections of the application global singleton in a forked process.
+    They are not closed, as they are those of the parent process, which still uses them.
+    """
+    if _db_engine is not None:
+        _db_engine._engine.dispose(close=False)
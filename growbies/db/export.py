@@ -0,0 +1,155 @@
+"""
+Export of datapoints to columnar files, for offline analysis with the likes of pandas and polars.
+"""
+from datetime import datetime
+from os import PathLike
+from typing import Optional, Sequence
+import logging
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet
+from sqlmodel import text
+
+from growbies.cli.common import ExportFormat
+from growbies.common.utils import timestamp
+from growbies.common.utils.types import DeviceID, SessionID
+from growbies.db.engine import DBEngine
+from growbies.db.models.datapoint import DataPointColumns
+from growbies.db.models.membership import MEMBER_SQL
+
+logger = logging.getLogger(__name__)
+
+#: The number of datapoints per record batch, and so per row group of a Parquet file. Memory is
+#: bounded by this rather than by the number of datapoints exported.
+EXPORT_CHUNK_SIZE = 65_536
+
+# The devices of the datapoints of a session, by membership or by explicit link.
+_SESSION_DEVICES_SQL = text("""
+    SELECT device_id FROM sessiondeviceinterval WHERE session_id = :session_id
+    UNION
+    SELECT dp.device_id
+    FROM sessiondatapointlink link
+    JOIN datapoint dp ON dp.id = link.right_id
+    WHERE link.left_id = :session_id
+""")
+
+def export_device(engine: DBEngine, device_id: DeviceID, start_time: Optional[datetime],
+                  end_time: Optional[datetime], path: str | PathLike,
+                  format_: ExportFormat = ExportFormat.PARQUET,
+                  chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """
+    Export the datapoints of a device over a time range.
+
+    :return: The number of datapoints exported.
+    """
+    if start_time is None:
+        start_time = timestamp.get_utc_dt(0)
+
+    if end_time is None:
+        end_time = timestamp.get_utc_dt()
+
+    sensor_counts = engine.rollup.get_sensor_counts([device_id], start_time, end_time)
+    return _export(engine, """
+                dp.device_id = :device_id
+                AND dp.timestamp >= :start_time
+                AND dp.timestamp <= :end_time""", '',
+                   {'device_id': device_id, 'start_time': start_time, 'end_time': end_time},
+                   sensor_counts, path, format_, chunk_size)
+
+def export_session(engine: DBEngine, session_id: SessionID, path: str | PathLike,
+                   format_: ExportFormat = ExportFormat.PARQUET,
+                   chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+    """
+    Export the datapoints of a session, see
+    :meth:`growbies.db.models.session.SessionEngine.get_datapoints`.
+
+    :return: The number of datapoints exported.
+    """
+    with engine.new_session() as session:
+        device_ids = [row[0] for row in session.exec(_SESSION_DEVICES_SQL,
+                                                     params={'session_id': session_id}).all()]
+    sensor_counts = engine.rollup.get_sensor_counts(device_ids, None, None)
+    return _export(engine, 'true',
+                   f'JOIN ({MEMBER_SQL}) member '
+                   f'ON member.id = dp.id AND member.timestamp = dp.timestamp',
+                   {'session_id': session_id}, sensor_counts, path, format_, chunk_size)
+
+def make_schema(mass_sensor_count: int, temperature_sensor_count: int) -> pa.Schema:
+    """
+    Return the schema of an export. There is a row per datapoint and a column per sensor reading,
+    such as "sensor_mass_0". The tare values, of which there may be any number, are a list.
+    """
+    fields = [
+        pa.field('timestamp', pa.timestamp('ms', tz='UTC'), nullable=False),
+        pa.field('device_id', pa.string(), nullable=False),
+        pa.field('mass', pa.float64()),
+        pa.field('temperature', pa.float64()),
+        pa.field('ref_mass', pa.float64()),
+    ]
+    for idx in range(mass_sensor_count):
+        fields.extend((pa.field(f'sensor_mass_{idx}', pa.float32()),
+                       pa.field(f'sensor_ref_mass_{idx}', pa.float32()),
+                       pa.field(f'sensor_mass_error_{idx}', pa.int32())))
+    for idx in range(temperature_sensor_count):
+        fields.extend((pa.field(f'sensor_temperature_{idx}', pa.float32()),
+                       pa.field(f'sensor_temperature_error_{idx}', pa.int32())))
+    fields.append(pa.field('tare', pa.list_(pa.float64())))
+    return pa.schema(fields)
+
+def make_record_batch(rows: Sequence, schema: pa.Schema) -> pa.RecordBatch:
+    """
+    :param rows: Rows as read by :meth:`growbies.db.models.datapoint.DataPointColumns.make_sql`.
+    """
+    columns = list()
+    for field in schema:
+        prefix, _, idx = field.name.rpartition('_')
+        if idx.isdigit():
+            # A sensor reading, missing if the sensor array of the datapoint is shorter.
+            idx = int(idx)
+            values = [_get_at(getattr(row, prefix), idx) for row in rows]
+        elif field.name == 'device_id':
+            values = [str(row.device_id) for row in rows]
+        else:
+            values = [getattr(row, field.name) for row in rows]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+def _export(engine: DBEngine, where: str, join: str, params: dict,
+            sensor_counts: tuple[int, int], path: str | PathLike, format_: ExportFormat,
+            chunk_size: int) -> int:
+    """
+    :param sensor_counts: The numbers of mass and temperature sensors, for the sensor columns. A
+        file has one schema, so these are known ahead, from the rollups, rather than from the
+        chunks or by reading the datapoints twice.
+    """
+    datapoint_sql = DataPointColumns.make_sql(where, join,
+                                              legacy=engine.datapoint.has_sensor_tables,
+                                              partitioned=engine.partition.partitioned)
+    schema = make_schema(*sensor_counts)
+    count = 0
+    with engine.new_session() as session:
+        # Rows are read through a server side cursor, a chunk at a time.
+        result = session.exec(
+            datapoint_sql,
+            params=params,
+            execution_options={'stream_results': True, 'max_row_buffer': chunk_size},
+        )
+        with _open_writer(path, schema, format_) as writer:
+            for rows in result.partitions(chunk_size):
+                writer.write_batch(make_record_batch(rows, schema))
+                count += len(rows)
+
+    logger.info(f'Exported {count} datapoints to "{path}".')
+    return count
+
+def _open_writer(path: str | PathLike, schema: pa.Schema, format_: ExportFormat):
+    if format_ == ExportFormat.PARQUET:
+        return pa.parquet.ParquetWriter(path, schema)
+    elif format_ == ExportFormat.ARROW:
+        return pa.ipc.new_file(path, schema)
+    else:
+        raise ValueError(f'Invalid export format: "{format_}"')
+
+def _get_at(values: Optional[list], idx: int):
+    return values[idx] if values is not None and idx < len(values) else None
@@ -0,0 +1,105 @@
+"""
+An on-disk index of the IDs and names of the named database entities, for tab completion.
+
+The service keeps the index fresh as entities are upserted and removed, see
+:meth:`growbies.db.engine.DBEngine.enable_id_index`. Readers, such as tab completion, only read
+the file. They do not touch the database or the service queue.
+
+This module is imported on tab completion and must stay light.
+"""
+from typing import Iterable, Optional, TYPE_CHECKING
+import json
+import logging
+import os
+
+from growbies.common.utils.paths import InstallPaths
+
+if TYPE_CHECKING:
+    from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+# Entity, such as "device", to a list of [ID, name] pairs. The name may be None.
+IdIndexEntries_t = dict[str, list[list[Optional[str]]]]
+
+class IdIndex:
+    FILE_MODE = 0o664
+
+    def __init__(self, path: str | os.PathLike = InstallPaths.RUN_GROWBIES_ID_INDEX.value):
+        # Delayed import, only the writer needs it.
+        from threading import Lock
+
+        self._path = path
+        self._lock = Lock()
+        self._enabled = False
+        self._entries: dict[str, dict[str, Optional[str]]] = dict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self, entries: dict[str, Iterable[tuple['UUID | str', Optional[str]]]]):
+        """
+        Start maintaining the index file, replacing its contents.
+
+        :param entries: Entity to all the ID and name pairs of the entity.
+        """
+        with self._lock:
+            self._entries = {entity: {str(id_): name for id_, name in pairs}
+                             for entity, pairs in entries.items()}
+            self._enabled = True
+            self._write()
+
+    def upsert(self, entity: str, id_: 'UUID | str', name: Optional[str]):
+        if not self._enabled:
+            return
+        with self._lock:
+            entity_entries = self._entries.setdefault(entity, dict())
+            id_ = str(id_)
+            if id_ in entity_entries and entity_entries[id_] == name:
+                return
+            entity_entries[id_] = name
+            self._write()
+
+    def remove(self, entity: str, id_: 'UUID | str'):
+        if not self._enabled:
+            return
+        with self._lock:
+            if self._entries.get(entity, dict()).pop(str(id_), False) is False:
+                return
+            self._write()
+
+    def _write(self):
+        data = {entity: [[id_, name] for id_, name in entity_entries.items()]
+                for entity, entity_entries in self._entries.items()}
+        # Delayed import, only the writer needs it.
+        from tempfile import NamedTemporaryFile
+
+        tmp_path = None
+        try:
+            # Uniquely named, in the directory of the index so that it is replaced atomically.
+            with NamedTemporaryFile('w', dir=os.path.dirname(os.path.abspath(self._path)),
+                                    prefix=f'{os.path.basename(self._path)}.', suffix='.tmp',
+                                    delete=False) as file:
+                tmp_path = file.name
+                json.dump(data, file)
+            os.chmod(tmp_path, self.FILE_MODE)
+            # Atomic, readers never see a partial file.
+            os.replace(tmp_path, self._path)
+        except OSError as err:
+            logger.warning(f'Unable to write the ID index "{self._path}": {err}')
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def read(path: str | os.PathLike = InstallPaths.RUN_GROWBIES_ID_INDEX.value) \
+            -> IdIndexEntries_t:
+        """Return the entries of the index file. Empty if it is not available."""
+        try:
+            with open(path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return dict()
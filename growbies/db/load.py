@@ -0,0 +1,276 @@
+"""
+Bulk loading of datapoints, and of the states of thermal devices, from CSV, Parquet or Arrow IPC
+files, such as those of :mod:`growbies.db.export` and :mod:`growbies.app.thermal.thermal_cal`.
+
+Files are read a record batch at a time, copied into a temporary table with COPY, and merged
+from there in one statement per batch. Rows of a device at a timestamp that it already has are
+skipped, so a load can be repeated, or resumed after failing part way.
+"""
+from os import PathLike
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+import csv
+import io
+import logging
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.ipc
+import pyarrow.parquet
+from sqlmodel import Session, text
+
+from growbies.common.utils.types import DeviceID
+from growbies.db.engine import DBEngine
+from growbies.db.models.datapoint import DataPoint
+from growbies.db.models.thermal import ThermalState
+from growbies.service.common import ServiceCmdError
+
+logger = logging.getLogger(__name__)
+
+#: The number of rows per record batch, and so per transaction.
+LOAD_CHUNK_SIZE = 65_536
+
+#: Called after each batch with the number of rows read and loaded so far.
+Progress_t = Callable[[int, int], None]
+
+_DATAPOINT_COLUMN_TYPES = {
+    DataPoint.Key.TIMESTAMP: 'timestamptz',
+    DataPoint.Key.MASS: 'float8',
+    DataPoint.Key.TEMPERATURE: 'float8',
+    DataPoint.Key.REF_MASS: 'float8',
+    'tare': 'float8[]',
+}
+
+# The sensor readings are a column per sensor index, such as "sensor_mass_0", as exported.
+_SENSOR_COLUMN_TYPES = {
+    DataPoint.Key.SENSOR_MASS: 'real',
+    DataPoint.Key.SENSOR_REF_MASS: 'real',
+    DataPoint.Key.SENSOR_MASS_ERROR: 'integer',
+    DataPoint.Key.SENSOR_TEMPERATURE: 'real',
+    DataPoint.Key.SENSOR_TEMPERATURE_ERROR: 'integer',
+}
+_SENSOR_COLUMN_RE = re.compile(rf'^({"|".join(_SENSOR_COLUMN_TYPES)})_(\d+)$')
+
+_THERMAL_STATE_COLUMN_TYPES = {
+    ThermalState.Key.TIMESTAMP: 'timestamptz',
+    ThermalState.Key.ACTIVE: 'boolean',
+    ThermalState.Key.MODE: 'text',
+    ThermalState.Key.DUTY_CYCLE: 'float8',
+    ThermalState.Key.SET_POINT: 'float8',
+    ThermalState.Key.HEATER_ON: 'boolean',
+    ThermalState.Key.FAN_ON: 'boolean',
+    ThermalState.Key.TEMPERATURE: 'float8',
+    ThermalState.Key.CONTROLLER_PROPORTIONAL_TERM: 'float8',
+    ThermalState.Key.CONTROLLER_INTEGRAL_TERM: 'float8',
+    ThermalState.Key.ERROR: 'text',
+}
+
+_STAGING_TABLE = 'load_staging'
+
+def load_datapoints(engine: DBEngine, device_id: DeviceID, path: str | PathLike,
+                    progress: Optional[Progress_t] = None,
+                    chunk_size: int = LOAD_CHUNK_SIZE) -> tuple[int, int]:
+    """
+    Load the datapoints of a device. The columns are those of an export, see
+    :func:`growbies.db.export.make_schema`, of which only the timestamp, mass and temperature are
+    required. Any others are ignored. The tare of a CSV file is a PostgreSQL array, such as
+    "{0.0,1.5}".
+
+    The rollups over the time range loaded are rebuilt, and the rewrite of the range recorded, see
+    :class:`growbies.db.models.rewrite.DataPointRewrite`. The datapoint counts are left to be
+    recounted by the caller, see
+    :meth:`growbies.db.models.counter.CounterEngine.reconcile_device`.
+
+    :return: The number of rows read and the number of datapoints loaded.
+    """
+    columns = _get_columns(path)
+    column_types = {column: _DATAPOINT_COLUMN_TYPES.get(column) or
+                    _SENSOR_COLUMN_TYPES[_SENSOR_COLUMN_RE.match(column).group(1)]
+                    for column in columns
+                    if column in _DATAPOINT_COLUMN_TYPES or _SENSOR_COLUMN_RE.match(column)}
+    _check_required(column_types, (DataPoint.Key.TIMESTAMP, DataPoint.Key.MASS,
+                                   DataPoint.Key.TEMPERATURE), path)
+    merge_sqls = _make_datapoint_merge_sqls(column_types)
+    time_range = [None, None]
+
+    def ensure_partitions(session: Session):
+        start_time, end_time = session.exec(text(f"""
+            SELECT min(timestamp), max(timestamp) FROM {_STAGING_TABLE}
+        """)).one()
+        if start_time is not None:
+            engine.partition.ensure_range(start_time, end_time)
+            time_range[0] = start_time if time_range[0] is None else min(time_range[0], start_time)
+            time_range[1] = end_time if time_range[1] is None else max(time_range[1], end_time)
+
+    counts = _load(engine, path, column_types, merge_sqls, {'device_id': device_id},
+                   ensure_partitions, progress, chunk_size)
+
+    if counts[1]:
+        engine.rollup.catch_up(*time_range)
+        engine.rewrite.record(device_id, *time_range)
+    return counts
+
+def load_thermal_states(engine: DBEngine, device_id: DeviceID, path: str | PathLike,
+                        progress: Optional[Progress_t] = None,
+                        chunk_size: int = LOAD_CHUNK_SIZE) -> tuple[int, int]:
+    """
+    Load the states of a thermal device, see :class:`growbies.db.models.thermal.ThermalState`.
+    The columns are those of :data:`growbies.app.thermal.thermal_cal.FIELDS`, of which only the
+    timestamp is required.
+
+    :return: The number of rows read and the number of states loaded.
+    """
+    column_types = {column: _THERMAL_STATE_COLUMN_TYPES[column] for column in _get_columns(path)
+                    if column in _THERMAL_STATE_COLUMN_TYPES}
+    _check_required(column_types, (ThermalState.Key.TIMESTAMP,), path)
+    columns = ', '.join(column_types)
+    merge_sql = text(f"""
+        INSERT INTO thermalstate (device_id, {columns})
+        SELECT :device_id, {columns}
+        FROM {_STAGING_TABLE}
+        WHERE timestamp IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+    return _load(engine, path, column_types, (merge_sql,), {'device_id': device_id}, None,
+                 progress, chunk_size)
+
+def _make_datapoint_merge_sqls(column_types: dict[str, str]) -> tuple:
+    def column(name: str) -> str:
+        return f'i.{name}' if name in column_types else 'NULL'
+
+    # Sensor arrays, NULL where the datapoint has no readings.
+    arrays = list()
+    for key in _SENSOR_COLUMN_TYPES:
+        sensor_columns = sorted((name for name in column_types
+                                 if (match := _SENSOR_COLUMN_RE.match(name))
+                                 and match.group(1) == key),
+                                key=lambda name: int(name.rpartition('_')[2]))
+        if sensor_columns:
+            values = ', '.join(f'i.{name}' for name in sensor_columns)
+            arrays.append(f'CASE WHEN num_nonnulls({values}) > 0 THEN ARRAY[{values}] END')
+        else:
+            arrays.append('NULL')
+
+    tare = f"coalesce({column('tare')}, CAST('{{}}' AS float8[]))"
+    return (
+        text(f"""
+            INSERT INTO tare (id, "values")
+            SELECT DISTINCT ON ({tare}) gen_random_uuid(), {tare}
+            FROM {_STAGING_TABLE} i
+            ON CONFLICT ("values") DO NOTHING
+        """),
+        text(f"""
+            INSERT INTO datapoint (id, device_id, tare_id, timestamp, mass, temperature, ref_mass,
+                                   {', '.join(_SENSOR_COLUMN_TYPES)})
+            SELECT gen_random_uuid(), :device_id, tare.id, i.timestamp, i.mass, i.temperature,
+                   {column(DataPoint.Key.REF_MASS)}, {', '.join(arrays)}
+            FROM (
+                SELECT DISTINCT ON (timestamp) *
+                FROM {_STAGING_TABLE}
+                WHERE timestamp IS NOT NULL AND mass IS NOT NULL AND temperature IS NOT NULL
+                ORDER BY timestamp
+            ) i
+            JOIN tare ON tare."values" = {tare}
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM datapoint dp
+                WHERE dp.device_id = :device_id AND dp.timestamp = i.timestamp
+            )
+        """),
+    )
+
+def _load(engine: DBEngine, path: str | PathLike, column_types: dict[str, str],
+          merge_sqls: tuple, params: dict, before_merge: Optional[Callable[[Session], None]],
+          progress: Optional[Progress_t], chunk_size: int) -> tuple[int, int]:
+    create_sql = text(f"""
+        CREATE TEMPORARY TABLE {_STAGING_TABLE}
+        ({', '.join(f'{name} {type_}' for name, type_ in column_types.items())})
+        ON COMMIT DROP
+    """)
+    copy_sql = f'COPY {_STAGING_TABLE} ({", ".join(column_types)}) FROM STDIN WITH (FORMAT csv)'
+
+    read = loaded = 0
+    with engine.new_session() as session:
+        for batch in _iter_batches(path, list(column_types), chunk_size):
+            # A transaction per batch, which may be on another pooled connection, so the staging
+            # table is made for each.
+            session.exec(create_sql)
+            cursor = session.connection().connection.cursor()
+            cursor.copy_expert(copy_sql, io.BytesIO(_to_csv(batch)))
+            if before_merge is not None:
+                before_merge(session)
+            for sql in merge_sqls:
+                result = session.exec(sql, params=params)
+            session.commit()
+
+            read += batch.num_rows
+            # The count of the last statement, which merges the rows.
+            loaded += result.rowcount
+            if progress is not None:
+                progress(read, loaded)
+
+    logger.info(f'Loaded {loaded} of {read} rows from "{path}".')
+    return read, loaded
+
+def _iter_batches(path: str | PathLike, columns: list[str],
+                  chunk_size: int) -> Iterator[pa.RecordBatch]:
+    suffix = Path(path).suffix.lower()
+    if suffix == '.csv':
+        # Read as text, for PostgreSQL to parse, so that types are not inferred per block.
+        with pa.csv.open_csv(
+                path,
+                read_options=pa.csv.ReadOptions(block_size=chunk_size * 256),
+                convert_options=pa.csv.ConvertOptions(
+                    include_columns=columns,
+                    column_types={column: pa.string() for column in columns},
+                    strings_can_be_null=True)) as reader:
+            yield from reader
+    elif suffix == '.parquet':
+        yield from pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_size,
+                                                             columns=columns)
+    elif suffix == '.arrow':
+        with pa.ipc.open_file(path) as reader:
+            for idx in range(reader.num_record_batches):
+                yield reader.get_batch(idx).select(columns)
+    else:
+        raise ServiceCmdError(f'Unable to load "{path}", the file suffix is not one of .csv, '
+                              f'.parquet or .arrow.')
+
+def _get_columns(path: str | PathLike) -> list[str]:
+    suffix = Path(path).suffix.lower()
+    try:
+        if suffix == '.csv':
+            with open(path, newline='') as file:
+                return next(csv.reader(file), [])
+        elif suffix == '.parquet':
+            return pa.parquet.read_schema(path).names
+        elif suffix == '.arrow':
+            with pa.ipc.open_file(path) as reader:
+                return reader.schema.names
+    except (OSError, pa.ArrowInvalid) as err:
+        raise ServiceCmdError(f'Unable to load "{path}": {err}')
+    raise ServiceCmdError(f'Unable to load "{path}", the file suffix is not one of .csv, '
+                          f'.parquet or .arrow.')
+
+def _check_required(column_types: dict[str, str], required: tuple[str, ...],
+                    path: str | PathLike):
+    missing = [column for column in required if column not in column_types]
+    if missing:
+        raise ServiceCmdError(f'Unable to load "{path}", it is missing the columns: '
+                              f'{", ".join(missing)}.')
+
+def _to_csv(batch: pa.RecordBatch) -> bytes:
+    arrays = list()
+    for array in batch.columns:
+        if pa.types.is_list(array.type) or pa.types.is_large_list(array.type):
+            # As a PostgreSQL array, such as "{0,1.5}".
+            array = pc.binary_join_element_wise(
+                '{', pc.binary_join(pc.cast(array, pa.list_(pa.string())), ','), '}', '')
+        arrays.append(array)
+    sink = pa.BufferOutputStream()
+    pa.csv.write_csv(pa.RecordBatch.from_arrays(arrays, names=batch.schema.names), sink,
+                     write_options=pa.csv.WriteOptions(include_header=False,
+                                                       quoting_style='needed'))
+    return sink.getvalue().to_pybytes()
@@ -9,11 +9,17 @@ from .link import *
 
 # Higher level models after lower level models. Alphabetical for neatness within group.
 from .account import Account
+from .counter import DeviceDataPointCount, SessionDataPointCount
 from .datapoint import DataPoint, DataPointMassSensor, DataPointTemperatureSensor
 from .device import Device
 from .gateway import Gateway
+from .membership import SessionDeviceInterval
 from .project import Project
+from .rewrite import DataPointRewrite
+from .rollup import (DataPointMassSensorRollup, DataPointRollup,
+                     DataPointTemperatureSensorRollup)
 from .session import Session
 from .tag import Tag
 from .tare import Tare
+from .thermal import ThermalState
 from .user import User
@@ -7,7 +7,9 @@ from sqlmodel import Field, Relationship
 from .common import BaseTable, BaseNamedTableEngine, SortedTable
 if TYPE_CHECKING:
     from . import Gateway
+from growbies.common.utils.report import short_uuid
 from growbies.common.utils.types import FuzzyID
+from growbies.service.resp import TableResp
 
 class Account(BaseTable, table=True):
     class Key:
@@ -20,7 +22,11 @@ class Account(BaseTable, table=True):
     gateways: list['Gateway'] = Relationship(back_populates='accounts', cascade_delete=True)
 
 class Accounts(SortedTable[Account]):
-    pass
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(), [Account.Key.ID, Account.Key.NAME], align='l')
+
+    def _make_table_row(self, account: Account) -> list:
+        return [short_uuid(account.id), account.name]
 
 class AccountEngine(BaseNamedTableEngine):
     model_class = Account
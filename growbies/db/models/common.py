@@ -1,18 +1,23 @@
-from abc import ABC
+from abc import ABC, abstractmethod
 from enum import StrEnum
-from typing import Any, Generic, Iterator, Optional, TYPE_CHECKING, Type, TypeVar
+from typing import Any, Generic, Iterable, Iterator, Optional, TYPE_CHECKING, Type, TypeVar
 from uuid import UUID
 
-from sqlalchemy import cast, or_
+from sqlalchemy import (case, cast, delete, inspect, literal, literal_column, or_, text, tuple_,
+                        union_all)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
-from sqlalchemy.types import String
-from sqlmodel import SQLModel, select
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.types import Text
+from sqlmodel import Session, SQLModel, select
 
 if TYPE_CHECKING:
     from growbies.db.engine import DBEngine
 from growbies.service.common import (ServiceCmdError, MultipleResultsServiceCmdError,
     NoResultsServiceCmdError)
+from growbies.service.resp import TableResp
 from growbies.common.utils.report import short_uuid, TABLE_COLUMN_WIDTH
+from growbies.common.utils.timestamp import get_utc_dt
 
 class BuiltinTagName(StrEnum):
     CALIBRATION = 'calibration'
@@ -52,6 +57,10 @@ class BaseTableEngine(Generic[TSQLModel], ABC):
         self._engine = engine
 
 class BaseNamedTableEngine(BaseTableEngine):
+    # The entity of the records, such as "device", in the ID index and the entity cache. See
+    # :class:`growbies.db.id_index.IdIndex` and :class:`growbies.db.cache.EntityCache`. Neither is
+    # maintained if None.
+    entity: Optional[str] = None
 
     # def _make_get_stmt(self, fuzzy_id: str | UUID):
     #     return select(self.model_class).where(
@@ -61,12 +70,56 @@ class BaseNamedTableEngine(BaseTableEngine):
     #         )
     #     )
 
+    @property
+    def table_name(self) -> str:
+        return self.model_class.__tablename__
+
+    def init_indexes(self, session: Session, trigram: bool):
+        """
+        Create the indexes backing fuzzy lookups, if they do not exist, see
+        :meth:`_make_get_stmt`.
+
+        :param trigram: Whether the pg_trgm extension is available for the substring match of
+            names.
+        """
+        session.exec(text(f'CREATE INDEX IF NOT EXISTS ix_{self.table_name}_id_text '
+                          f'ON "{self.table_name}" ((id::text) text_pattern_ops)'))
+        if trigram and hasattr(self.model_class, 'name'):
+            session.exec(text(f'CREATE INDEX IF NOT EXISTS ix_{self.table_name}_name_trgm '
+                              f'ON "{self.table_name}" USING gin (name gin_trgm_ops)'))
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    def _make_exact_stmts(self, fuzzy_id: str | UUID) -> list:
+        """
+        Return the statements of exact matches, tried in order before the fuzzy match. These are
+        point lookups.
+        """
+        stmts = list()
+        try:
+            id_ = fuzzy_id if isinstance(fuzzy_id, UUID) else UUID(str(fuzzy_id))
+        except ValueError:
+            pass
+        else:
+            stmts.append(select(self.model_class).where(self.model_class.id == id_))
+        if hasattr(self.model_class, 'name'):
+            stmts.append(select(self.model_class).where(self.model_class.name == str(fuzzy_id)))
+        return stmts
+
     def _make_get_stmt(self, fuzzy_id: str | UUID):
-        conditions = [cast(self.model_class.id, String).ilike(f"{fuzzy_id}%")]
+        """
+        The ID is matched by prefix, using the text_pattern_ops index of its text. UUID text is
+        lower case. The name is matched by substring, using the trigram index if available. See
+        :meth:`init_indexes`.
+        """
+        escaped = self._escape_like(str(fuzzy_id))
+        conditions = [cast(self.model_class.id, Text).like(f'{escaped.lower()}%')]
 
         # Only add 'name' condition if model_class has it
         if hasattr(self.model_class, 'name'):
-            conditions.insert(0, cast(self.model_class.name, String).ilike(f"%{fuzzy_id}%"))
+            conditions.insert(0, self.model_class.name.ilike(f'%{escaped}%'))
 
         return select(self.model_class).where(or_(*conditions))
 
@@ -105,29 +158,124 @@ class BaseNamedTableEngine(BaseTableEngine):
         """
         Search by partial/full id or partial/full name match. The partial must match the
         beginning of the comparison string. Case-insensitive.
+
+        An exact ID or exact name match short-circuits the partial matches.
         """
         with self._engine.new_session() as session:
-            stmt = self._make_get_stmt(fuzzy_id)
-            for rel in relationships:
-                stmt = stmt.options(selectinload(rel))
+            for stmt in (*self._make_exact_stmts(fuzzy_id), self._make_get_stmt(fuzzy_id)):
+                for rel in relationships:
+                    stmt = stmt.options(selectinload(rel))
 
-            result = session.exec(stmt)
-            if hasattr(result, 'scalars'):
-                results = result.scalars().all()
-            else:
-                results = result.all()
+                result = session.exec(stmt)
+                if hasattr(result, 'scalars'):
+                    results = result.scalars().all()
+                else:
+                    results = result.all()
+
+                if results:
+                    break
 
             return results
 
     def _get_one(self, fuzzy_id: str | UUID, *relationships) -> TSQLModel:
         results = self._get_multi(fuzzy_id, *relationships)
+        self._check_one(fuzzy_id, results)
+        return results[0]
+
+    def get_ids(self, fuzzy_ids: Iterable[str | UUID]) -> list[UUID]:
+        """
+        Return the ID of the one record of each fuzzy ID, matched as by :meth:`_get_multi`, in one
+        query.
+        """
+        fuzzy_ids = list(fuzzy_ids)
+        if not fuzzy_ids:
+            return list()
+
+        # Each match is tagged with the index of its fuzzy ID and its order of precedence.
+        selects = list()
+        for idx, fuzzy_id in enumerate(fuzzy_ids):
+            stmts = (*self._make_exact_stmts(fuzzy_id), self._make_get_stmt(fuzzy_id))
+            for precedence, stmt in enumerate(stmts):
+                selects.append(select(literal(idx), literal(precedence), self.model_class.id)
+                               .where(stmt.whereclause))
+
+        with self._engine.new_session() as session:
+            rows = session.exec(union_all(*selects)).all()
+
+        # Fuzzy ID index to the IDs of its first matching statement.
+        matches: dict[int, tuple[int, list[UUID]]] = dict()
+        for idx, precedence, id_ in rows:
+            first = matches.get(idx)
+            if first is None or precedence < first[0]:
+                matches[idx] = (precedence, [id_])
+            elif precedence == first[0]:
+                first[1].append(id_)
+
+        ids = list()
+        for idx, fuzzy_id in enumerate(fuzzy_ids):
+            _, results = matches.get(idx, (None, list()))
+            self._check_one(fuzzy_id, results)
+            ids.append(results[0])
+        return ids
+
+    def _check_one(self, fuzzy_id: str | UUID, results: list):
         if not results:
             raise NoResultsServiceCmdError(f'No results for "{fuzzy_id}" in the '
                                            f'"{self.model_class.__tablename__}" table.')
         elif len(results) > 1:
             raise MultipleResultsServiceCmdError(f'Multiple results for "{fuzzy_id}" in the'
                                                  f'"{self.model_class.__tablename__} table.')
-        return results[0]
+
+    def get_ids_and_names(self) -> list[tuple[UUID, Optional[str]]]:
+        """Return the ID and name of every record, without loading the records."""
+        with self._engine.new_session() as session:
+            return [tuple(row) for row in
+                    session.exec(select(self.model_class.id, self.model_class.name)).all()]
+
+    def _get_one_cached(self, fuzzy_id: str | UUID, *relationships) -> TSQLModel:
+        """
+        As :meth:`_get_one`, served from the entity cache when possible. A copy of the cached record
+        is returned, so that the caller changing it, such as before an upsert that fails, does not
+        change the cached record.
+        """
+        record = self._engine.cache.get(self.entity, fuzzy_id)
+        if record is None:
+            record = self._get_one(fuzzy_id, *relationships)
+            self._populate(record)
+            self._engine.cache.put(self.entity, fuzzy_id, record)
+        return self._copy(record)
+
+    @staticmethod
+    def _copy(record: TSQLModel) -> TSQLModel:
+        """
+        Return a copy of a record, with its loaded relationships and any values set on it that are
+        not columns. Unlike ``model_copy``, the copy has an ORM state of its own, rather than that
+        of the record, which is dropped once the record is.
+        """
+        mapper = inspect(record).mapper
+        copy = type(record)(**{attr.key: getattr(record, attr.key)
+                               for attr in mapper.column_attrs})
+        for key, value in record.__dict__.items():
+            if key in mapper.relationships:
+                set_committed_value(copy, key, value)
+            elif key not in mapper.attrs and not key.startswith('_sa_'):
+                copy.__dict__[key] = value
+        return copy
+
+    def _populate(self, record: TSQLModel):
+        """Set the values of a record read by :meth:`_get_one_cached` that are not columns of its
+        table, before it is cached."""
+
+    def _on_write(self, model: TSQLModel, keys: bool):
+        """
+        Keep the ID index and the entity cache fresh after writing a record.
+
+        :param keys: Whether the record was added or renamed, see
+            :meth:`growbies.db.cache.EntityCache.invalidate`.
+        """
+        if self.entity is not None:
+            self._engine.id_index.upsert(self.entity, model.id, model.name)
+            self._engine.cache.invalidate(self.entity, model.id, keys=keys)
 
     def remove(self, fuzzy_id: str | UUID):
         to_remove = self._get_one(fuzzy_id)
@@ -135,24 +283,96 @@ class BaseNamedTableEngine(BaseTableEngine):
             orm = sess.merge(to_remove)
             sess.delete(orm)
             sess.commit()
+        if self.entity is not None:
+            self._engine.id_index.remove(self.entity, to_remove.id)
+            # Links to the record cascade.
+            self._engine.cache.invalidate(self.entity, to_remove.id, keys=True)
 
     def upsert(self, model: TSQLModel, fields: Optional[dict] = None) -> TSQLModel:
-        try:
-            existing = self._get_one(model.id)
-        except ServiceCmdError:
-            existing = None
+        """
+        Insert the record, else update the fields of the existing record, in one
+        ``INSERT ... ON CONFLICT (id) DO UPDATE`` statement.
 
-        if existing:
-            # Update
-            if fields:
-                for key, value in fields.items():
-                    setattr(existing, key, value)
+        :param fields: Column names to the values to update an existing record with. The existing
+            record is kept as is if None.
+        """
+        columns = self.model_class.__table__.c
+        stmt = pg_insert(self.model_class).values(self._make_insert_values(model))
+        set_ = {key: literal(value, columns[key].type) for key, value in (fields or {}).items()}
+        return self._upsert(stmt, set_, [model.id])[0]
 
-        with self._engine.new_session() as session:
-            orm = session.merge(existing if existing else model)
-            session.commit()
-            session.refresh(orm)
-            return orm
+    def upsert_many(self, models: Iterable[TSQLModel],
+                    keys: Iterable[str] = tuple()) -> list[TSQLModel]:
+        """
+        Insert the records, else update the fields of the existing records to those of the models,
+        in one statement.
+
+        :param keys: Column names of the fields to update existing records with.
+        :return: The records, in no particular order.
+        """
+        models = list(models)
+        if not models:
+            return list()
+        stmt = pg_insert(self.model_class).values(
+            [self._make_insert_values(model) for model in models])
+        return self._upsert(stmt, {key: stmt.excluded[key] for key in keys},
+                            [model.id for model in models])
+
+    def _make_insert_values(self, model: TSQLModel) -> dict[str, Any]:
+        values = dict()
+        for column in self.model_class.__table__.columns:
+            value = getattr(model, column.key, None)
+            if value is None and column.default is not None and column.default.is_scalar:
+                value = column.default.arg
+            values[column.key] = value
+        return values
+
+    def _make_upsert_set(self, set_: dict[str, Any]) -> dict[str, Any]:
+        """
+        Return the SET clause of an upsert, given the expressions of the fields to update. Columns
+        maintained on update, such as by ORM events, which the statement bypasses, are set here.
+        An "updated_at" column is moved only if a field changes.
+        """
+        table = self.model_class.__table__
+        if not set_ or 'updated_at' not in table.c:
+            return set_
+        now = literal(get_utc_dt(), table.c.updated_at.type)
+        changed = tuple_(*(table.c[key] for key in set_)).is_distinct_from(tuple_(*set_.values()))
+        return {**set_, 'updated_at': case((changed, now), else_=table.c.updated_at)}
+
+    def _upsert(self, stmt, set_: dict[str, Any], ids: list[UUID]) -> list[TSQLModel]:
+        table = self.model_class.__table__
+        set_ = self._make_upsert_set(set_)
+        if not set_:
+            # A no-op update, so that the existing record is returned.
+            set_ = {'id': stmt.excluded.id}
+
+        # The subquery reads the snapshot of the statement, that is, the name before the update,
+        # which is NULL for an insert. The row is referenced literally, as RETURNING is not
+        # correlated.
+        old = table.alias('old')
+        old_name = select(old.c.name).where(
+            old.c.id == literal_column(f'"{table.name}".id')).scalar_subquery()
+        stmt = stmt.on_conflict_do_update(index_elements=['id'], set_=set_)
+        stmt = stmt.returning(self.model_class, old_name)
+
+        try:
+            with self._engine.new_session() as session:
+                rows = session.exec(stmt).all()
+                # Kept as returned, rather than expired by the commit.
+                session.expunge_all()
+                session.commit()
+        except Exception:
+            # The models may be cached records, modified ahead of the failed write.
+            for id_ in ids:
+                self._engine.cache.invalidate(self.entity, id_)
+            raise
+
+        orms = list()
+        for orm, old_name in rows:
+            self._on_write(orm, keys=old_name != orm.name)
+            orms.append(orm)
+        return orms
 
 TLink = TypeVar('TLink', bound='BaseLink')
 TLinkEngine = TypeVar('TLinkEngine', bound='BaseLinkEngine')
@@ -167,6 +387,10 @@ class BaseLink(BaseModel, table=False):
 
 class BaseLinkEngine(Generic[TLink], ABC):
     model_class: Type[TLink]
+    # The entities of each side in the entity cache, see
+    # :class:`growbies.db.cache.EntityCache`. Not cached if None.
+    left_entity: Optional[str] = None
+    right_entity: Optional[str] = None
 
     def __init__(self, engine: 'DBEngine'):
         self._engine = engine
@@ -184,27 +408,52 @@ class BaseLinkEngine(Generic[TLink], ABC):
 
     def add(self, left_id: UUID, right_id: UUID):
         """Add a link if it does not already exist."""
-        if self.get(left_id, right_id):
-            return  # already exists
-
-        link = self.model_class(left_id=left_id, right_id=right_id)
+        self.add_many([(left_id, right_id)])
+
+    def add_many(self, pairs: Iterable[tuple[UUID, UUID]]):
+        """Add the links of (left ID, right ID) pairs that do not already exist, in one
+        statement."""
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return
+        stmt = (pg_insert(self.model_class)
+                .values([{'left_id': left_id, 'right_id': right_id}
+                         for left_id, right_id in pairs])
+                .on_conflict_do_nothing()
+                .returning(self.model_class.left_id, self.model_class.right_id))
         with self._engine.new_session() as session:
-            session.add(link)
+            added = [tuple(row) for row in session.exec(stmt).all()]
             session.commit()
+        self._on_write_many(added)
 
     def remove(self, left_id: UUID, right_id: UUID):
         """Remove a link if it exists."""
-        link = self.get(left_id, right_id)
-        if not link:
-            return  # nothing to remove
+        self.remove_many([(left_id, right_id)])
+
+    def remove_many(self, pairs: Iterable[tuple[UUID, UUID]]):
+        """Remove the links of (left ID, right ID) pairs that exist, in one statement."""
+        pairs = list(dict.fromkeys(pairs))
+        if not pairs:
+            return
+        stmt = (delete(self.model_class)
+                .where(tuple_(self.model_class.left_id, self.model_class.right_id).in_(pairs))
+                .returning(self.model_class.left_id, self.model_class.right_id))
         with self._engine.new_session() as session:
-            orm = session.merge(link)
-            session.delete(orm)
+            removed = [tuple(row) for row in session.exec(stmt).all()]
             session.commit()
+        self._on_write_many(removed)
+
+    def _on_write_many(self, pairs: list[tuple[UUID, UUID]]):
+        """Called with the links added or removed."""
+        for left_id, right_id in pairs:
+            # Only the two linked records embed the link, so other records of the entities are
+            # kept.
+            self._engine.cache.invalidate(self.left_entity, left_id, related=False)
+            self._engine.cache.invalidate(self.right_entity, right_id, related=False)
 
 TSortedTable = TypeVar('TSortedTable')
 
-class SortedTable(Generic[TSortedTable]):
+class SortedTable(Generic[TSortedTable], ABC):
     sort_key = 'name'
 
     @classmethod
@@ -242,3 +491,21 @@ class SortedTable(Generic[TSortedTable]):
     def __iter__(self) -> Iterator[TSortedTable]:
         return iter(self._rows)
 
+    @abstractmethod
+    def make_table_resp(self) -> TableResp:
+        """Return the table header, without rows. See :meth:`iter_table_rows`."""
+
+    def iter_table_rows(self) -> Iterator[list]:
+        """Yield each element as a table row made only of plain types."""
+        for element in self._rows:
+            yield self._make_table_row(element)
+
+    @abstractmethod
+    def _make_table_row(self, element: TSortedTable) -> list:
+        ...
+
+    def __str__(self):
+        table = self.make_table_resp()
+        table.extend(self.iter_table_rows())
+        return str(table)
+
@@ -0,0 +1,168 @@
+from datetime import datetime
+from typing import Iterable
+import logging
+import uuid
+
+from sqlalchemy import BigInteger, Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field, Session, text
+
+from .common import BaseModel, BaseTableEngine
+from .membership import MEMBER_SQL
+from growbies.common.utils.types import DeviceID, SessionID
+from growbies.service.common import ServiceOp
+
+logger = logging.getLogger(__name__)
+
+class DeviceDataPointCount(BaseModel, table=True):
+    device_id: uuid.UUID = Field(
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('device.id', ondelete='CASCADE'),
+                         primary_key=True))
+    count: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+class SessionDataPointCount(BaseModel, table=True):
+    session_id: uuid.UUID = Field(
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('session.id', ondelete='CASCADE'),
+                         primary_key=True))
+    count: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+_INCREMENT_DEVICE_SQL = text("""
+    INSERT INTO devicedatapointcount AS c (device_id, count)
+    VALUES (:device_id, 1)
+    ON CONFLICT (device_id) DO UPDATE SET count = c.count + 1
+""")
+
+# The intervals of a device are disjoint per session, so a session is counted at most once.
+_INCREMENT_SESSIONS_SQL = text("""
+    INSERT INTO sessiondatapointcount AS c (session_id, count)
+    SELECT session_id, 1
+    FROM sessiondeviceinterval
+    WHERE device_id = :device_id
+      AND start_time <= :timestamp
+      AND :timestamp < coalesce(end_time, 'infinity')
+    ON CONFLICT (session_id) DO UPDATE SET count = c.count + 1
+    RETURNING session_id, count
+""")
+
+_RECONCILE_DEVICES_SQL = text("""
+    INSERT INTO devicedatapointcount AS c (device_id, count)
+    SELECT device.id, count(dp.id)
+    FROM device
+    LEFT JOIN datapoint dp ON dp.device_id = device.id
+    GROUP BY device.id
+    ON CONFLICT (device_id) DO UPDATE SET count = excluded.count
+""")
+
+_RECONCILE_DEVICE_SQL = text("""
+    INSERT INTO devicedatapointcount AS c (device_id, count)
+    SELECT :device_id, count(*)
+    FROM datapoint
+    WHERE device_id = :device_id
+    ON CONFLICT (device_id) DO UPDATE SET count = excluded.count
+""")
+
+_RECONCILE_SESSION_SQL = text(f"""
+    INSERT INTO sessiondatapointcount AS c (session_id, count)
+    SELECT :session_id, count(*)
+    FROM ({MEMBER_SQL}) member
+    ON CONFLICT (session_id) DO UPDATE SET count = excluded.count
+    RETURNING count
+""")
+
+class CounterEngine(BaseTableEngine):
+    """
+    Maintains the datapoint counts of the devices and the sessions, so that they are read without
+    counting.
+
+    The counts are incremented in the transaction of each datapoint insert, see
+    :meth:`increment`. Other changes to the datapoints of a device or a session recount those
+    changed, such as linking datapoints explicitly by :meth:`reconcile`, importing datapoints by
+    :meth:`reconcile_device`, and removing a device or dropping partitions by
+    :meth:`reconcile_many`.
+    """
+    model_class = SessionDataPointCount
+
+    def init(self):
+        """Count the datapoints of a database made before the counts."""
+        with self._engine.new_session() as session:
+            uncounted = session.exec(text("""
+                SELECT NOT EXISTS (SELECT 1 FROM devicedatapointcount)
+                   AND EXISTS (SELECT 1 FROM datapoint)
+            """)).one()[0]
+        if uncounted:
+            self.reconcile()
+
+    @staticmethod
+    def increment(session: Session, device_id: DeviceID,
+                  timestamp: datetime) -> dict[SessionID, int]:
+        """
+        Count an inserted datapoint, in the transaction of the insert.
+
+        :return: The IDs of the sessions that the datapoint was counted for, to their counts.
+        """
+        params = {'device_id': device_id, 'timestamp': timestamp}
+        session.exec(_INCREMENT_DEVICE_SQL, params=params)
+        return dict(session.exec(_INCREMENT_SESSIONS_SQL, params=params).all())
+
+    def get_device_count(self, device_id: DeviceID) -> int:
+        with self._engine.new_session() as session:
+            count = session.get(DeviceDataPointCount, device_id)
+            return 0 if count is None else count.count
+
+    def get_session_count(self, session_id: SessionID) -> int:
+        with self._engine.new_session() as session:
+            count = session.get(SessionDataPointCount, session_id)
+            return 0 if count is None else count.count
+
+    def reconcile_device(self, device_id: DeviceID):
+        """
+        Recount the datapoints of a device and of the sessions that it is a member of, such as
+        after datapoints of the device are imported. The cached sessions are updated in place.
+        """
+        with self._engine.new_session() as session:
+            session_ids = [row[0] for row in session.exec(text("""
+                SELECT DISTINCT session_id FROM sessiondeviceinterval WHERE device_id = :device_id
+            """), params={'device_id': device_id}).all()]
+        self.reconcile_many([device_id], session_ids)
+
+    def reconcile_many(self, device_ids: Iterable[DeviceID], session_ids: Iterable[SessionID]):
+        """
+        Recount the datapoints of some devices and sessions, in one transaction. The cached
+        sessions are updated in place. Devices and sessions that no longer exist are not counted.
+        """
+        counts = dict()
+        with self._engine.new_session() as session:
+            device_ids = session.exec(text('SELECT id FROM device WHERE id = ANY(:ids)'),
+                                      params={'ids': list(device_ids)}).all()
+            for id_, in device_ids:
+                session.exec(_RECONCILE_DEVICE_SQL, params={'device_id': id_})
+            session_ids = session.exec(text('SELECT id FROM session WHERE id = ANY(:ids)'),
+                                       params={'ids': list(session_ids)}).all()
+            for id_, in session_ids:
+                counts[id_] = session.exec(_RECONCILE_SESSION_SQL,
+                                           params={'session_id': id_}).one()[0]
+            session.commit()
+
+        for id_, count in counts.items():
+            self._engine.cache.update(ServiceOp.SESSION, id_, datapoint_count=count)
+
+    def reconcile(self, session_id: SessionID | None = None):
+        """
+        Recount the datapoints of one session, else of every device and session.
+        """
+        with self._engine.new_session() as session:
+            if session_id is None:
+                session.exec(_RECONCILE_DEVICES_SQL)
+                session_ids = [row[0] for row in
+                               session.exec(text('SELECT id FROM session')).all()]
+            else:
+                session_ids = [session_id]
+            for id_ in session_ids:
+                session.exec(_RECONCILE_SESSION_SQL, params={'session_id': id_})
+            session.commit()
+
+        for id_ in session_ids:
+            self._engine.cache.invalidate(ServiceOp.SESSION, id_, related=False)
+        if session_id is None:
+            logger.info(f'Recounted the datapoints of every device and {len(session_ids)} '
+                        f'sessions.')
@@ -1,25 +1,35 @@
-from sqlalchemy import Index
+from sqlalchemy import ARRAY, ForeignKeyConstraint, Index, Integer, REAL
 
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from enum import StrEnum
 from sqlalchemy import Column, ForeignKey
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.dialects.postgresql import UUID
 from sqlmodel import Field, Relationship, text
-from typing import List, Optional, TYPE_CHECKING
+from typing import Iterator, List, Optional, TYPE_CHECKING
 import logging
 import uuid
 
+import numpy as np
+
 from .common import BaseTable, BaseTableEngine, SortedTable
 from .link import SessionDataPointLink
 if TYPE_CHECKING:
     from .session import Session
+    from growbies.db.engine import DBEngine
 from growbies.protocol.common.read import DataPoint as DeviceDataPoint
 from growbies.protocol.cmd import ReadDeviceCmd
 from growbies.common.utils.types import (DeviceID, TareID)
 from growbies.common.utils import timestamp
+from growbies.service.common import ServiceOp
+from growbies.service.resp import TableResp
 
 logger = logging.getLogger(__name__)
 
+# The default number of datapoints per chunk of :meth:`DataPointEngine.stream_device_datapoints`.
+STREAM_CHUNK_SIZE = 10_000
+
 class DataPoint(BaseTable, table=True):
     class Key(StrEnum):
         ID = 'id'
@@ -29,13 +39,20 @@ class DataPoint(BaseTable, table=True):
         MASS = 'mass'
         TEMPERATURE = 'temperature'
         REF_MASS = 'ref_mass'
+        SENSOR_MASS = 'sensor_mass'
+        SENSOR_MASS_ERROR = 'sensor_mass_error'
+        SENSOR_REF_MASS = 'sensor_ref_mass'
+        SENSOR_TEMPERATURE = 'sensor_temperature'
+        SENSOR_TEMPERATURE_ERROR = 'sensor_temperature_error'
         MASS_SENSORS = 'mass_sensors'
         TEMPERATURE_SENSORS = 'temperature_sensors'
         SESSIONS = 'sessions'
 
-    # Composite index
+    # Composite index. Partitioned by month of timestamp, see
+    # :class:`growbies.db.models.partition.PartitionEngine`.
     __table_args__ = (
         Index("ix_datapoint_device_timestamp", Key.DEVICE_ID, Key.TIMESTAMP),
+        {'postgresql_partition_by': f'RANGE ({Key.TIMESTAMP})'},
     )
 
     id: uuid.UUID | None = Field(default_factory=uuid.uuid4, primary_key=True)
@@ -48,25 +65,68 @@ class DataPoint(BaseTable, table=True):
         sa_column=Column(UUID(as_uuid=True), ForeignKey('tare.id', ondelete='CASCADE'),
                          nullable=False))
 
-    timestamp: datetime = Field(nullable=False)
+    # The partition key, so part of the primary key.
+    timestamp: datetime = Field(primary_key=True)
     mass: float = Field(nullable=False)
     temperature: float = Field(nullable=False)
     ref_mass: float | None = Field(nullable=True)
 
-    # Relationships
+    # The sensor readings, by sensor index. Datapoints recorded before these columns have them
+    # NULL, and their readings as rows of :class:`DataPointMassSensor` and
+    # :class:`DataPointTemperatureSensor` instead, until migrated, see
+    # :meth:`DataPointEngine.migrate_sensor_arrays`.
+    sensor_mass: Optional[list[float]] = Field(default=None, sa_column=Column(ARRAY(REAL)))
+    sensor_mass_error: Optional[list[Optional[int]]] = Field(default=None,
+                                                             sa_column=Column(ARRAY(Integer)))
+    sensor_ref_mass: Optional[list[Optional[float]]] = Field(default=None,
+                                                             sa_column=Column(ARRAY(REAL)))
+    sensor_temperature: Optional[list[float]] = Field(default=None, sa_column=Column(ARRAY(REAL)))
+    sensor_temperature_error: Optional[list[Optional[int]]] = Field(
+        default=None, sa_column=Column(ARRAY(Integer)))
+
+    # Relationships, of the sensor readings of datapoints recorded before the sensor arrays, see
+    # :meth:`expand_sensor_arrays`.
     mass_sensors: list['DataPointMassSensor'] = Relationship(
         back_populates='datapoint',
         sa_relationship_kwargs={'order_by': lambda: DataPointMassSensor.idx})
     temperature_sensors: list['DataPointTemperatureSensor'] = Relationship(
         back_populates='datapoint',
         sa_relationship_kwargs={'order_by': lambda: DataPointTemperatureSensor.idx})
-    sessions: List['Session'] = Relationship(back_populates='datapoints',
-                                             link_model=SessionDataPointLink)
+    sessions: List['Session'] = Relationship(
+        back_populates='datapoints', link_model=SessionDataPointLink,
+        sa_relationship_kwargs={
+            # The link does not reference the datapoint by foreign key, see
+            # :class:`SessionDataPointLink`.
+            'primaryjoin': 'DataPoint.id == foreign(SessionDataPointLink.right_id)',
+            'secondaryjoin': 'foreign(SessionDataPointLink.left_id) == Session.id',
+        })
+
+    def expand_sensor_arrays(self):
+        """
+        Present the sensor arrays as the sensor relationships, for code reading those. This is a
+        read path only, the sensor rows made are not added to the database.
+        """
+        if self.sensor_mass is not None:
+            set_committed_value(self, self.Key.MASS_SENSORS, [
+                DataPointMassSensor(datapoint_id=self.id, timestamp=self.timestamp, idx=idx,
+                                    mass=mass, error=_get_at(self.sensor_mass_error, idx),
+                                    ref_mass=_get_at(self.sensor_ref_mass, idx))
+                for idx, mass in enumerate(self.sensor_mass)])
+        if self.sensor_temperature is not None:
+            set_committed_value(self, self.Key.TEMPERATURE_SENSORS, [
+                DataPointTemperatureSensor(datapoint_id=self.id, timestamp=self.timestamp, idx=idx,
+                                           temperature=temperature,
+                                           error=_get_at(self.sensor_temperature_error, idx))
+                for idx, temperature in enumerate(self.sensor_temperature)])
+
+def _get_at(values: Optional[list], idx: int):
+    return values[idx] if values is not None and idx < len(values) else None
 
 class DataPointMassSensor(BaseTable, table=True):
     class Key(StrEnum):
         ID = 'id'
         DATAPOINT_ID = 'datapoint_id'
+        TIMESTAMP = 'timestamp'
         IDX = 'idx'
         TEMPERATURE = 'temperature'
         ERROR = 'error'
@@ -79,13 +139,15 @@ class DataPointMassSensor(BaseTable, table=True):
             Key.DATAPOINT_ID,
             Key.IDX,
         ),
+        ForeignKeyConstraint([Key.DATAPOINT_ID, Key.TIMESTAMP],
+                             ['datapoint.id', 'datapoint.timestamp'], ondelete='CASCADE'),
+        {'postgresql_partition_by': f'RANGE ({Key.TIMESTAMP})'},
     )
 
     id: uuid.UUID | None = Field(default_factory=uuid.uuid4, primary_key=True)
-    datapoint_id: Optional[uuid.UUID] = Field(
-        sa_column=Column(UUID(as_uuid=True), ForeignKey('datapoint.id', ondelete='CASCADE'),
-                         nullable=False)
-    )
+    datapoint_id: uuid.UUID = Field(nullable=False)
+    # Of the datapoint, the partition key.
+    timestamp: datetime = Field(primary_key=True)
     idx: int = Field(nullable=False)
     mass: float = Field(nullable=False)
     error: int | None = Field(nullable=True)
@@ -97,6 +159,7 @@ class DataPointTemperatureSensor(BaseTable, table=True):
     class Key(StrEnum):
         ID = 'id'
         DATAPOINT_ID = 'datapoint_id'
+        TIMESTAMP = 'timestamp'
         IDX = 'idx'
         TEMPERATURE = 'temperature'
         ERROR = 'error'
@@ -108,27 +171,236 @@ class DataPointTemperatureSensor(BaseTable, table=True):
             Key.DATAPOINT_ID,
             Key.IDX,
         ),
+        ForeignKeyConstraint([Key.DATAPOINT_ID, Key.TIMESTAMP],
+                             ['datapoint.id', 'datapoint.timestamp'], ondelete='CASCADE'),
+        {'postgresql_partition_by': f'RANGE ({Key.TIMESTAMP})'},
     )
 
     id: uuid.UUID | None = Field(default_factory=uuid.uuid4, primary_key=True)
-    datapoint_id: uuid.UUID = Field(
-        sa_column=Column(UUID(as_uuid=True), ForeignKey('datapoint.id', ondelete='CASCADE'),
-                         nullable=False)
-    )
+    datapoint_id: uuid.UUID = Field(nullable=False)
+    # Of the datapoint, the partition key.
+    timestamp: datetime = Field(primary_key=True)
     idx: int = Field(nullable=False)
     temperature: float = Field(nullable=False)
     error: int | None = Field(nullable=True)
 
     datapoint: DataPoint | None = Relationship(back_populates='temperature_sensors')
 
+#: The tables of the sensor readings recorded as rows, before the sensor arrays.
+SENSOR_TABLES = (DataPointMassSensor.__tablename__, DataPointTemperatureSensor.__tablename__)
+
+def sensor_join(sensor: str, partitioned: bool = True) -> str:
+    """
+    Return the condition joining the sensor readings recorded as rows, aliased as given, to their
+    datapoint, "dp". By the partition key too, so that only the partition of the datapoint is
+    read. The sensor tables of a database not yet partitioned have no timestamp, see
+    :meth:`growbies.db.models.partition.PartitionEngine.migrate`.
+    """
+    if partitioned:
+        return f'{sensor}.datapoint_id = dp.id AND {sensor}.timestamp = dp.timestamp'
+    return f'{sensor}.datapoint_id = dp.id'
 
 class DataPoints(SortedTable[DataPoint]):
     sort_key = None
 
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(),
+                         [DataPoint.Key.TIMESTAMP, DataPoint.Key.MASS, DataPoint.Key.TEMPERATURE,
+                          DataPoint.Key.REF_MASS])
+
+    def _make_table_row(self, datapoint: DataPoint) -> list:
+        return [datapoint.timestamp, datapoint.mass, datapoint.temperature, datapoint.ref_mass]
+
+@dataclass
+class DataPointColumns:
+    """
+    Datapoints as arrays, ordered by timestamp, for analysis. Each has a row per datapoint, and the
+    sensor matrices a column per sensor index. Missing values, such as of a sensor that a
+    datapoint has no reading for, are NaN.
+    """
+    timestamp: np.ndarray
+    mass: np.ndarray
+    temperature: np.ndarray
+    ref_mass: np.ndarray
+    sensor_mass: np.ndarray
+    sensor_ref_mass: np.ndarray
+    sensor_mass_error: np.ndarray
+    sensor_temperature: np.ndarray
+    sensor_temperature_error: np.ndarray
+    # The values of the tare of each datapoint, a column per tare value.
+    tare: np.ndarray
+
+    @staticmethod
+    def make_sql(where: str, join: str = '', legacy: bool = True, partitioned: bool = True):
+        """
+        Return the SQL that reads datapoints as rows for :meth:`from_rows`, ordered by timestamp.
+        The sensor readings of datapoints recorded as rows are aggregated in the database, and the
+        tare joined, so that one lean row is read per datapoint.
+
+        :param where: The condition on the datapoints, "dp".
+        :param join: Any joins the condition needs.
+        :param legacy: Whether to read the sensor readings recorded as rows too, see
+            :attr:`DataPointEngine.has_sensor_tables`.
+        :param partitioned: Whether the sensor tables are partitioned, see :func:`sensor_join`.
+        """
+        def sensor(column: str, legacy_column: str) -> str:
+            if legacy:
+                return f'coalesce(dp.{column}, {legacy_column}) AS {column}'
+            return f'dp.{column}'
+
+        legacy_joins = f"""
+            LEFT JOIN LATERAL (
+                SELECT
+                    array_agg(mass ORDER BY idx) AS mass,
+                    array_agg(ref_mass ORDER BY idx) AS ref_mass,
+                    array_agg(error ORDER BY idx) AS error
+                FROM datapointmasssensor sensor
+                WHERE dp.sensor_mass IS NULL
+                  AND {sensor_join('sensor', partitioned)}
+            ) ms ON true
+            LEFT JOIN LATERAL (
+                SELECT
+                    array_agg(temperature ORDER BY idx) AS temperature,
+                    array_agg(error ORDER BY idx) AS error
+                FROM datapointtemperaturesensor sensor
+                WHERE dp.sensor_temperature IS NULL
+                  AND {sensor_join('sensor', partitioned)}
+            ) ts ON true""" if legacy else ''
+
+        return text(f"""
+            SELECT
+                dp.timestamp,
+                dp.device_id,
+                dp.mass,
+                dp.temperature,
+                dp.ref_mass,
+                {sensor(DataPoint.Key.SENSOR_MASS, 'ms.mass')},
+                {sensor(DataPoint.Key.SENSOR_REF_MASS, 'ms.ref_mass')},
+                {sensor(DataPoint.Key.SENSOR_MASS_ERROR, 'ms.error')},
+                {sensor(DataPoint.Key.SENSOR_TEMPERATURE, 'ts.temperature')},
+                {sensor(DataPoint.Key.SENSOR_TEMPERATURE_ERROR, 'ts.error')},
+                tare.values AS tare
+            FROM datapoint dp
+            {join}
+            JOIN tare
+                ON tare.id = dp.tare_id{legacy_joins}
+            WHERE {where}
+            ORDER BY dp.timestamp
+        """)
+
+    @classmethod
+    def from_rows(cls, rows) -> 'DataPointColumns':
+        """
+        :param rows: Rows with the fields of this class, the sensor fields being lists ordered
+            by sensor index.
+        """
+        return cls(
+            # NumPy datetimes have no time zone, so timestamps are in UTC.
+            timestamp=np.fromiter(
+                (row.timestamp.astimezone(timezone.utc).replace(tzinfo=None) for row in rows),
+                dtype='datetime64[ms]', count=len(rows)),
+            mass=cls._to_array([row.mass for row in rows]),
+            temperature=cls._to_array([row.temperature for row in rows]),
+            ref_mass=cls._to_array([row.ref_mass for row in rows]),
+            sensor_mass=cls._to_matrix([row.sensor_mass for row in rows]),
+            sensor_ref_mass=cls._to_matrix([row.sensor_ref_mass for row in rows]),
+            sensor_mass_error=cls._to_matrix([row.sensor_mass_error for row in rows]),
+            sensor_temperature=cls._to_matrix([row.sensor_temperature for row in rows]),
+            sensor_temperature_error=cls._to_matrix(
+                [row.sensor_temperature_error for row in rows]),
+            tare=cls._to_matrix([row.tare for row in rows]),
+        )
+
+    @property
+    def mass_sensor_count(self) -> int:
+        return self.sensor_mass.shape[1]
+
+    @property
+    def temperature_sensor_count(self) -> int:
+        return self.sensor_temperature.shape[1]
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @staticmethod
+    def _to_array(values: list) -> np.ndarray:
+        # None converts to NaN.
+        return np.array(values, dtype=float)
+
+    @classmethod
+    def _to_matrix(cls, rows: list[Optional[list]]) -> np.ndarray:
+        width = max((len(row) for row in rows if row), default=0)
+        if all(row and len(row) == width for row in rows):
+            return cls._to_array(rows).reshape(len(rows), width)
+        matrix = np.full((len(rows), width), np.nan)
+        for idx, row in enumerate(rows):
+            if row:
+                matrix[idx, :len(row)] = cls._to_array(row)
+        return matrix
+
+_SENSOR_ARRAY_COLUMNS = tuple(DataPoint.__table__.c[key] for key in (
+    DataPoint.Key.SENSOR_MASS, DataPoint.Key.SENSOR_MASS_ERROR, DataPoint.Key.SENSOR_REF_MASS,
+    DataPoint.Key.SENSOR_TEMPERATURE, DataPoint.Key.SENSOR_TEMPERATURE_ERROR))
+
+_MIGRATE_SENSOR_ARRAYS_SQLS = (
+    text("""
+        UPDATE datapoint dp
+        SET sensor_mass = ms.mass, sensor_mass_error = ms.error, sensor_ref_mass = ms.ref_mass
+        FROM (
+            SELECT datapoint_id, timestamp,
+                array_agg(mass ORDER BY idx) AS mass,
+                array_agg(error ORDER BY idx) AS error,
+                array_agg(ref_mass ORDER BY idx) AS ref_mass
+            FROM datapointmasssensor
+            WHERE timestamp >= :start_time AND timestamp < :end_time
+            GROUP BY datapoint_id, timestamp
+        ) ms
+        WHERE dp.id = ms.datapoint_id AND dp.timestamp = ms.timestamp
+    """),
+    text("""
+        UPDATE datapoint dp
+        SET sensor_temperature = ts.temperature, sensor_temperature_error = ts.error
+        FROM (
+            SELECT datapoint_id, timestamp,
+                array_agg(temperature ORDER BY idx) AS temperature,
+                array_agg(error ORDER BY idx) AS error
+            FROM datapointtemperaturesensor
+            WHERE timestamp >= :start_time AND timestamp < :end_time
+            GROUP BY datapoint_id, timestamp
+        ) ts
+        WHERE dp.id = ts.datapoint_id AND dp.timestamp = ts.timestamp
+    """),
+    text("""
+        DELETE FROM datapointmasssensor
+        WHERE timestamp >= :start_time AND timestamp < :end_time
+    """),
+    text("""
+        DELETE FROM datapointtemperaturesensor
+        WHERE timestamp >= :start_time AND timestamp < :end_time
+    """),
+)
+
 # --- Engine for inserting datapoints ---
 class DataPointEngine(BaseTableEngine):
     model_class = DataPoint
 
+    def __init__(self, engine: 'DBEngine'):
+        super().__init__(engine)
+        self._has_sensor_tables: Optional[bool] = None
+
+    @property
+    def has_sensor_tables(self) -> bool:
+        """
+        Whether the database has the sensor tables, of the readings recorded before the sensor
+        arrays. They are only dropped explicitly, see :meth:`migrate_sensor_arrays`.
+        """
+        if self._has_sensor_tables is None:
+            with self._engine.new_session() as session:
+                self._has_sensor_tables = session.exec(text(
+                    f"SELECT to_regclass('{DataPointMassSensor.__tablename__}') IS NOT NULL"
+                )).one()[0]
+        return self._has_sensor_tables
+
     def get_device_datapoints(
             self,
             device_id,
@@ -181,7 +453,8 @@ class DataPointEngine(BaseTableEngine):
             if not datapoint_rows:
                 return [], [], []
 
-            mass_sensor_sql = text("""
+            partitioned = self._engine.partition.partitioned
+            legacy_mass_sql = f"""
                 SELECT
                     dp.timestamp,
                     ms.idx,
@@ -189,12 +462,25 @@ class DataPointEngine(BaseTableEngine):
                     ms.error,
                     ms.ref_mass
                 FROM datapointmasssensor ms
-                JOIN datapoint dp
-                    ON dp.id = ms.datapoint_id
+                JOIN datapoint dp ON {sensor_join('ms', partitioned)}
+                WHERE dp.device_id = :device_id
+                  AND dp.timestamp >= :start_time
+                  AND dp.timestamp <= :end_time
+                UNION ALL""" if self.has_sensor_tables else ''
+            mass_sensor_sql = text(f"""{legacy_mass_sql}
+                SELECT
+                    dp.timestamp,
+                    ms.idx - 1,
+                    ms.mass,
+                    ms.error,
+                    ms.ref_mass
+                FROM datapoint dp
+                CROSS JOIN LATERAL unnest(dp.sensor_mass, dp.sensor_mass_error, dp.sensor_ref_mass)
+                    WITH ORDINALITY AS ms(mass, error, ref_mass, idx)
                 WHERE dp.device_id = :device_id
                   AND dp.timestamp >= :start_time
                   AND dp.timestamp <= :end_time
-                ORDER BY dp.timestamp, ms.idx
+                ORDER BY timestamp, idx
             """)
 
             mass_sensor_rows = session.exec(
@@ -206,19 +492,31 @@ class DataPointEngine(BaseTableEngine):
                 },
             ).all()
 
-            temperature_sensor_sql = text("""
+            legacy_temperature_sql = f"""
                 SELECT
                     dp.timestamp,
                     ts.idx,
                     ts.temperature,
                     ts.error
                 FROM datapointtemperaturesensor ts
-                JOIN datapoint dp
-                    ON dp.id = ts.datapoint_id
+                JOIN datapoint dp ON {sensor_join('ts', partitioned)}
                 WHERE dp.device_id = :device_id
                   AND dp.timestamp >= :start_time
                   AND dp.timestamp <= :end_time
-                ORDER BY dp.timestamp, ts.idx
+                UNION ALL""" if self.has_sensor_tables else ''
+            temperature_sensor_sql = text(f"""{legacy_temperature_sql}
+                SELECT
+                    dp.timestamp,
+                    ts.idx - 1,
+                    ts.temperature,
+                    ts.error
+                FROM datapoint dp
+                CROSS JOIN LATERAL unnest(dp.sensor_temperature, dp.sensor_temperature_error)
+                    WITH ORDINALITY AS ts(temperature, error, idx)
+                WHERE dp.device_id = :device_id
+                  AND dp.timestamp >= :start_time
+                  AND dp.timestamp <= :end_time
+                ORDER BY timestamp, idx
             """)
 
             temperature_sensor_rows = session.exec(
@@ -236,11 +534,108 @@ class DataPointEngine(BaseTableEngine):
                 temperature_sensor_rows,
             )
 
+    def stream_device_datapoints(
+            self,
+            device_id: DeviceID,
+            start_time: Optional[datetime],
+            end_time: Optional[datetime],
+            chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Iterator[DataPointColumns]:
+        """
+        As :meth:`get_device_datapoints`, in bounded memory, for arbitrarily long time ranges.
+
+        Rows are read through a server side cursor, and yielded in chunks of up to chunk_size
+        datapoints. The aggregate and per-sensor arrays of each chunk are aligned, a row per
+        datapoint. The number of sensor columns may differ between chunks.
+        """
+        if start_time is None:
+            start_time = timestamp.get_utc_dt(0)
+
+        if end_time is None:
+            end_time = timestamp.get_utc_dt()
+
+        datapoint_sql = DataPointColumns.make_sql("""
+                dp.device_id = :device_id
+                AND dp.timestamp >= :start_time
+                AND dp.timestamp <= :end_time""", legacy=self.has_sensor_tables,
+            partitioned=self._engine.partition.partitioned)
+
+        with self._engine.new_session() as session:
+            result = session.exec(
+                datapoint_sql,
+                params={
+                    "device_id": device_id,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                },
+                execution_options={'stream_results': True, 'max_row_buffer': chunk_size},
+            )
+            for rows in result.partitions(chunk_size):
+                yield DataPointColumns.from_rows(rows)
+
+    def init_sensor_arrays(self):
+        """Add the sensor array columns to a datapoint table made before them."""
+        with self._engine.new_session() as session:
+            for column in _SENSOR_ARRAY_COLUMNS:
+                session.exec(text(f'ALTER TABLE datapoint ADD COLUMN IF NOT EXISTS {column.name} '
+                                  f'{column.type.compile(dialect=session.bind.dialect)}'))
+            session.commit()
+
+    def migrate_sensor_arrays(self, drop: bool = False):
+        """
+        Move the sensor readings recorded as rows into the sensor arrays of their datapoints, a
+        month at a time. This is run by "python -m growbies.db sensor_arrays", on a partitioned
+        database, see :meth:`growbies.db.models.partition.PartitionEngine.migrate`.
+
+        :param drop: Then drop the sensor tables, which are not made again. This is not
+            reversible, and is for when the service is stopped, as it reads the tables if it found
+            them at start.
+        """
+        if not self.has_sensor_tables:
+            logger.info('The sensor tables have been dropped.')
+            return
+        if not self._engine.partition.is_partitioned:
+            logger.warning('The datapoint tables are not partitioned, run '
+                           '"python -m growbies.db partition" first.')
+            return
+
+        with self._engine.new_session() as session:
+            start_time, end_time = session.exec(text("""
+                SELECT min(timestamp), max(timestamp) FROM (
+                    SELECT timestamp FROM datapointmasssensor
+                    UNION ALL
+                    SELECT timestamp FROM datapointtemperaturesensor
+                ) sensor
+            """)).one()
+        if start_time is None:
+            logger.info('No sensor readings are recorded as rows.')
+        else:
+            month_start = timestamp.get_utc_dt(start_time).replace(
+                day=1, hour=0, minute=0, second=0, microsecond=0)
+            while month_start <= end_time:
+                month_end = (month_start + timedelta(days=32)).replace(day=1)
+                params = {'start_time': month_start, 'end_time': month_end}
+                with self._engine.new_session() as session:
+                    for sql in _MIGRATE_SENSOR_ARRAYS_SQLS:
+                        session.exec(sql, params=params)
+                    session.commit()
+                logger.info(f'Migrated the sensor readings of {month_start:%Y-%m} to arrays.')
+                month_start = month_end
+
+        if drop:
+            with self._engine.new_session() as session:
+                for table in SENSOR_TABLES:
+                    session.exec(text(f'DROP TABLE IF EXISTS {table}'))
+                session.commit()
+            self._has_sensor_tables = False
+            logger.info('Dropped the sensor tables.')
+
     def insert(self, device_id: DeviceID, tare_id: TareID, device_dp: DeviceDataPoint,
                cmd: ReadDeviceCmd | None) -> DataPoint:
+        self._engine.partition.ensure(device_dp.timestamp)
         with self._engine.new_session() as session:
 
-            # --- Insert main DataPoint row ---
+            # --- Insert the DataPoint row, with its sensor arrays ---
             dp_row = self.model_class(
                 timestamp=device_dp.timestamp,
                 device_id=device_id,
@@ -248,46 +643,27 @@ class DataPointEngine(BaseTableEngine):
                 tare_id=tare_id,
                 temperature=device_dp.temperature,
                 ref_mass=cmd.ref_mass if cmd and cmd.ref_mass is not None else None,
+                sensor_mass=list(device_dp.mass_sensors),
+                sensor_mass_error=[device_dp.get_mass_error_at_idx(idx)
+                                   for idx in range(len(device_dp.mass_sensors))],
+                sensor_ref_mass=[_get_at(cmd.sensor_ref_mass if cmd else None, idx)
+                                 for idx in range(len(device_dp.mass_sensors))],
+                sensor_temperature=list(device_dp.temperature_sensors),
+                sensor_temperature_error=[device_dp.get_temperature_error_at_idx(idx)
+                                          for idx in range(len(device_dp.temperature_sensors))],
             )
             session.add(dp_row)
-            session.commit()
-            session.refresh(dp_row)
+            session.flush()
 
-            # --- Bulk insert per-sensor mass rows ---
-            mass_rows = []
-            for idx, mass in enumerate(device_dp.mass_sensors):
-                sensor_ref = None
-                if cmd and cmd.sensor_ref_mass is not None:
-                    # Only assign if list is long enough and element is not None
-                    if idx < len(cmd.sensor_ref_mass):
-                        sensor_ref = cmd.sensor_ref_mass[idx]
-
-                mass_rows.append(
-                    DataPointMassSensor(
-                        datapoint_id=dp_row.id,
-                        idx=idx,
-                        mass=mass,
-                        error=device_dp.get_mass_error_at_idx(idx),
-                        ref_mass=sensor_ref,
-                    )
-                )
-
-            session.add_all(mass_rows)
-
-            # --- Bulk insert per-sensor temperature rows ---
-            temp_rows = [
-                DataPointTemperatureSensor(
-                    datapoint_id=dp_row.id,
-                    idx=idx,
-                    temperature=temp,
-                    error=device_dp.get_temperature_error_at_idx(idx),
-                )
-                for idx, temp in enumerate(device_dp.temperature_sensors)
-            ]
-            session.add_all(temp_rows)
+            self._engine.rollup.update(session, dp_row)
+            counts = self._engine.counter.increment(session, device_id, dp_row.timestamp)
 
             session.commit()
             session.refresh(dp_row)
-            return dp_row
+        # Cached sessions embed their datapoint count. Active sessions are read the most, so their
+        # counts are updated rather than the sessions dropped.
+        for session_id, count in counts.items():
+            self._engine.cache.update(ServiceOp.SESSION, session_id, datapoint_count=count)
+        return dp_row
 
 
@@ -3,10 +3,9 @@ from typing import Optional, TYPE_CHECKING
 import logging
 import uuid
 
-from prettytable import PrettyTable
-from sqlalchemy import cast, Column, Integer, ForeignKey, or_, String, select
+from sqlalchemy import cast, Column, func, Integer, ForeignKey, or_, String, select, text, Text
 from sqlalchemy.dialects.postgresql import UUID
-from sqlmodel import Field, Relationship
+from sqlmodel import Field, Relationship, Session as DBSession
 
 from .common import BaseTable, BaseNamedTableEngine, SortedTable
 from .gateway import Gateway
@@ -15,6 +14,8 @@ if TYPE_CHECKING:
     from .session import Session
 from growbies.common.utils.report import format_8bit_binary, short_uuid
 from growbies.common.utils.types import Serial_t
+from growbies.service.common import NoResultsServiceCmdError, ServiceOp
+from growbies.service.resp import TableResp
 
 logger = logging.getLogger(__name__)
 
@@ -96,82 +97,118 @@ class Devices(SortedTable[Device]):
                 return device
         return None
 
-    def __str__(self):
-        table = PrettyTable((Device.Key.ID, Device.Key.NAME, Device.Key.SERIAL, Device.Key.STATE,
-                             f'{Device.Key.VID}:{Device.Key.PID}', Device.Key.PATH),
-                            title=self.table_name())
-        for device in self._rows:
-            if device.name == str(device.id):
-                device_name = short_uuid(device.name)
-            else:
-                device_name = device.name
-            table.add_row([short_uuid(device.id), device_name, device.serial,
-                           f'{format_8bit_binary(device.state)}',
-                           f'{device.vid:04x}:{device.pid:04x}',
-                           device.path])
-        return str(table)
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(),
+                         [Device.Key.ID, Device.Key.NAME, Device.Key.SERIAL, Device.Key.STATE,
+                          f'{Device.Key.VID}:{Device.Key.PID}', Device.Key.PATH])
+
+    def _make_table_row(self, device: Device) -> list:
+        if device.name == str(device.id):
+            device_name = short_uuid(device.name)
+        else:
+            device_name = device.name
+        return [short_uuid(device.id), device_name, device.serial,
+                f'{format_8bit_binary(device.state)}',
+                f'{device.vid:04x}:{device.pid:04x}',
+                device.path]
+
+# The sessions that count datapoints of a device, by membership or by explicit link.
+_DEVICE_SESSIONS_SQL = text("""
+    SELECT session_id FROM sessiondeviceinterval WHERE device_id = :device_id
+    UNION
+    SELECT link.left_id
+    FROM sessiondatapointlink link
+    JOIN datapoint dp ON dp.id = link.right_id
+    WHERE dp.device_id = :device_id
+""")
 
 class DeviceEngine(BaseNamedTableEngine):
     model_class = Device
+    entity = ServiceOp.DEVICE
 
     def get(self, fuzzy_id: str | UUID) -> Device:
-        return self._get_one(fuzzy_id, Device.gateways, Device.sessions)
+        return self._get_one_cached(fuzzy_id, Device.gateways, Device.sessions)
 
     def init_start_connection(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state &= ~ConnectionState.ERROR
-        existing.state &= ~ConnectionState.CONNECTED
-        self.upsert(existing)
+        self.transition(id_, clear=ConnectionState.ERROR | ConnectionState.CONNECTED)
 
     def list(self) -> Devices:
         return Devices(self._get_all(Device.gateways, Device.sessions))
 
+    def remove(self, fuzzy_id: str | UUID):
+        device = self._get_one(fuzzy_id)
+        # The datapoints of the device cascade, and with them, from the counts of its sessions.
+        with self._engine.new_session() as session:
+            session_ids = [row[0] for row in session.exec(_DEVICE_SESSIONS_SQL,
+                                                          params={'device_id': device.id}).all()]
+        super().remove(device.id)
+        self._engine.counter.reconcile_many((), session_ids)
+
     def merge_with_discovered(self, discovered_devices: Devices) -> Devices:
         merged_devices = self._merge_with_discovered(discovered_devices)
-        for device in merged_devices:
-            self._overwrite(device)
+        self.upsert_many(merged_devices,
+                         [column.key for column in Device.__table__.columns
+                          if column.key != Device.Key.ID])
         return Devices(elements=[dev for dev in merged_devices])
 
     def upsert(self, model: Device, fields: Optional[dict] = None) -> Device:
         return super().upsert(model, {Device.Key.NAME: model.name, Device.Key.STATE: model.state})
 
     def clear_active(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state &= ~ConnectionState.ACTIVE
-        self.upsert(existing)
+        self.transition(id_, clear=ConnectionState.ACTIVE)
 
     def set_active(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state |= ConnectionState.ACTIVE
-        self.upsert(existing)
+        self.transition(id_, set_=ConnectionState.ACTIVE)
 
     def clear_connected(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state &= ~ConnectionState.CONNECTED
-        self.upsert(existing)
+        self.transition(id_, clear=ConnectionState.CONNECTED)
 
     def set_connected(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state |= ConnectionState.CONNECTED
-        self.upsert(existing)
+        self.transition(id_, set_=ConnectionState.CONNECTED)
 
     def clear_error(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state &= ~ConnectionState.ERROR
-        self.upsert(existing)
+        self.transition(id_, clear=ConnectionState.ERROR)
 
     def set_error(self, id_: UUID):
-        existing = self.get(id_)
-        existing.state |= ConnectionState.ERROR
-        self.upsert(existing)
+        self.transition(id_, set_=ConnectionState.ERROR)
+
+    def transition(self, id_: UUID, set_: ConnectionState = ConnectionState.INITIAL,
+                   clear: ConnectionState = ConnectionState.INITIAL) -> ConnectionState:
+        """
+        Clear and then set state flags of a device, atomically, in one statement.
+
+        :return: The new state.
+        """
+        with self._engine.new_session() as session:
+            state = session.exec(text(f"""
+                UPDATE "{self.table_name}"
+                SET state = (state & ~CAST(:clear AS integer)) | :set
+                WHERE id = :id
+                RETURNING state
+            """), params={'id': id_, 'clear': int(clear), 'set': int(set_)}).first()
+            if state is None:
+                raise NoResultsServiceCmdError(f'No results for "{id_}" in the '
+                                               f'"{self.table_name}" table.')
+            session.commit()
+        self._engine.cache.invalidate(self.entity, id_)
+        return ConnectionState(state[0])
+
+    def init_indexes(self, session: DBSession, trigram: bool):
+        super().init_indexes(session, trigram)
+        session.exec(text(f'CREATE INDEX IF NOT EXISTS ix_{self.table_name}_serial_lower '
+                          f'ON "{self.table_name}" ((lower(serial)) text_pattern_ops)'))
+
+    def _make_exact_stmts(self, fuzzy_id: str | UUID) -> list:
+        return [*super()._make_exact_stmts(fuzzy_id),
+                select(self.model_class).where(self.model_class.serial == str(fuzzy_id))]
 
     def _make_get_stmt(self, fuzzy_id: str | UUID):
-        fuzzy_id  = str(fuzzy_id)
+        escaped  = self._escape_like(str(fuzzy_id))
         return select(self.model_class).where(
             or_(
-                cast(self.model_class.id, String).ilike(f"{fuzzy_id}%"),
-                cast(self.model_class.serial, String).ilike(f"{fuzzy_id}%"),
-                cast(self.model_class.name, String).ilike(f"%{fuzzy_id}%"),
+                cast(self.model_class.id, Text).like(f"{escaped.lower()}%"),
+                func.lower(self.model_class.serial).like(f"{escaped.lower()}%"),
+                self.model_class.name.ilike(f"%{escaped}%"),
             )
         )
     def _merge_with_discovered(self, discovered_devices: Devices) -> Devices:
@@ -197,10 +234,3 @@ class DeviceEngine(BaseNamedTableEngine):
             merged_devices.append(discovered_devices.get_by_serial(serial))
 
         return merged_devices
-
-    def _overwrite(self, device: Device) -> Device:
-        with self._engine.new_session() as db_sess:
-            merged = db_sess.merge(device)  # either updates existing or inserts
-            db_sess.commit()  # ensure it persists
-            db_sess.refresh(merged)
-            return merged
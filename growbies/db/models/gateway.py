@@ -10,7 +10,9 @@ from .common import BaseTable, BaseNamedTableEngine, SortedTable
 if TYPE_CHECKING:
     from .account import Account
     from .device import Device
+from growbies.common.utils.report import short_uuid
 from growbies.common.utils.types import FuzzyID
+from growbies.service.resp import TableResp
 
 class Gateway(BaseTable, table=True):
     class Key:
@@ -36,7 +38,11 @@ class Gateway(BaseTable, table=True):
     devices: list['Device'] = Relationship(back_populates='gateways', cascade_delete=True)
 
 class Gateways(SortedTable[Gateway]):
-    pass
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(), [Gateway.Key.ID, Gateway.Key.NAME], align='l')
+
+    def _make_table_row(self, gateway: Gateway) -> list:
+        return [short_uuid(gateway.id), gateway.name]
 
 class GatewayEngine(BaseNamedTableEngine):
     model_class = Gateway
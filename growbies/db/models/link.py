@@ -7,6 +7,7 @@ from sqlalchemy import ForeignKey
 
 from .common import BaseLink
 from growbies.db.models.common import BaseLinkEngine
+from growbies.service.common import ServiceOp
 if TYPE_CHECKING:
     from growbies.db.engine import DBEngine
 
@@ -24,10 +25,11 @@ class SessionDataPointLink(BaseLink, table=True):
                          ForeignKey('session.id', ondelete='CASCADE'),
                          primary_key=True)
     )
+    # Not a foreign key, as the datapoint table is partitioned and keyed by ID and timestamp. Links
+    # are removed with the partitions of their datapoints, see
+    # :meth:`growbies.db.models.partition.PartitionEngine.drop_before`.
     right_id: uuid.UUID = Field(
-        sa_column=Column(PG_UUID(as_uuid=True),
-                         ForeignKey('datapoint.id', ondelete='CASCADE'),
-                         primary_key=True)
+        sa_column=Column(PG_UUID(as_uuid=True), primary_key=True)
     )
 
 class SessionDeviceLink(BaseLink, table=True):
@@ -80,18 +82,39 @@ class SessionUserLink(BaseLink, table=True):
 
 class SessionDataPointLinkEngine(BaseLinkEngine):
     model_class = SessionDataPointLink
+    left_entity = ServiceOp.SESSION
+
+    def _on_write_many(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]):
+        # The datapoints may also be of the sessions by interval, so recount.
+        for session_id in dict.fromkeys(left_id for left_id, _ in pairs):
+            self._engine.counter.reconcile(session_id)
+        super()._on_write_many(pairs)
 
 class SessionDeviceLinkEngine(BaseLinkEngine):
     model_class = SessionDeviceLink
+    left_entity = ServiceOp.SESSION
+    right_entity = ServiceOp.DEVICE
+
+    def _on_write_many(self, pairs: list[tuple[uuid.UUID, uuid.UUID]]):
+        super()._on_write_many(pairs)
+        # An active session records the datapoints of its devices.
+        for session_id in dict.fromkeys(left_id for left_id, _ in pairs):
+            self._engine.membership.sync(session_id)
 
 class SessionProjectLinkEngine(BaseLinkEngine):
     model_class = SessionProjectLink
+    left_entity = ServiceOp.SESSION
+    right_entity = ServiceOp.PROJECT
 
 class SessionTagLinkEngine(BaseLinkEngine):
     model_class = SessionTagLink
+    left_entity = ServiceOp.SESSION
+    right_entity = ServiceOp.TAG
 
 class SessionUserLinkEngine(BaseLinkEngine):
     model_class = SessionUserLink
+    left_entity = ServiceOp.SESSION
+    right_entity = ServiceOp.USER
 
 class LinkEngine:
     def __init__(self, engine: 'DBEngine'):
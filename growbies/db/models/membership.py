@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Optional
+import uuid
+
+from sqlalchemy import Column, ForeignKey, Index, text as sa_text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field, Session, text
+
+from .common import BaseModel, BaseTableEngine
+from growbies.common.utils import timestamp
+from growbies.common.utils.types import SessionID
+
+class SessionDeviceInterval(BaseModel, table=True):
+    """
+    A time interval over which a session recorded the datapoints of a device, that is, over which
+    the session was active and the device linked to it. The interval is open while it still is.
+    """
+    __table_args__ = (
+        # At most one open interval per session and device.
+        Index('ix_sessiondeviceinterval_open', 'session_id', 'device_id', unique=True,
+              postgresql_where=sa_text('end_time IS NULL')),
+    )
+
+    session_id: uuid.UUID = Field(
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('session.id', ondelete='CASCADE'),
+                         primary_key=True))
+    device_id: uuid.UUID = Field(
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('device.id', ondelete='CASCADE'),
+                         primary_key=True))
+    start_time: datetime = Field(primary_key=True)
+    end_time: Optional[datetime] = Field(default=None, nullable=True)
+
+# The datapoints of a session, "member", by ID and timestamp. Those of the devices over the
+# intervals of the session are read by range on "ix_datapoint_device_timestamp". Datapoints may
+# also be linked explicitly, as they were before intervals.
+MEMBER_SQL = """
+    SELECT dp.id, dp.timestamp
+    FROM sessiondeviceinterval i
+    JOIN datapoint dp
+        ON dp.device_id = i.device_id
+       AND dp.timestamp >= i.start_time
+       AND dp.timestamp < coalesce(i.end_time, 'infinity')
+    WHERE i.session_id = :session_id
+    UNION
+    SELECT dp.id, dp.timestamp
+    FROM sessiondatapointlink link
+    JOIN datapoint dp ON dp.id = link.right_id
+    WHERE link.left_id = :session_id
+"""
+
+_CLOSE_SQL = text("""
+    UPDATE sessiondeviceinterval i
+    SET end_time = :now
+    WHERE i.end_time IS NULL
+      AND (CAST(:session_id AS uuid) IS NULL OR i.session_id = :session_id)
+      AND NOT EXISTS (
+          SELECT 1
+          FROM session s
+          JOIN sessiondevicelink link ON link.left_id = s.id
+          WHERE s.id = i.session_id AND s.active AND link.right_id = i.device_id
+      )
+""")
+
+_OPEN_SQL = text("""
+    INSERT INTO sessiondeviceinterval (session_id, device_id, start_time)
+    SELECT s.id, link.right_id, :now
+    FROM session s
+    JOIN sessiondevicelink link ON link.left_id = s.id
+    WHERE s.active
+      AND (CAST(:session_id AS uuid) IS NULL OR s.id = :session_id)
+    ON CONFLICT DO NOTHING
+""")
+
+class MembershipEngine(BaseTableEngine):
+    """
+    Maintains the :class:`SessionDeviceInterval` of the sessions, from which the datapoints of a
+    session are read, see :data:`MEMBER_SQL`. Datapoints are not linked to sessions as recorded.
+    """
+    model_class = SessionDeviceInterval
+
+    def sync(self, session_id: Optional[SessionID] = None, db: Optional[Session] = None):
+        """
+        Close the open intervals of devices that a session no longer records, and open those of
+        devices that it newly does. To be called on activating or deactivating a session, and on
+        linking or unlinking a device.
+
+        :param session_id: Of the session to synchronize, else all sessions.
+        :param db: To synchronize within, else a new transaction is committed.
+        """
+        params = {'session_id': session_id, 'now': timestamp.get_utc_dt()}
+        if db is None:
+            with self._engine.new_session() as db:
+                self._sync(db, params)
+                db.commit()
+        else:
+            self._sync(db, params)
+
+    @staticmethod
+    def _sync(db: Session, params: dict):
+        db.exec(_CLOSE_SQL, params=params)
+        db.exec(_OPEN_SQL, params=params)
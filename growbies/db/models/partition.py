@@ -0,0 +1,328 @@
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Optional, TYPE_CHECKING
+import logging
+
+from sqlmodel import Session, SQLModel, text
+
+from .datapoint import DataPoint, DataPointMassSensor, DataPointTemperatureSensor
+from growbies.common.utils import timestamp
+
+if TYPE_CHECKING:
+    from growbies.db.engine import DBEngine
+
+logger = logging.getLogger(__name__)
+
+# Partitioned by month of timestamp. Sensor readings are partitioned alike, by the timestamp of
+# their datapoint, and are dropped first.
+PARTITIONED_TABLES = (DataPointTemperatureSensor.__tablename__,
+                      DataPointMassSensor.__tablename__,
+                      DataPoint.__tablename__)
+
+# Move the rows of a month of the tables made before partitioning, see
+# :meth:`PartitionEngine.migrate`. Sensor readings are moved with their datapoint, and take its
+# timestamp.
+_MIGRATE_MONTH_SQLS = (
+    text("""
+        INSERT INTO datapoint (id, device_id, tare_id, timestamp, mass, temperature, ref_mass,
+                               sensor_mass, sensor_mass_error, sensor_ref_mass, sensor_temperature,
+                               sensor_temperature_error)
+        SELECT id, device_id, tare_id, timestamp, mass, temperature, ref_mass, sensor_mass,
+               sensor_mass_error, sensor_ref_mass, sensor_temperature, sensor_temperature_error
+        FROM datapoint_unpartitioned
+        WHERE timestamp >= :start_time AND timestamp < :end_time
+    """),
+    text("""
+        INSERT INTO datapointmasssensor (id, datapoint_id, timestamp, idx, mass, error, ref_mass)
+        SELECT ms.id, ms.datapoint_id, dp.timestamp, ms.idx, ms.mass, ms.error, ms.ref_mass
+        FROM datapointmasssensor_unpartitioned ms
+        JOIN datapoint_unpartitioned dp ON dp.id = ms.datapoint_id
+        WHERE dp.timestamp >= :start_time AND dp.timestamp < :end_time
+    """),
+    text("""
+        INSERT INTO datapointtemperaturesensor (id, datapoint_id, timestamp, idx, temperature,
+                                                error)
+        SELECT ts.id, ts.datapoint_id, dp.timestamp, ts.idx, ts.temperature, ts.error
+        FROM datapointtemperaturesensor_unpartitioned ts
+        JOIN datapoint_unpartitioned dp ON dp.id = ts.datapoint_id
+        WHERE dp.timestamp >= :start_time AND dp.timestamp < :end_time
+    """),
+    text("""
+        DELETE FROM datapointmasssensor_unpartitioned ms
+        USING datapoint_unpartitioned dp
+        WHERE dp.id = ms.datapoint_id
+          AND dp.timestamp >= :start_time AND dp.timestamp < :end_time
+    """),
+    text("""
+        DELETE FROM datapointtemperaturesensor_unpartitioned ts
+        USING datapoint_unpartitioned dp
+        WHERE dp.id = ts.datapoint_id
+          AND dp.timestamp >= :start_time AND dp.timestamp < :end_time
+    """),
+    text("""
+        DELETE FROM datapoint_unpartitioned
+        WHERE timestamp >= :start_time AND timestamp < :end_time
+    """),
+)
+
+def month_start(dt: datetime, months: int = 0) -> datetime:
+    """Return the start of the month of a timestamp, in UTC, offset by a number of months."""
+    dt = timestamp.get_utc_dt(dt)
+    month = dt.year * 12 + dt.month - 1 + months
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+def partition_name(table: str, start: datetime) -> str:
+    return f'{table}_y{start.year:04d}m{start.month:02d}'
+
+class PartitionEngine:
+    """
+    Manages the monthly partitions of the datapoint tables.
+
+    Partitions are made as datapoints are inserted, see :meth:`ensure`. Retention drops whole
+    partitions, see :meth:`drop_before`, rather than deleting rows.
+    """
+    def __init__(self, engine: 'DBEngine'):
+        self._engine = engine
+        self._lock = Lock()
+        # The starts of the months known to have partitions.
+        self._months: set[datetime] = set()
+        # Whether the datapoint table is partitioned, once known, see :attr:`partitioned`.
+        self._partitioned: Optional[bool] = None
+
+    @property
+    def tables(self) -> tuple[str, ...]:
+        """The partitioned tables, in :data:`PARTITIONED_TABLES` order, less the sensor tables if
+        they have been dropped."""
+        if self._engine.datapoint.has_sensor_tables:
+            return PARTITIONED_TABLES
+        return DataPoint.__tablename__,
+
+    @property
+    def partitioned(self) -> bool:
+        """As :attr:`is_partitioned`, as found when first read. A database migrated by another
+        process is found partitioned by this one when restarted."""
+        if self._partitioned is None:
+            self._partitioned = self.is_partitioned
+        return self._partitioned
+
+    @property
+    def is_partitioned(self) -> bool:
+        """Whether the datapoint table is partitioned. Databases made before are not, see
+        :meth:`migrate`."""
+        with self._engine.new_session() as session:
+            return session.exec(text(
+                "SELECT relkind = 'p' FROM pg_class WHERE oid = 'datapoint'::regclass")).one()[0]
+
+    def init(self):
+        """Make the partitions of this month and the next, ahead of inserting. The datapoint table
+        of a database made before partitioning is left as is, and no partitions are made, until it
+        is migrated, see :meth:`migrate`."""
+        self._partitioned = self.is_partitioned
+        if self._partitioned:
+            now = timestamp.get_utc_dt()
+            self.ensure(now)
+            self.ensure(month_start(now, 1))
+        else:
+            logger.warning('The datapoint tables are not partitioned, run '
+                           '"python -m growbies.db partition" to migrate them.')
+        with self._engine.new_session() as session:
+            self._init_link_trigger(session)
+            session.commit()
+
+    def ensure(self, dt: datetime, session: Optional[Session] = None):
+        """Make the partitions of the month of a timestamp, if they have not been."""
+        start = month_start(dt)
+        if start in self._months or not self.partitioned:
+            return
+        with self._lock:
+            if session is None:
+                with self._engine.new_session() as session:
+                    self._create(session, start)
+                    session.commit()
+            else:
+                self._create(session, start)
+            self._months.add(start)
+
+    def ensure_range(self, start_time: datetime, end_time: datetime,
+                     session: Optional[Session] = None):
+        """Make the partitions of every month of a time range."""
+        start = month_start(start_time)
+        while start <= end_time:
+            self.ensure(start, session)
+            start = month_start(start, 1)
+
+    def get_partitions(self) -> list[tuple[datetime, str]]:
+        """Return the start of the month and the name of each datapoint partition, in order."""
+        with self._engine.new_session() as session:
+            names = session.exec(text("""
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = 'datapoint'::regclass
+                ORDER BY child.relname
+            """)).all()
+        partitions = list()
+        for name, in names:
+            year, month = name.rsplit('_y', 1)[1].split('m')
+            partitions.append((datetime(int(year), int(month), 1, tzinfo=timezone.utc), name))
+        return partitions
+
+    def get_retained_start(self) -> Optional[datetime]:
+        """Return the start of the earliest partition, before which datapoints have been
+        dropped, or None if there are none."""
+        partitions = self.get_partitions()
+        return partitions[0][0] if partitions else None
+
+    def drop_before(self, cutoff: datetime) -> list[str]:
+        """
+        Drop the partitions, and the session links of their datapoints, ending at or before a
+        cutoff. The rollups of the datapoints are kept. The rewrite is recorded, see
+        :class:`growbies.db.models.rewrite.DataPointRewrite`.
+
+        :return: The names of the datapoint partitions dropped.
+        """
+        dropped = list()
+        # Those counting datapoints of the partitions, recounted after.
+        device_ids, session_ids = set(), set()
+        for start, name in self.get_partitions():
+            if month_start(start, 1) > cutoff:
+                break
+            with self._lock, self._engine.new_session() as session:
+                params = {'start_time': start, 'end_time': month_start(start, 1)}
+                device_ids.update(row[0] for row in session.exec(text(
+                    f'SELECT DISTINCT device_id FROM {name}')).all())
+                session_ids.update(row[0] for row in session.exec(text("""
+                    SELECT DISTINCT session_id
+                    FROM sessiondeviceinterval
+                    WHERE device_id = ANY(:device_ids)
+                      AND start_time < :end_time
+                      AND :start_time < coalesce(end_time, 'infinity')
+                """), params={**params, 'device_ids': list(device_ids)}).all())
+                # The links do not reference datapoints by foreign key, so do not cascade.
+                session_ids.update(row[0] for row in session.exec(text(f"""
+                    DELETE FROM sessiondatapointlink link
+                    USING {name} dp
+                    WHERE link.right_id = dp.id
+                    RETURNING link.left_id
+                """)).all())
+                for table in self.tables:
+                    partition = partition_name(table, start)
+                    # Detached first, as a partition of a referenced table cannot be dropped.
+                    session.exec(text(f'ALTER TABLE {table} DETACH PARTITION {partition}'))
+                    session.exec(text(f'DROP TABLE {partition}'))
+                session.commit()
+                self._months.discard(start)
+            logger.info(f'Dropped datapoint partition {name}.')
+            dropped.append(name)
+        if dropped:
+            self._engine.counter.reconcile_many(device_ids, session_ids)
+            self._engine.rewrite.record(None, None, cutoff)
+        return dropped
+
+    def apply_retention(self, months: int) -> list[str]:
+        """Drop the partitions older than a number of whole months. Nothing is dropped if 0."""
+        if months <= 0:
+            return list()
+        return self.drop_before(month_start(timestamp.get_utc_dt(), -months))
+
+    def migrate(self):
+        """
+        Migrate the datapoint tables of a database made before partitioning. The tables are
+        renamed, partitioned tables made in their place, and the rows moved into those a month at
+        a time, in a transaction each. This is run by "python -m growbies.db partition", and
+        resumes where it stopped if interrupted.
+        """
+        if self.is_partitioned and not self._has_unpartitioned:
+            logger.info('The datapoint tables are already partitioned.')
+            return
+
+        if not self.is_partitioned:
+            # Those of a database made before the sensor arrays too.
+            self._engine.datapoint.init_sensor_arrays()
+            with self._engine.new_session() as session:
+                # The session links can not reference a partitioned table by ID alone.
+                session.exec(text('ALTER TABLE sessiondatapointlink '
+                                  'DROP CONSTRAINT IF EXISTS sessiondatapointlink_right_id_fkey'))
+                for table in PARTITIONED_TABLES:
+                    session.exec(text(f'ALTER TABLE {table} RENAME TO {table}_unpartitioned'))
+                    # Index names are schema wide, so those of the new tables would collide. The
+                    # indexes are kept, to find the rows of each month and their sensor readings.
+                    indexes = session.exec(text(
+                        'SELECT indexname FROM pg_indexes WHERE tablename = :table'),
+                        params={'table': f'{table}_unpartitioned'}).all()
+                    for index, in indexes:
+                        session.exec(text(f'ALTER INDEX {index} RENAME TO {index}_unpartitioned'))
+                # The rows are moved, not deleted, so their session links are kept.
+                session.exec(text('DROP TRIGGER IF EXISTS datapoint_delete_links '
+                                  'ON datapoint_unpartitioned'))
+                session.exec(text('CREATE INDEX IF NOT EXISTS datapoint_unpartitioned_timestamp '
+                                  'ON datapoint_unpartitioned (timestamp)'))
+
+                SQLModel.metadata.create_all(
+                    session.connection(),
+                    tables=[DataPoint.__table__, DataPointMassSensor.__table__,
+                            DataPointTemperatureSensor.__table__])
+
+                start_time, end_time = session.exec(text(
+                    'SELECT min(timestamp), max(timestamp) FROM datapoint_unpartitioned')).one()
+                now = timestamp.get_utc_dt()
+                self._partitioned = True
+                self.ensure_range(start_time or now, max(end_time or now, now), session)
+                self._init_link_trigger(session)
+                session.commit()
+            logger.info('Partitioned the datapoint tables, moving their rows.')
+
+        while True:
+            with self._lock, self._engine.new_session() as session:
+                start_time = session.exec(text(
+                    'SELECT min(timestamp) FROM datapoint_unpartitioned')).one()[0]
+                if start_time is None:
+                    break
+                start = month_start(start_time)
+                params = {'start_time': start, 'end_time': month_start(start, 1)}
+                for sql in _MIGRATE_MONTH_SQLS:
+                    session.exec(sql, params=params)
+                session.commit()
+            logger.info(f'Moved the datapoints of {start:%Y-%m} into their partition.')
+
+        with self._engine.new_session() as session:
+            for table in PARTITIONED_TABLES:
+                session.exec(text(f'DROP TABLE {table}_unpartitioned'))
+            session.commit()
+        logger.info('Migrated the datapoint tables.')
+
+    @property
+    def _has_unpartitioned(self) -> bool:
+        """Whether the rows of the tables made before partitioning are still being moved."""
+        with self._engine.new_session() as session:
+            return session.exec(text(
+                "SELECT to_regclass('datapoint_unpartitioned') IS NOT NULL")).one()[0]
+
+    @staticmethod
+    def _init_link_trigger(session: Session):
+        """
+        Remove the session links of deleted datapoints, such as those of a removed device, as the
+        links do not reference datapoints by foreign key. Dropping a partition fires no triggers.
+        """
+        session.exec(text("""
+            CREATE OR REPLACE FUNCTION delete_datapoint_links() RETURNS trigger AS $$
+            BEGIN
+                DELETE FROM sessiondatapointlink WHERE right_id = OLD.id;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        session.exec(text("""
+            CREATE OR REPLACE TRIGGER datapoint_delete_links
+            AFTER DELETE ON datapoint
+            FOR EACH ROW EXECUTE FUNCTION delete_datapoint_links()
+        """))
+
+    def _create(self, session: Session, start: datetime):
+        end = month_start(start, 1)
+        for table in reversed(self.tables):
+            session.exec(text(f"""
+                CREATE TABLE IF NOT EXISTS {partition_name(table, start)}
+                PARTITION OF {table}
+                FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+            """))
@@ -4,7 +4,6 @@ from typing import Optional, TYPE_CHECKING
 import textwrap
 import uuid
 
-from prettytable import PrettyTable
 from sqlalchemy import event
 from sqlmodel import Field, Relationship
 
@@ -13,6 +12,8 @@ from .link import SessionProjectLink
 from growbies.constants import TABLE_COLUMN_WIDTH
 from growbies.common.utils.report import short_uuid
 from growbies.common.utils.timestamp import get_utc_dt
+from growbies.service.common import ServiceOp
+from growbies.service.resp import TableResp
 
 if TYPE_CHECKING:
     from .session import Session
@@ -47,34 +48,31 @@ def update_timestamp(_mapper, _connection, target):
 
 class Projects(SortedTable[Project]):
 
-    def __str__(self):
-        table = PrettyTable(title=self.table_name())
-        table.field_names = (Project.Key.ID, Project.Key.NAME, Project.Key.DESCRIPTION,
-                             Project.Key.SESSIONS)
-
-        for field in table.field_names:
-            table.align[field] = 'l'
-
-        for project in self._rows:
-            wrapped_desc = textwrap.fill(project.description or '', width=TABLE_COLUMN_WIDTH)
-            session_names = [f'{s.name}' for s in project.sessions]  # Could be id or start_ts
-            session_str = ', '.join(session_names)
-            wrapped_sessions = textwrap.fill(session_str, width=TABLE_COLUMN_WIDTH)
-
-            table.add_row([
-                project.short_uuid,
-                project.name,
-                wrapped_desc,
-                wrapped_sessions
-            ])
-
-        return str(table)
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(),
+                         [Project.Key.ID, Project.Key.NAME, Project.Key.DESCRIPTION,
+                          Project.Key.SESSIONS],
+                         align='l')
+
+    def _make_table_row(self, project: Project) -> list:
+        wrapped_desc = textwrap.fill(project.description or '', width=TABLE_COLUMN_WIDTH)
+        session_names = [f'{s.name}' for s in project.sessions]  # Could be id or start_ts
+        session_str = ', '.join(session_names)
+        wrapped_sessions = textwrap.fill(session_str, width=TABLE_COLUMN_WIDTH)
+
+        return [
+            project.short_uuid,
+            project.name,
+            wrapped_desc,
+            wrapped_sessions
+        ]
 
 class ProjectEngine(BaseNamedTableEngine):
     model_class = Project
+    entity = ServiceOp.PROJECT
 
     def get(self, name_or_id: Optional[str]) -> Project:
-        return self._get_one(name_or_id, Project.sessions)
+        return self._get_one_cached(name_or_id, Project.sessions)
 
     def list(self) -> Projects:
         return Projects(self._get_all(Project.sessions))
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Optional
+import logging
+import uuid
+
+from sqlalchemy import BigInteger, Column, ForeignKey, Identity
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field, Session, text
+
+from .common import BaseModel, BaseTableEngine
+from growbies.common.utils.types import DeviceID
+
+logger = logging.getLogger(__name__)
+
+class DataPointRewrite(BaseModel, table=True):
+    """
+    A change to the datapoints of a time range other than recording new ones, such as an import or
+    retention. Copies of datapoints kept outside the database, such as by the plot cache, are stale
+    if their range was rewritten since they were read.
+    """
+    id: Optional[int] = Field(
+        default=None, sa_column=Column(BigInteger, Identity(), primary_key=True))
+    # NULL for every device.
+    device_id: Optional[uuid.UUID] = Field(
+        default=None,
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('device.id', ondelete='CASCADE'),
+                         nullable=True))
+    # NULL for unbounded.
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+_GET_REWRITTEN_SQL = text("""
+    SELECT
+        max(id),
+        coalesce(bool_or(
+            (device_id IS NULL OR device_id = :device_id)
+            AND (start_time IS NULL OR start_time <= :end_time)
+            AND (end_time IS NULL OR end_time >= :start_time)), false)
+    FROM datapointrewrite
+    WHERE id > :since_id
+""")
+
+class RewriteEngine(BaseTableEngine):
+    """
+    Records rewrites of datapoints, see :class:`DataPointRewrite`. The IDs of the records ascend,
+    so that a reader notes the last ID when reading and later checks for any after it.
+    """
+    model_class = DataPointRewrite
+
+    def record(self, device_id: Optional[DeviceID], start_time: Optional[datetime],
+               end_time: Optional[datetime], session: Optional[Session] = None):
+        """
+        Record a rewrite of the datapoints of a device, else of every device, over a time range.
+        This is to be after the rewrite is committed, else a reader may note the record without
+        reading the rewritten datapoints.
+        """
+        if session is None:
+            with self._engine.new_session() as session:
+                self.record(device_id, start_time, end_time, session)
+                session.commit()
+            return
+        session.add(DataPointRewrite(device_id=device_id, start_time=start_time,
+                                     end_time=end_time))
+
+    def get_rewritten(self, device_id: DeviceID, start_time: datetime, end_time: datetime,
+                      since_id: int = 0) -> tuple[int, bool]:
+        """
+        :return: The ID of the last rewrite, and whether the datapoints of a device over a time
+            range have been rewritten after the given ID.
+        """
+        with self._engine.new_session() as session:
+            last_id, rewritten = session.exec(_GET_REWRITTEN_SQL, params={
+                'device_id': device_id,
+                'start_time': start_time,
+                'end_time': end_time,
+                'since_id': since_id,
+            }).one()
+        return max(last_id or 0, since_id), rewritten
@@ -0,0 +1,353 @@
+from datetime import datetime, timedelta
+from enum import StrEnum
+from typing import Optional, TYPE_CHECKING
+import logging
+import uuid
+
+from sqlmodel import Field, Session, text
+
+from .common import BaseModel, BaseTableEngine
+from .datapoint import sensor_join
+from growbies.common.utils import timestamp
+from growbies.common.utils.types import DeviceID
+if TYPE_CHECKING:
+    from .datapoint import DataPoint
+
+logger = logging.getLogger(__name__)
+
+# The fewest points a time range is read at, see :meth:`Resolution.select`.
+MIN_POINTS = 1000
+
+class Resolution(StrEnum):
+    """The time buckets of the rollups. The values are those of the PostgreSQL "date_trunc"."""
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+
+    @property
+    def interval(self) -> timedelta:
+        if self == self.MINUTE:
+            return timedelta(minutes=1)
+        elif self == self.HOUR:
+            return timedelta(hours=1)
+        elif self == self.DAY:
+            return timedelta(days=1)
+        else:
+            raise ValueError(f'"{self} is not a valid element')
+
+    @classmethod
+    def select(cls, start_time: Optional[datetime], end_time: Optional[datetime],
+               min_points: int = MIN_POINTS) -> Optional['Resolution']:
+        """
+        Return the coarsest resolution that still gives the time range at least min_points
+        buckets, or None if the range is to be read at full resolution.
+        """
+        start_time = timestamp.get_utc_dt(0) if start_time is None else start_time
+        end_time = timestamp.get_utc_dt() if end_time is None else end_time
+        for resolution in reversed(cls):
+            if (end_time - start_time) / resolution.interval >= min_points:
+                return resolution
+        return None
+
+class BaseRollup(BaseModel, table=False):
+    # A column per table, so not "sa_column".
+    device_id: uuid.UUID = Field(foreign_key='device.id', ondelete='CASCADE', primary_key=True)
+    resolution: str = Field(primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    count: int = Field(nullable=False)
+    # Of the latest datapoint of the bucket, for "last" values.
+    last_timestamp: datetime = Field(nullable=False)
+
+class DataPointRollup(BaseRollup, table=True):
+    mass_min: float = Field(nullable=False)
+    mass_max: float = Field(nullable=False)
+    mass_sum: float = Field(nullable=False)
+    mass_last: float = Field(nullable=False)
+    temperature_min: float = Field(nullable=False)
+    temperature_max: float = Field(nullable=False)
+    temperature_sum: float = Field(nullable=False)
+    temperature_last: float = Field(nullable=False)
+
+class DataPointMassSensorRollup(BaseRollup, table=True):
+    idx: int = Field(primary_key=True)
+    mass_min: float = Field(nullable=False)
+    mass_max: float = Field(nullable=False)
+    mass_sum: float = Field(nullable=False)
+    mass_last: float = Field(nullable=False)
+
+class DataPointTemperatureSensorRollup(BaseRollup, table=True):
+    idx: int = Field(primary_key=True)
+    temperature_min: float = Field(nullable=False)
+    temperature_max: float = Field(nullable=False)
+    temperature_sum: float = Field(nullable=False)
+    temperature_last: float = Field(nullable=False)
+
+def _make_merge_sql(table: str, values: tuple[str, ...], source: str, where: str,
+                    src: str = 'src', idx: bool = False) -> str:
+    """
+    Return the SQL that aggregates datapoints, "dp", into the buckets of every resolution, and
+    merges them into a rollup table.
+
+    :param table: The rollup table.
+    :param values: The names of the values rolled up, such as "mass". These are columns of the
+        source and, with suffixes, of the rollup table.
+    :param source: The source of the values, joined to the datapoints if not the datapoints.
+    :param where: The condition on the datapoints.
+    :param src: The alias of the source.
+    :param idx: Whether the source and the rollup table are per sensor index.
+    """
+    resolutions = ', '.join(f"('{resolution}')" for resolution in Resolution)
+    keys = 'device_id, resolution, bucket' + (', idx' if idx else '')
+    group_keys = 'dp.device_id, res.resolution, bucket' + (f', {src}.idx' if idx else '')
+    columns = ', '.join(f'{value}_min, {value}_max, {value}_sum, {value}_last'
+                        for value in values)
+    aggregates = ', '.join(f'min({src}.{value}), max({src}.{value}), sum({src}.{value}), '
+                           f'(array_agg({src}.{value} ORDER BY dp.timestamp DESC))[1]'
+                           for value in values)
+    merges = ', '.join(f"""
+            {value}_min = least(r.{value}_min, excluded.{value}_min),
+            {value}_max = greatest(r.{value}_max, excluded.{value}_max),
+            {value}_sum = r.{value}_sum + excluded.{value}_sum,
+            {value}_last = CASE WHEN excluded.last_timestamp >= r.last_timestamp
+                                THEN excluded.{value}_last ELSE r.{value}_last END"""
+                       for value in values)
+    return f"""
+        INSERT INTO {table} AS r ({keys}, count, {columns}, last_timestamp)
+        SELECT {group_keys}, count(*), {aggregates}, max(dp.timestamp)
+        FROM {source}
+        CROSS JOIN (VALUES {resolutions}) AS res(resolution)
+        CROSS JOIN LATERAL date_trunc(res.resolution, dp.timestamp, 'UTC') AS bucket
+        WHERE {where}
+        GROUP BY {group_keys}
+        ON CONFLICT ({keys}) DO UPDATE SET
+            count = r.count + excluded.count,
+            {merges},
+            last_timestamp = greatest(r.last_timestamp, excluded.last_timestamp)
+    """
+
+def _make_merge_sqls(datapoints: str, where: str, legacy: bool = False,
+                     partitioned: bool = True) -> tuple[str, ...]:
+    """Return the SQL that merges datapoints into each rollup table.
+
+    :param datapoints: The datapoints, aliased "dp", such as "datapoint dp".
+    :param where: The condition on the datapoints.
+    :param legacy: Also merge the sensor readings recorded as rows of the sensor tables, before
+        the sensor arrays. Each datapoint has its readings in one or the other.
+    :param partitioned: Whether the sensor tables are partitioned, see
+        :func:`growbies.db.models.datapoint.sensor_join`.
+    """
+    def sensor_array_source(value: str) -> str:
+        return f"""{datapoints} CROSS JOIN LATERAL (
+            SELECT {value}, ordinality - 1 AS idx
+            FROM unnest(dp.sensor_{value}) WITH ORDINALITY AS sensor({value})
+        ) src"""
+
+    sqls = (
+        _make_merge_sql('datapointrollup', ('mass', 'temperature'), datapoints, where, src='dp'),
+        _make_merge_sql('datapointmasssensorrollup', ('mass',), sensor_array_source('mass'),
+                        where, idx=True),
+        _make_merge_sql('datapointtemperaturesensorrollup', ('temperature',),
+                        sensor_array_source('temperature'), where, idx=True),
+    )
+    if legacy:
+        sqls += (
+            _make_merge_sql('datapointmasssensorrollup', ('mass',),
+                            f'datapointmasssensor src '
+                            f'JOIN {datapoints} ON {sensor_join("src", partitioned)}',
+                            where, idx=True),
+            _make_merge_sql('datapointtemperaturesensorrollup', ('temperature',),
+                            f'datapointtemperaturesensor src '
+                            f'JOIN {datapoints} ON {sensor_join("src", partitioned)}',
+                            where, idx=True),
+        )
+    return sqls
+
+def _make_merge_inserted_sql():
+    # The values of the inserted datapoint are bound, rather than read back from its partition,
+    # and every rollup table is merged in one statement, with data-modifying CTEs.
+    *merges, last = _make_merge_sqls('inserted dp', 'true')
+    ctes = ''.join(f', merge_{idx} AS ({merge})' for idx, merge in enumerate(merges))
+    return text(f"""
+        WITH inserted AS (
+            SELECT CAST(:device_id AS uuid) AS device_id,
+                CAST(:timestamp AS timestamptz) AS timestamp,
+                CAST(:mass AS double precision) AS mass,
+                CAST(:temperature AS double precision) AS temperature,
+                CAST(:sensor_mass AS real[]) AS sensor_mass,
+                CAST(:sensor_temperature AS real[]) AS sensor_temperature
+        ){ctes}
+        {last}
+    """)
+
+_MERGE_INSERTED_SQL = _make_merge_inserted_sql()
+
+class RollupEngine(BaseTableEngine):
+    """
+    Maintains rollups of the datapoints, at each :class:`Resolution`, per device and per sensor.
+
+    Rollups are updated incrementally as datapoints are inserted, see :meth:`update`. Datapoints
+    written otherwise are rolled up by :meth:`catch_up`.
+    """
+    model_class = DataPointRollup
+
+    _ROLLUP_TABLES = ('datapointrollup', 'datapointmasssensorrollup',
+                      'datapointtemperaturesensorrollup')
+
+    def init(self):
+        """Roll up the datapoints of a database made before the rollups, see :meth:`catch_up`."""
+        with self._engine.new_session() as session:
+            empty = session.exec(text("""
+                SELECT NOT EXISTS (SELECT 1 FROM datapointrollup)
+                    AND EXISTS (SELECT 1 FROM datapoint)
+            """)).one()[0]
+        if empty:
+            logger.info('There are datapoints without rollups, rolling them up.')
+            self.catch_up()
+
+    def update(self, session: Session, datapoint: 'DataPoint'):
+        """
+        Roll up an inserted datapoint, and its sensor readings, in the transaction of the insert.
+        """
+        session.exec(_MERGE_INSERTED_SQL, params={
+            'device_id': datapoint.device_id,
+            'timestamp': datapoint.timestamp,
+            'mass': datapoint.mass,
+            'temperature': datapoint.temperature,
+            'sensor_mass': datapoint.sensor_mass,
+            'sensor_temperature': datapoint.sensor_temperature,
+        })
+
+    def has_rollups(self, device_id: DeviceID, resolution: Resolution,
+                    start_time: Optional[datetime], end_time: Optional[datetime]) -> bool:
+        """Whether there are any rollups of a device, at a resolution, over a time range."""
+        with self._engine.new_session() as session:
+            return session.exec(text("""
+                SELECT EXISTS (
+                    SELECT 1 FROM datapointrollup
+                    WHERE device_id = :device_id
+                      AND resolution = :resolution
+                      AND bucket >= date_trunc(:resolution, CAST(:start_time AS timestamptz),
+                                               'UTC')
+                      AND bucket <= :end_time
+                )
+            """), params={
+                'device_id': device_id,
+                'resolution': resolution,
+                'start_time': timestamp.get_utc_dt(0) if start_time is None else start_time,
+                'end_time': timestamp.get_utc_dt() if end_time is None else end_time,
+            }).one()[0]
+
+    def get_sensor_counts(self, device_ids: list[DeviceID], start_time: Optional[datetime],
+                          end_time: Optional[datetime]) -> tuple[int, int]:
+        """
+        Return the greatest number of mass sensors, and of temperature sensors, of the datapoints
+        of devices over a time range, from the day rollups rather than from the datapoints. The
+        numbers are those of whole days, so may be greater than those of the time range.
+        """
+        params = {
+            'device_ids': device_ids,
+            'resolution': Resolution.DAY,
+            'start_time': timestamp.get_utc_dt(0) if start_time is None else start_time,
+            'end_time': timestamp.get_utc_dt() if end_time is None else end_time,
+        }
+        counts = list()
+        with self._engine.new_session() as session:
+            for table in 'datapointmasssensorrollup', 'datapointtemperaturesensorrollup':
+                counts.append(session.exec(text(f"""
+                    SELECT coalesce(max(idx) + 1, 0) FROM {table}
+                    WHERE device_id = ANY(:device_ids)
+                      AND resolution = :resolution
+                      AND bucket >= date_trunc(:resolution, CAST(:start_time AS timestamptz),
+                                               'UTC')
+                      AND bucket <= :end_time
+                """), params=params).one()[0])
+        return counts[0], counts[1]
+
+    def catch_up(self, start_time: Optional[datetime] = None,
+                 end_time: Optional[datetime] = None):
+        """
+        Rebuild the rollups of a time range from the datapoints. The range is widened to whole
+        days, the coarsest resolution. The rollups of datapoints dropped by retention are kept.
+        """
+        start_time = timestamp.get_utc_dt(0) if start_time is None else start_time
+        retained_start = self._engine.partition.get_retained_start()
+        if retained_start is not None:
+            start_time = max(start_time, retained_start)
+        end_time = timestamp.get_utc_dt() if end_time is None else end_time
+        start_time = self._floor_day(start_time)
+        end_time = self._floor_day(end_time) + Resolution.DAY.interval
+        params = {'start_time': start_time, 'end_time': end_time}
+
+        with self._engine.new_session() as session:
+            for table in self._ROLLUP_TABLES:
+                session.exec(text(f"""
+                    DELETE FROM {table}
+                    WHERE bucket >= :start_time AND bucket < :end_time
+                """), params=params)
+            for sql in _make_merge_sqls(
+                    'datapoint dp', 'dp.timestamp >= :start_time AND dp.timestamp < :end_time',
+                    legacy=self._engine.datapoint.has_sensor_tables,
+                    partitioned=self._engine.partition.partitioned):
+                session.exec(text(sql), params=params)
+            session.commit()
+        logger.info(f'Rolled up datapoints from {start_time} to {end_time}.')
+
+    def get_device_rollups(self, device_id: DeviceID, resolution: Resolution,
+                           start_time: Optional[datetime], end_time: Optional[datetime]):
+        """
+        As :meth:`growbies.db.models.datapoint.DataPointEngine.get_device_datapoints`, a row per
+        bucket. The timestamp of a row is the start of its bucket, and the values the means. The
+        rows also have the count, and the min, max and last of each value.
+        """
+        if start_time is None:
+            start_time = timestamp.get_utc_dt(0)
+
+        if end_time is None:
+            end_time = timestamp.get_utc_dt()
+
+        params = {
+            'device_id': device_id,
+            'resolution': resolution,
+            'start_time': start_time,
+            'end_time': end_time,
+        }
+        where = """
+            WHERE device_id = :device_id
+              AND resolution = :resolution
+              AND bucket >= date_trunc(:resolution, CAST(:start_time AS timestamptz), 'UTC')
+              AND bucket <= :end_time
+        """
+
+        def values_sql(value: str) -> str:
+            return (f'{value}_sum / count AS {value}, {value}_min, {value}_max, '
+                    f'{value}_last')
+
+        with self._engine.new_session() as session:
+            datapoint_rows = session.exec(text(f"""
+                SELECT bucket AS timestamp, count, {values_sql('mass')},
+                    {values_sql('temperature')}
+                FROM datapointrollup
+                {where}
+                ORDER BY bucket
+            """), params=params).all()
+
+            mass_sensor_rows = session.exec(text(f"""
+                SELECT bucket AS timestamp, idx, count, {values_sql('mass')}
+                FROM datapointmasssensorrollup
+                {where}
+                ORDER BY bucket, idx
+            """), params=params).all()
+
+            temperature_sensor_rows = session.exec(text(f"""
+                SELECT bucket AS timestamp, idx, count, {values_sql('temperature')}
+                FROM datapointtemperaturesensorrollup
+                {where}
+                ORDER BY bucket, idx
+            """), params=params).all()
+
+            return datapoint_rows, mass_sensor_rows, temperature_sensor_rows
+
+    @staticmethod
+    def _floor_day(dt: datetime) -> datetime:
+        dt = timestamp.get_utc_dt(dt)
+        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -6,20 +6,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-from prettytable import PrettyTable
-from sqlalchemy import event, func, inspect
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.orm import selectinload
-from sqlmodel import Column, select, Field, Relationship
+from sqlalchemy import DateTime, and_, case, event, func, inspect, literal, not_, null
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import noload, selectinload
+from sqlmodel import Column, select, Field, Relationship, text
 
 from .common import BaseTable, BaseNamedTableEngine, SortedTable
-from .datapoint import DataPoint, DataPoints
+from .datapoint import DataPoint, DataPointColumns, DataPoints
 from .link import (SessionDataPointLink, SessionDeviceLink, SessionProjectLink, SessionTagLink,
                    SessionUserLink)
+from .membership import MEMBER_SQL
 from growbies.cli.session import Entity
 from growbies.common.utils.report import list_str_wrap, short_uuid, wrap_for_column
 from growbies.common.utils.timestamp import get_utc_dt
 from growbies.common.utils.types import DeviceID, SessionID
+from growbies.service.common import ServiceOp
+from growbies.service.resp import TableResp
 
 
 if TYPE_CHECKING:
@@ -58,9 +60,14 @@ class Session(BaseTable, table=True):
     notes: Optional[str] = None
     meta: Optional[dict] = Field(sa_column=Column(JSONB), default=None)
 
+    # Only those linked explicitly, see :meth:`SessionEngine.get_datapoints` for all.
     datapoints: list['DataPoint'] = Relationship(
         back_populates="sessions",
-        link_model=SessionDataPointLink
+        link_model=SessionDataPointLink,
+        sa_relationship_kwargs={
+            'primaryjoin': 'Session.id == foreign(SessionDataPointLink.left_id)',
+            'secondaryjoin': 'foreign(SessionDataPointLink.right_id) == DataPoint.id',
+        }
     )
 
     devices: list['Device'] = Relationship(
@@ -238,10 +245,7 @@ class Sessions(SortedTable[Session]):
     def show_notes(self, value: bool):
         self._show_notes = value
 
-    def __str__(self):
-        table = PrettyTable(title=self.table_name())
-        table.preserve_internal_whitespace = True
-
+    def make_table_resp(self) -> TableResp:
         field_names = list()
         if self._show_id:
             field_names.append(Session.Key.ID)
@@ -258,75 +262,68 @@ class Sessions(SortedTable[Session]):
         if self._show_notes:
             field_names.append(Session.Key.NOTES)
 
-        table.field_names = field_names
-
-        for field in table.field_names:
-            table.align[field] = 'l'
-
-        for sess in self._rows:
-            row = list()
-            if self._show_id:
-                row.append(short_uuid(sess.id))
-            if self._show_name:
-                row.append(sess.name)
-            if self._show_device_ids:
-                row.append(
-                    wrap_for_column(', '.join(short_uuid(dev.id) for dev in sess.devices),
-                                    max_column_width=self.max_column_width)
-                )
-            if self._show_device_names:
-                row.append(
-                    wrap_for_column(
-                        ', '.join(
-                            dev.name if dev.name != str(dev.id) else short_uuid(dev.name)
-                            for dev in sess.devices
-                        ),
-                        max_column_width=self.max_column_width
-                    )
-                )
-            if self._show_active:
-                row.append(sess.active)
-            if self._show_description:
-                row.append(wrap_for_column(sess.description,
-                                           max_column_width=self.max_column_width))
-            if self._show_notes:
-                row.append(wrap_for_column(sess.notes,
-                                           max_column_width=self.max_column_width))
-
-            table.add_row(row)
+        return TableResp(self.table_name(), field_names, align='l',
+                         preserve_internal_whitespace=True)
 
-        return str(table)
+    def _make_table_row(self, sess: Session) -> list:
+        row = list()
+        if self._show_id:
+            row.append(short_uuid(sess.id))
+        if self._show_name:
+            row.append(sess.name)
+        if self._show_device_ids:
+            row.append(
+                wrap_for_column(', '.join(short_uuid(dev.id) for dev in sess.devices),
+                                max_column_width=self.max_column_width)
+            )
+        if self._show_device_names:
+            row.append(
+                wrap_for_column(
+                    ', '.join(
+                        dev.name if dev.name != str(dev.id) else short_uuid(dev.name)
+                        for dev in sess.devices
+                    ),
+                    max_column_width=self.max_column_width
+                )
+            )
+        if self._show_active:
+            row.append(sess.active)
+        if self._show_description:
+            row.append(wrap_for_column(sess.description,
+                                       max_column_width=self.max_column_width))
+        if self._show_notes:
+            row.append(wrap_for_column(sess.notes,
+                                       max_column_width=self.max_column_width))
+        return row
 
 class SessionEngine(BaseNamedTableEngine):
     model_class = Session
+    entity = ServiceOp.SESSION
 
     def add_entity(self, sess_name_or_id: str, entity: Entity, *entity_names_or_ids: str):
         sess = self.get(sess_name_or_id)
 
         if entity == Entity.DEVICE:
             link_engine = self._engine.link.session_device
-            get_entity = self._engine.device.get
+            entity_engine = self._engine.device
         elif entity == Entity.PROJECT:
             link_engine = self._engine.link.session_project
-            get_entity = self._engine.project.get
+            entity_engine = self._engine.project
         elif entity == Entity.TAG:
             link_engine = self._engine.link.session_tag
-            get_entity = self._engine.tag.get
+            entity_engine = self._engine.tag
         elif entity == Entity.USER:
             link_engine = self._engine.link.session_user
-            get_entity = self._engine.user.get
+            entity_engine = self._engine.user
         else:
             raise ValueError(f"Unsupported entity type: {entity}")
 
-        for entity_name_or_id in entity_names_or_ids:
-            i_entity = get_entity(entity_name_or_id)
-            link_engine.add(sess.id, i_entity.id)
+        ids = entity_engine.get_ids(entity_names_or_ids)
+        link_engine.add_many((sess.id, id_) for id_ in ids)
 
     def get(self, fuzzy_id: str) -> Session:
-        sess = self._get_one(fuzzy_id, Session.devices, Session.projects, Session.tags,
-                             Session.users)
-        self._populate_datapoint_count(sess)
-        return sess
+        return self._get_one_cached(fuzzy_id, Session.devices, Session.projects, Session.tags,
+                                    Session.users)
 
     def get_active_by_device_id(self, device_id: DeviceID) -> Sessions:
         with self._engine.new_session() as db_sess:
@@ -344,19 +341,48 @@ class SessionEngine(BaseNamedTableEngine):
             return Sessions(results)
 
     def get_datapoints(self, session_id: SessionID) -> DataPoints:
+        """
+        Return the datapoints of the devices over the intervals of the session, see
+        :class:`growbies.db.models.membership.SessionDeviceInterval`, and those linked explicitly.
+        """
+        member = (text(MEMBER_SQL)
+                  .bindparams(session_id=session_id)
+                  .columns(id=UUID(as_uuid=True), timestamp=DateTime(timezone=True))
+                  .subquery('member'))
         with self._engine.new_session() as db:
             # noinspection PyTypeChecker
             stmt = (
                 select(DataPoint)
-                .options(
-                    selectinload(DataPoint.mass_sensors),
-                    selectinload(DataPoint.temperature_sensors)
-                )
-                .join(SessionDataPointLink, SessionDataPointLink.right_id == DataPoint.id)
-                .where(SessionDataPointLink.left_id == session_id)
+                .join(member, and_(member.c.id == DataPoint.id,
+                                   member.c.timestamp == DataPoint.timestamp))
                 .order_by(DataPoint.timestamp)
             )
-            return DataPoints(db.exec(stmt).all())
+            # Without the sensor tables, the relationships are empty until the arrays are expanded.
+            # Those of a database not yet partitioned can not be joined by the ORM, see
+            # :func:`growbies.db.models.datapoint.sensor_join`.
+            load = (selectinload if self._engine.datapoint.has_sensor_tables
+                    and self._engine.partition.partitioned else noload)
+            stmt = stmt.options(load(DataPoint.mass_sensors), load(DataPoint.temperature_sensors))
+            datapoints = db.exec(stmt).all()
+            for datapoint in datapoints:
+                datapoint.expand_sensor_arrays()
+            return DataPoints(datapoints)
+
+    def get_datapoints_columnar(self, session_id: SessionID) -> DataPointColumns:
+        """
+        As :meth:`get_datapoints`, as arrays. No ORM objects are made, see
+        :meth:`DataPointColumns.make_sql`.
+        """
+        datapoint_sql = DataPointColumns.make_sql(
+            'true',
+            join=f'JOIN ({MEMBER_SQL}) member '
+                 f'ON member.id = dp.id AND member.timestamp = dp.timestamp',
+            legacy=self._engine.datapoint.has_sensor_tables,
+            partitioned=self._engine.partition.partitioned)
+
+        with self._engine.new_session() as db:
+            rows = db.exec(datapoint_sql, params={'session_id': session_id}).all()
+            return DataPointColumns.from_rows(rows)
 
     def list(self) -> Sessions:
         """Return all sessions with links eagerly loaded, using base class accessors."""
@@ -376,22 +402,21 @@ class SessionEngine(BaseNamedTableEngine):
 
         if entity == Entity.DEVICE:
             link_engine = self._engine.link.session_device
-            get_entity = self._engine.device.get
+            entity_engine = self._engine.device
         elif entity == Entity.PROJECT:
             link_engine = self._engine.link.session_project
-            get_entity = self._engine.project.get
+            entity_engine = self._engine.project
         elif entity == Entity.TAG:
             link_engine = self._engine.link.session_tag
-            get_entity = self._engine.tag.get
+            entity_engine = self._engine.tag
         elif entity == Entity.USER:
             link_engine = self._engine.link.session_user
-            get_entity = self._engine.user.get
+            entity_engine = self._engine.user
         else:
             raise ValueError(f"Unsupported entity type: {entity}")
 
-        for entity_name_or_id in entity_names_or_ids:
-            i_entity = get_entity(entity_name_or_id)
-            link_engine.remove(sess.id, i_entity.id)
+        ids = entity_engine.get_ids(entity_names_or_ids)
+        link_engine.remove_many((sess.id, id_) for id_ in ids)
 
     def upsert(self, model: Session, fields: Optional[dict] = None) -> Session:
         _fields = {
@@ -404,11 +429,24 @@ class SessionEngine(BaseNamedTableEngine):
         if fields:
             _fields.update(fields)
 
-        return super().upsert(model, _fields)
+        sess = super().upsert(model, _fields)
+        self._engine.membership.sync(sess.id)
+        return sess
 
-    def _populate_datapoint_count(self, session: Session) -> None:
-        with self._engine.new_session() as db:
-            count_stmt = select(func.count()).where(
-                SessionDataPointLink.left_id == session.id
-            )
-            session.datapoint_count = db.exec(count_stmt).first()
\ No newline at end of file
+    def _make_upsert_set(self, set_: dict) -> dict:
+        # The start and end times as :func:`update_timestamp`, which the upsert statement bypasses.
+        set_ = super()._make_upsert_set(set_)
+        table = Session.__table__
+        now = literal(get_utc_dt(), table.c.updated_at.type)
+        if Session.Key.ACTIVE in set_:
+            active, was_active = set_[Session.Key.ACTIVE], table.c.active
+            activated = and_(not_(was_active), active)
+            set_[Session.Key.START_TIME] = case(
+                (activated, func.coalesce(table.c.start_time, now)), else_=table.c.start_time)
+            set_[Session.Key.END_TIME] = case(
+                (activated, null()), (and_(was_active, not_(active)), now),
+                else_=table.c.end_time)
+        return set_
+
+    def _populate(self, session: Session) -> None:
+        session.datapoint_count = self._engine.counter.get_session_count(session.id)
\ No newline at end of file
@@ -3,14 +3,14 @@ from typing import Optional
 from uuid import UUID, uuid4
 import textwrap
 
-from prettytable import PrettyTable
 from sqlmodel import Field, Relationship
 
 from .common import BaseTable, BaseNamedTableEngine, BuiltinTagName, SortedTable
 from .link import SessionTagLink
 from .session import Session
 from growbies.constants import TABLE_COLUMN_WIDTH
-from growbies.service.common import ServiceCmdError
+from growbies.service.common import ServiceCmdError, ServiceOp
+from growbies.service.resp import TableResp
 from growbies.common.utils.report import short_uuid
 
 class Tag(BaseTable, table=True):
@@ -31,31 +31,24 @@ for key_ in Tag.Key:
     assert(hasattr(Tag, key_))
 
 class Tags(SortedTable[Tag]):
-    def __str__(self):
-        table = PrettyTable(title=self.table_name())
-        table.field_names = (Tag.Key.ID, Tag.Key.NAME, Tag.Key.DESCRIPTION)
-        for field in table.field_names:
-            table.align[field] = 'l'
-
-        for element in self._rows:
-            wrapped_desc = textwrap.fill(element.description or '', width=TABLE_COLUMN_WIDTH)
-            table.add_row([
-                short_uuid(element.id),
-                element.name,
-                wrapped_desc,
-            ])
-
-        return str(table)
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(), [Tag.Key.ID, Tag.Key.NAME, Tag.Key.DESCRIPTION],
+                         align='l')
+
+    def _make_table_row(self, element: Tag) -> list:
+        wrapped_desc = textwrap.fill(element.description or '', width=TABLE_COLUMN_WIDTH)
+        return [
+            short_uuid(element.id),
+            element.name,
+            wrapped_desc,
+        ]
 
 class TagEngine(BaseNamedTableEngine):
     model_class = Tag
-
-    def __init__(self, *args, **kw):
-        super().__init__(*args, **kw)
-        self._init_builtin_tags()
+    entity = ServiceOp.TAG
 
     def get(self, name_or_id: Optional[str]) -> Optional[Tag]:
-        return self._get_one(name_or_id, Tag.sessions)
+        return self._get_one_cached(name_or_id, Tag.sessions)
 
     def get_exact(self, name: str) -> Optional[Tag]:
         return super()._get_exact(name, Tag.sessions)
@@ -81,7 +74,8 @@ class TagEngine(BaseNamedTableEngine):
              Tag.Key.DESCRIPTION: model.description}
         )
 
-    def _init_builtin_tags(self):
+    def init(self):
+        """Add the builtin tags that are missing."""
         for name in BuiltinTagName:
             existing = self.get_exact(name)
             if not existing:
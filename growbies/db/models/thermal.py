@@ -0,0 +1,45 @@
+from datetime import datetime
+from enum import StrEnum
+from typing import Optional
+import uuid
+
+from sqlalchemy import Column, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlmodel import Field
+
+from .common import BaseModel
+
+class ThermalState(BaseModel, table=True):
+    """
+    The state of a thermal device at a point in time, as sampled by
+    :mod:`growbies.app.thermal.thermal_cal`. Values that could not be sampled are NULL, with the
+    reason in the error.
+    """
+    class Key(StrEnum):
+        DEVICE_ID = 'device_id'
+        TIMESTAMP = 'timestamp'
+        ACTIVE = 'active'
+        MODE = 'mode'
+        DUTY_CYCLE = 'duty_cycle'
+        SET_POINT = 'set_point'
+        HEATER_ON = 'heater_on'
+        FAN_ON = 'fan_on'
+        TEMPERATURE = 'temperature'
+        CONTROLLER_PROPORTIONAL_TERM = 'controller_proportional_term'
+        CONTROLLER_INTEGRAL_TERM = 'controller_integral_term'
+        ERROR = 'error'
+
+    device_id: uuid.UUID = Field(
+        sa_column=Column(UUID(as_uuid=True), ForeignKey('device.id', ondelete='CASCADE'),
+                         primary_key=True))
+    timestamp: datetime = Field(primary_key=True)
+    active: Optional[bool] = None
+    mode: Optional[str] = None
+    duty_cycle: Optional[float] = None
+    set_point: Optional[float] = None
+    heater_on: Optional[bool] = None
+    fan_on: Optional[bool] = None
+    temperature: Optional[float] = None
+    controller_proportional_term: Optional[float] = None
+    controller_integral_term: Optional[float] = None
+    error: Optional[str] = None
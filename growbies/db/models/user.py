@@ -2,13 +2,14 @@ from enum import StrEnum
 from typing import TYPE_CHECKING
 import uuid
 
-from prettytable import PrettyTable
 from sqlmodel import Field, Relationship
 
 from .common import BaseTable, BaseNamedTableEngine, SortedTable
 from .link import SessionUserLink
 from growbies.common.utils.report import short_uuid
 from growbies.common.utils.types import FuzzyID
+from growbies.service.common import ServiceOp
+from growbies.service.resp import TableResp
 
 if TYPE_CHECKING:
     from .session import Session
@@ -26,26 +27,23 @@ class User(BaseTable, table=True):
     sessions: list['Session'] = Relationship(back_populates='users',link_model=SessionUserLink)
 
 class Users(SortedTable[User]):
-    def __str__(self):
-        table = PrettyTable(title=self.table_name())
-        table.field_names = (User.Key.ID, User.Key.NAME, User.Key.EMAIL)
-        for field in table.field_names:
-            table.align[field] = 'l'
+    def make_table_resp(self) -> TableResp:
+        return TableResp(self.table_name(), [User.Key.ID, User.Key.NAME, User.Key.EMAIL],
+                         align='l')
 
-        for user in self._rows:
-            table.add_row([
-                short_uuid(user.id),
-                user.name,
-                user.email,
-            ])
-
-        return str(table)
+    def _make_table_row(self, user: User) -> list:
+        return [
+            short_uuid(user.id),
+            user.name,
+            user.email,
+        ]
 
 class UserEngine(BaseNamedTableEngine):
     model_class = User
+    entity = ServiceOp.USER
 
     def get(self, fuzzy_id: FuzzyID) -> User:
-        return self._get_one(fuzzy_id, self.model_class.sessions)
+        return self._get_one_cached(fuzzy_id, self.model_class.sessions)
 
     def list(self) -> Users:
         return Users(self._get_all(self.model_class.sessions))
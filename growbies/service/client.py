@@ -0,0 +1,247 @@
+from argparse import ArgumentParser
+from typing import Iterable, Optional, TextIO
+import logging
+import shlex
+import sys
+
+from growbies.cli.common import ClientOp, CMD, EXPORT, IMPORT, Param
+from growbies.cli.device import Action
+from growbies.cli.main import make_cli, make_op_cli, select_op
+from growbies.common.utils.types import DeviceID
+from growbies.constants import USERNAME
+from growbies.protocol.resp import DeviceError
+from growbies.service.common import (BatchServiceCmd, ServiceCmd, ServiceCmdError, ServiceOp,
+                                     TBaseServiceCmd)
+from growbies.service.queue import RespQueue, ServiceQueue
+
+logger = logging.getLogger(__name__)
+
+class Client:
+    """
+    A client of the service. Commands are submitted back to back over the same command queue,
+    with a response channel per command.
+    """
+    def __init__(self, parser: Optional[ArgumentParser] = None,
+                 parsers: Optional[dict[str, ArgumentParser]] = None,
+                 built_ops: Iterable[str] = tuple()):
+        """
+        :param parser: The root parser, as returned by :func:`make_cli`. Built on first use if not
+            provided.
+        :param parsers: The sub-parsers, as returned by :func:`make_cli`.
+        :param built_ops: The operations that have had their sub-parsers built. The others are
+            built on first use.
+        """
+        self._cmd_q = ServiceQueue()
+        self._parser = parser
+        self._parsers = parsers if parsers is not None else dict()
+        self._built_ops = set(built_ops)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def parse(self, argv: list[str]) -> ServiceCmd:
+        """
+        Parse command line arguments, with or without the leading "growbies", into a command.
+
+        raises:
+            :class:`SystemExit`: On a parsing error or on a request for help, as per argparse.
+        """
+        if self._parser is None:
+            self._parser, self._parsers = make_cli(ops=tuple())
+
+        if argv and argv[0] == USERNAME:
+            argv = argv[1:]
+
+        op = select_op(argv)
+        if op is not None and op not in self._built_ops:
+            make_op_cli(self._parsers, op)
+            self._built_ops.add(op)
+
+        known, unknown = self._parser.parse_known_args(argv)
+        kw = vars(known)
+        op = kw.pop(CMD)
+        if unknown:
+            self._parsers[op].error(f'Unknown arguments encountered "{unknown}"')
+        if op in tuple(ClientOp):
+            self._parsers[op].error(f'"{op}" can not be run from here.')
+
+        return ServiceCmd(op=ServiceOp(op), kw=kw)
+
+    def run(self, cmd: TBaseServiceCmd, timeout: Optional[float] = None):
+        """
+        Submit a command to the service and return the response.
+
+        raises:
+            :class:`DeviceError`
+            :class:`ServiceCmdError`
+        """
+        if timeout is None:
+            timeout = cmd.op.timeout_s
+
+        with RespQueue() as resp_q:
+            cmd.qid = resp_q.qid
+            self._cmd_q.put(cmd)
+            try:
+                resp = resp_q.get_resp(timeout=timeout)
+            except TimeoutError:
+                raise ServiceCmdError(f'Command {cmd.op} timeout of {timeout} seconds.')
+
+        if isinstance(resp, (ServiceCmdError, DeviceError)):
+            raise resp
+        return resp
+
+    def run_batch(self, cmds: list[ServiceCmd], stop_on_error: bool = False,
+                  timeout: Optional[float] = None) -> list:
+        """
+        Submit commands to the service in one request and return their responses, in order. The
+        error of a failed command is returned in place of its response. With stop_on_error, the
+        responses end at the first failed command.
+
+        raises:
+            :class:`ServiceCmdError`: If the batch times out.
+        """
+        batch = BatchServiceCmd(cmds, stop_on_error=stop_on_error)
+        if timeout is None:
+            timeout = batch.timeout_s
+
+        with RespQueue() as resp_q:
+            batch.qid = resp_q.qid
+            self._cmd_q.put(batch)
+            try:
+                resps = resp_q.get_resp(timeout=timeout)
+            except TimeoutError:
+                raise ServiceCmdError(f'Batch of {len(cmds)} commands timeout of {timeout} '
+                                      f'seconds.')
+
+        if isinstance(resps, ServiceCmdError):
+            raise resps
+        return resps
+
+    def exec_args(self, argv: list[str], stdout: TextIO = sys.stdout,
+                  stderr: TextIO = sys.stderr) -> int:
+        """Run a command line, writing the response as the CLI would. Return the exit code."""
+        try:
+            cmd = self.parse(argv)
+        except SystemExit as err:
+            return err.code or 0
+        return self.exec_cmd(cmd, stdout=stdout, stderr=stderr)
+
+    def exec_cmd(self, cmd: TBaseServiceCmd, stdout: TextIO = sys.stdout,
+                 stderr: TextIO = sys.stderr) -> int:
+        """Run a parsed command, writing the response as the CLI would. Return the exit code."""
+        try:
+            if self._is_export(cmd):
+                # An export streams the datapoints of an entity to a file for as long as that
+                # takes, so it is run here rather than holding up the service. As is an import.
+                from growbies.service.cmd import export
+                resp = export.execute(cmd)
+            elif self._is_import(cmd):
+                from growbies.service.cmd import load
+                resp = load.execute(cmd, progress=stderr, recount=self._recount)
+            else:
+                resp = self.run(cmd)
+        except (ServiceCmdError, DeviceError) as err:
+            resp = err
+        return self.write_resp(resp, stdout=stdout, stderr=stderr)
+
+    @staticmethod
+    def _is_export(cmd: TBaseServiceCmd) -> bool:
+        return (isinstance(cmd, ServiceCmd)
+                and cmd.op in (ServiceOp.DEVICE, ServiceOp.SESSION)
+                and cmd.kw.get(Param.ACTION) == EXPORT)
+
+    def _recount(self, device_id: DeviceID):
+        # By the service, which caches the datapoint counts of the sessions.
+        self.run(ServiceCmd(ServiceOp.DEVICE, {Param.ACTION: Action.RECOUNT,
+                                               Param.FUZZY_ID: str(device_id)}))
+
+    @staticmethod
+    def _is_import(cmd: TBaseServiceCmd) -> bool:
+        return (isinstance(cmd, ServiceCmd)
+                and cmd.op == ServiceOp.DEVICE
+                and cmd.kw.get(Param.ACTION) == IMPORT)
+
+    @staticmethod
+    def write_resp(resp, stdout: TextIO = sys.stdout, stderr: TextIO = sys.stderr) -> int:
+        """Write a response as the CLI would. Return the exit code."""
+        if isinstance(resp, (ServiceCmdError, DeviceError)):
+            stderr.write(f'{resp}\n')
+            stderr.flush()
+            return getattr(resp, 'error', 1)
+
+        if resp is not None:
+            stdout.write(f'{resp}\n')
+            stdout.flush()
+        return 0
+
+    def exec_line(self, line: str, stdout: TextIO = sys.stdout, stderr: TextIO = sys.stderr) -> int:
+        """Split a command line as a POSIX shell would and run it as per :meth:`exec_args`."""
+        try:
+            argv = shlex.split(line)
+        except ValueError as err:
+            stderr.write(f'{err}\n')
+            stderr.flush()
+            return 2
+        return self.exec_args(argv, stdout=stdout, stderr=stderr)
+
+class Shell:
+    """
+    Run commands read from standard input over a single :class:`Client`.
+
+    When standard input is a terminal, an interactive prompt is presented. Otherwise, commands are
+    read one per line and the output of each is terminated with :data:`END_OF_RESP` followed by
+    the return code of the command and a newline.
+    """
+    PROMPT = f'{USERNAME}> '
+    END_OF_RESP = '\x1e'
+    EXIT_CMDS = ('exit', 'quit')
+    COMMENT = '#'
+
+    def __init__(self, client: Client, line_protocol: bool = False):
+        self._client = client
+        self._line_protocol = line_protocol
+
+    def run(self, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout) -> int:
+        interactive = stdin.isatty() and not self._line_protocol
+        if interactive:
+            # Importing readline adds line editing and history to input().
+            # noinspection PyUnresolvedReferences
+            import readline
+
+        while True:
+            if interactive:
+                try:
+                    line = input(self.PROMPT)
+                except EOFError:
+                    stdout.write('\n')
+                    break
+                except KeyboardInterrupt:
+                    stdout.write('\n')
+                    continue
+            else:
+                line = stdin.readline()
+                if not line:
+                    break
+
+            line = line.strip()
+            if not line or line.startswith(self.COMMENT):
+                continue
+            if line in self.EXIT_CMDS:
+                break
+
+            try:
+                returncode = self._client.exec_line(line, stdout=stdout)
+            except KeyboardInterrupt:
+                if not interactive:
+                    raise
+                stdout.write('\n')
+                continue
+
+            if not interactive:
+                stdout.write(f'{self.END_OF_RESP}{returncode}\n')
+                stdout.flush()
+
+        return 0
@@ -1,7 +1,7 @@
 from typing import Optional
 import logging
 
-from . import ls
+from . import export, load, ls
 from ..common import ServiceCmd
 from growbies.cli.device import Action, Param, ModParam
 from growbies.db.engine import get_db_engine
@@ -11,7 +11,7 @@ from growbies.worker.pool import get_pool
 
 logger = logging.getLogger(__name__)
 
-def execute(cmd: ServiceCmd) -> Optional[Device | Devices]:
+def execute(cmd: ServiceCmd) -> Optional[Device | Devices | str]:
     engine = get_db_engine()
 
     fuzzy_id = cmd.kw.pop(Param.FUZZY_ID, None)
@@ -27,6 +27,12 @@ def execute(cmd: ServiceCmd) -> Optional[Device | Devices]:
             engine.device.clear_active(dev.id)
             worker_pool.disconnect(dev.id)
             worker_pool.join_all(dev.id)
+    elif action == Action.EXPORT:
+        cmd.kw[Param.FUZZY_ID] = fuzzy_id
+        return export.execute(cmd)
+    elif action == Action.IMPORT:
+        cmd.kw[Param.FUZZY_ID] = fuzzy_id
+        return load.execute(cmd)
     elif action in (None, Action.LS):
         if fuzzy_id:
             return engine.device.get(fuzzy_id)
@@ -37,4 +43,6 @@ def execute(cmd: ServiceCmd) -> Optional[Device | Devices]:
         dev = engine.device.get(fuzzy_id)
         dev.name = new_name
         engine.device.upsert(dev)
+    elif action == Action.RECOUNT:
+        engine.counter.reconcile_device(engine.device.get(fuzzy_id).id)
     return None
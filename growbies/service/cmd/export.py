@@ -0,0 +1,38 @@
+import logging
+import os
+
+from ..common import ServiceCmd, ServiceOp
+from growbies.cli.common import ExportFormat, ExportParam, Param
+from growbies.db.engine import get_db_engine
+
+logger = logging.getLogger(__name__)
+
+def execute(cmd: ServiceCmd) -> str:
+    """
+    Export the datapoints of a device or a session to a file. This is run by the client, against
+    the database, as an export takes as long as the datapoints take to stream.
+    """
+    # Imported here, as pyarrow is only needed for exporting.
+    from growbies.db import export
+
+    engine = get_db_engine()
+    fuzzy_id = cmd.kw.pop(Param.FUZZY_ID)
+    format_ = ExportFormat(cmd.kw.pop(ExportParam.FORMAT))
+    path = cmd.kw.pop(ExportParam.OUT)
+
+    if cmd.op == ServiceOp.DEVICE:
+        device = engine.device.get(fuzzy_id)
+        path = _make_path(path, device.name, format_)
+        count = export.export_device(engine, device.id, cmd.kw.pop(ExportParam.START),
+                                     cmd.kw.pop(ExportParam.END), path, format_)
+    else:
+        session = engine.session.get(fuzzy_id)
+        path = _make_path(path, session.name, format_)
+        count = export.export_session(engine, session.id, path, format_)
+
+    return f'Exported {count} datapoints to "{path}".'
+
+def _make_path(path: str | None, name: str, format_: ExportFormat) -> str:
+    if path is None:
+        path = f'{name}{format_.suffix}'
+    return os.path.abspath(path)
@@ -0,0 +1,50 @@
+from typing import Callable, Optional, TextIO
+import logging
+import os
+
+from ..common import ServiceCmd
+from growbies.cli.common import Param
+from growbies.cli.device import ImportParam
+from growbies.common.utils.types import DeviceID
+from growbies.db.engine import get_db_engine
+
+logger = logging.getLogger(__name__)
+
+def execute(cmd: ServiceCmd, progress: Optional[TextIO] = None,
+            recount: Optional[Callable[[DeviceID], None]] = None) -> str:
+    """
+    Import the datapoints of a device, or the states of a thermal device, from a file. This is run
+    by the client, against the database, as an import takes as long as the file takes to load.
+
+    :param progress: To write the progress of the import to, as it goes.
+    :param recount: Recounts the datapoints of the device and its sessions after datapoints are
+        imported, by default in this process. The client has the service recount, as the service
+        caches the counts of the sessions.
+    """
+    # Imported here, as pyarrow is only needed for importing.
+    from growbies.db import load
+
+    engine = get_db_engine()
+    device = engine.device.get(cmd.kw.pop(Param.FUZZY_ID))
+    path = os.path.abspath(cmd.kw.pop(ImportParam.PATH))
+    thermal = cmd.kw.pop(ImportParam.THERMAL, False)
+
+    def write_progress(read: int, loaded: int):
+        progress.write(f'\rRead {read} rows, imported {loaded}.')
+        progress.flush()
+
+    if thermal:
+        read, loaded = load.load_thermal_states(engine, device.id, path,
+                                                write_progress if progress else None)
+    else:
+        read, loaded = load.load_datapoints(engine, device.id, path,
+                                            write_progress if progress else None)
+        if loaded:
+            (recount or engine.counter.reconcile_device)(device.id)
+    if progress and read:
+        progress.write('\n')
+
+    resp = f'Imported {loaded} of {read} rows from "{path}".'
+    if loaded < read:
+        resp += ' The others were at timestamps already recorded, or incomplete.'
+    return resp
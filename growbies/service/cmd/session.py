@@ -1,6 +1,7 @@
 from typing import Optional
 import logging
 
+from . import export
 from ..common import ServiceCmd
 from growbies.cli.common import Param as commonParam
 from growbies.cli.session import Action, Param, ModParam, ModNewParam, RmParam, Entity
@@ -10,7 +11,7 @@ from growbies.common.utils.report import decode_escapes
 
 logger = logging.getLogger(__name__)
 
-def execute(cmd: ServiceCmd) -> Optional[Session | Sessions]:
+def execute(cmd: ServiceCmd) -> Optional[Session | Sessions | str]:
     engine = get_db_engine()
 
     session_name = cmd.kw.pop(commonParam.FUZZY_ID, None)
@@ -64,6 +65,9 @@ def execute(cmd: ServiceCmd) -> Optional[Session | Sessions]:
 
         engine.session.upsert(sess)
         return None
+    elif action == Action.EXPORT:
+        cmd.kw[commonParam.FUZZY_ID] = session_name
+        return export.execute(cmd)
     elif action == Action.LS:
         return engine.session.get(session_name)
     else:
@@ -78,8 +78,30 @@ class ServiceOp(StrEnum):
         return 10.0
 
 class ServiceCmd:
-    def __init__(self, op: ServiceOp, kw: dict, qid: Optional[int | str] = None):
+    def __init__(self, op: ServiceOp, kw: dict, qid: Optional[str] = None):
         self.op = op
         self.qid = qid
         self.kw = kw
 TBaseServiceCmd = TypeVar("TBaseServiceCmd", bound=ServiceCmd)
+
+class BatchServiceCmd:
+    """
+    Commands submitted together and executed in order by the service. The response is a list of
+    the results of the commands, in order. A command that fails has its error in place of its
+    result.
+    """
+    def __init__(self, cmds: list[ServiceCmd], stop_on_error: bool = False,
+                 qid: Optional[str] = None):
+        """
+        :param cmds: The commands to execute, in order.
+        :param stop_on_error: Stop at the first command that fails. The list of results then ends
+            with the error of the failed command.
+        :param qid: The response queue ID.
+        """
+        self.cmds = list(cmds)
+        self.stop_on_error = stop_on_error
+        self.qid = qid
+
+    @property
+    def timeout_s(self) -> float:
+        return sum(cmd.op.timeout_s for cmd in self.cmds)
@@ -1,15 +1,17 @@
 from contextlib import contextmanager
 from pathlib import Path
-from typing import BinaryIO, cast, Generator, Iterator, Optional
-import atexit
+from typing import BinaryIO, cast, Generator, Iterator, Optional, Union
 import logging
 import os
 import pickle
+import pwd
+import socket
+import struct
 import time
 
-from inotify_simple import INotify, flags
-
-from growbies.service.common import TBaseServiceCmd
+from growbies.constants import USERNAME
+from growbies.service.common import BatchServiceCmd, TBaseServiceCmd
+from growbies.service.resp import TableResp, TableRowsResp
 from growbies.common.utils.filelock import FileLock
 from growbies.common.utils.paths import InstallPaths
 from growbies.common.utils.types import Pickleable_t
@@ -30,7 +32,8 @@ class Queue:
 
         # Initialize path
         self._path.touch(exist_ok=True)
-        self._inotify = INotify()
+        # Only the consumer watches the queue. Producers, such as the CLI, skip the import.
+        self._inotify = None
         self._inotify_watch = None
 
         self._cached_mtime = 0
@@ -55,6 +58,8 @@ class Queue:
                 file.clear()
             else:
                 if not self._inotify_watch:
+                    from inotify_simple import INotify, flags
+                    self._inotify = INotify()
                     self._inotify_watch = self._inotify.add_watch(self._path, flags.CLOSE_WRITE)
 
         return contents
@@ -109,42 +114,146 @@ class Queue:
             raise last_exc
 
 
-class IDQueue(Queue):
-    def __init__(self, qid: Optional[int | str] = None):
-        # If pid is None, the file is being created from new. Cleanup with be automated. Else,
-        # if pid is not None, cleanup will not be automated as the object will be attaching to an
-        # existing file instead of creating from new. It is the responsibility of the creator to
-        # clean up.
+class RespQueue:
+    """
+    A per-command response channel between the service and a client.
+
+    The client binds a listening unix stream socket to an auto-generated address in the Linux
+    abstract namespace. The address is passed to the service as the command's ``qid``. The service
+    connects to that address and writes one or more length prefixed, pickled frames, closing the
+    connection to signal the end of the response.
+
+    Abstract namespace sockets have no presence on the filesystem, so there is no file to create,
+    lock or clean up. The kernel releases the address when the client socket is closed.
+    """
+    _HDR = struct.Struct('!I')
+    _RECV_BYTES = 64 * 1024
+    CONNECT_TIMEOUT_SEC = 1.0
+    # A client that stops reading fails the send rather than blocking the service.
+    SEND_TIMEOUT_SEC = 5.0
+
+    def __init__(self, qid: Optional[str] = None):
+        # If qid is None, this is the client end and a new address is bound. Else, this is the
+        # service end and the object will be attaching to the address the client bound.
+        self._conn: Optional[socket.socket] = None
+        self._sock: Optional[socket.socket] = None
         if qid is None:
-            qid = os.getpid()
-            self._auto_cleanup = True
+            self._is_client = True
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Binding to an empty address auto-binds a unique address in the abstract namespace.
+            self._sock.bind('')
+            self._sock.listen(1)
+            self._qid = self._sock.getsockname().decode()
         else:
-            self._auto_cleanup = False
-
-        self._qid = str(qid)
-
-        self._path = InstallPaths.RUN_GROWBIES.value / f'{qid}_resp_queue.pkl'
-        super().__init__(self._path)
+            self._is_client = False
+            self._qid = qid
 
-        if self._auto_cleanup:
-            atexit.register(self.cleanup)
+    def __enter__(self):
+        return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self._auto_cleanup:
-            self.cleanup()
-
-    def cleanup(self):
-        try:
-            os.remove(self._path)
-        except FileNotFoundError:
-            pass
-        except Exception as e:
-            logger.warning(f"Warning: failed to remove {self._path} at exit: {e}")
+        self.close()
 
     @property
     def qid(self) -> str:
         return self._qid
 
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def get_w_timeout(self, timeout: float) -> Iterator[Pickleable_t]:
+        """
+        Yield response frames as they arrive, until the service closes the connection.
+
+        Nothing is yielded if the service does not connect, or if a frame is not completed,
+        within the timeout.
+        """
+        deadline = time.time() + timeout
+        self._sock.settimeout(timeout)
+        try:
+            conn, _ = self._sock.accept()
+        except TimeoutError:
+            return
+
+        with conn:
+            if not self._is_peer_trusted(conn):
+                logger.error('Dropping response from an untrusted peer.')
+                return
+            buf = bytearray()
+            while True:
+                timeout_remaining = deadline - time.time()
+                if timeout_remaining <= 0:
+                    return
+                conn.settimeout(timeout_remaining)
+                try:
+                    chunk = conn.recv(self._RECV_BYTES)
+                except TimeoutError:
+                    return
+                if not chunk:
+                    return
+                buf.extend(chunk)
+                while len(buf) >= self._HDR.size:
+                    length, = self._HDR.unpack_from(buf)
+                    if len(buf) < self._HDR.size + length:
+                        break
+                    frame = bytes(buf[self._HDR.size:self._HDR.size + length])
+                    del buf[:self._HDR.size + length]
+                    yield pickle.loads(frame)
+
+    def get_resp(self, timeout: float) -> Pickleable_t:
+        """
+        Return the complete response, merging streamed :class:`TableRowsResp` chunks into the
+        :class:`TableResp` header that precedes them.
+
+        raises:
+            :class:`TimeoutError`: If no response is received within the timeout.
+        """
+        received = False
+        resp = None
+        for item in self.get_w_timeout(timeout):
+            if isinstance(item, TableRowsResp) and isinstance(resp, TableResp):
+                resp.extend(item)
+            else:
+                resp = item
+            received = True
+        if not received:
+            raise TimeoutError
+        return resp
+
+    def put(self, item: Pickleable_t):
+        """
+        Send a frame to the client.
+
+        raises:
+            :class:`OSError`: If the client can not be connected to, or does not read the frame
+                within :attr:`SEND_TIMEOUT_SEC`, such as :class:`TimeoutError`.
+        """
+        if self._conn is None:
+            self._conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._conn.settimeout(self.CONNECT_TIMEOUT_SEC)
+            self._conn.connect(self._qid)
+            self._conn.settimeout(self.SEND_TIMEOUT_SEC)
+        payload = pickle.dumps(item)
+        self._conn.sendall(self._HDR.pack(len(payload)) + payload)
+
+    @staticmethod
+    def _is_peer_trusted(conn: socket.socket) -> bool:
+        """Only accept responses from root, the service user or ourselves."""
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                struct.calcsize('3i'))
+        _, uid, _ = struct.unpack('3i', creds)
+        trusted = {0, os.getuid()}
+        try:
+            trusted.add(pwd.getpwnam(USERNAME).pw_uid)
+        except KeyError:
+            pass
+        return uid in trusted
+
 
 class ServiceQueue(Queue):
     PATH = InstallPaths.RUN_GROWBIES_CMD_Q.value
@@ -152,8 +261,8 @@ class ServiceQueue(Queue):
     def __init__(self):
         super().__init__(self.PATH)
 
-    def get_w_timeout(self, *args, **kw) -> Iterator[TBaseServiceCmd]:
+    def get_w_timeout(self, *args, **kw) -> Iterator[Union[TBaseServiceCmd, BatchServiceCmd]]:
         yield from super().get_w_timeout(*args, **kw)
 
-    def put(self, cmd: TBaseServiceCmd):
+    def put(self, cmd: Union[TBaseServiceCmd, BatchServiceCmd]):
         return super().put(cmd)
@@ -0,0 +1,39 @@
+from typing import Iterable, Optional
+
+class TableResp:
+    """
+    A table made only of plain types.
+
+    The service sends the header, then the rows in :class:`TableRowsResp` chunks. The table is
+    rendered by the client so that the service does not pay the rendering cost.
+    """
+    def __init__(self, title: str, field_names: list[str], align: Optional[str] = None,
+                 preserve_internal_whitespace: bool = False, rows: Optional[list[list]] = None):
+        self.title = title
+        self.field_names = list(field_names)
+        self.align = align
+        self.preserve_internal_whitespace = preserve_internal_whitespace
+        self.rows = rows if rows is not None else list()
+
+    def extend(self, rows: Iterable[list]):
+        self.rows.extend(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __str__(self):
+        # Delayed import for CLI responsiveness
+        from prettytable import PrettyTable
+        table = PrettyTable(self.field_names, title=self.title)
+        table.preserve_internal_whitespace = self.preserve_internal_whitespace
+        if self.align is not None:
+            table.align = self.align
+        for row in self.rows:
+            table.add_row(row)
+        return str(table)
+
+class TableRowsResp(list):
+    """A chunk of rows following a :class:`TableResp` header."""
+
+class BatchResp(list):
+    """The results of a :class:`BatchServiceCmd`, in order. Errors are in place of results."""
@@ -1,7 +1,12 @@
+from itertools import islice
 import logging
 
-from .common import ServiceOp, ServiceCmdError
-from .queue import ServiceQueue, IDQueue
+from .common import BatchServiceCmd, ServiceCmd, ServiceOp, ServiceCmdError
+from .queue import ServiceQueue, RespQueue
+from .resp import BatchResp, TableRowsResp
+from growbies.cfg import get_cfg
+from growbies.db.engine import get_db_engine
+from growbies.db.models.common import BaseTable, SortedTable
 from growbies.protocol.resp import DeviceError
 from growbies.service.cmd import cal, device, ls, project, read, session, tag, thermal, user
 from growbies.service.cmd import nvm
@@ -11,6 +16,7 @@ from growbies.worker.pool import get_pool
 logger = logging.getLogger(__name__)
 
 QUEUE_GET_TIMEOUT_SEC = 10
+RESP_TABLE_CHUNK_ROWS = 256
 
 class Service:
     def __init__(self):
@@ -24,49 +30,103 @@ class Service:
     def _connect_all_active():
         get_pool().connect(*(dev.id for dev in ls.execute() if dev.is_active()))
 
+    @staticmethod
+    def _execute(cmd: ServiceCmd):
+        """Execute a command, returning the response. Errors are returned rather than raised."""
+        logger.info(f'Servicing {cmd.op} command.')
+        try:
+            if cmd.op == ServiceOp.CAL:
+                return cal.execute(cmd)
+            elif cmd.op == ServiceOp.DEVICE:
+                return device.execute(cmd)
+            elif cmd.op == ServiceOp.NVM:
+                return nvm.execute(cmd)
+            elif cmd.op == ServiceOp.PROJECT:
+                return project.execute(cmd)
+            elif cmd.op == ServiceOp.READ:
+                return read.execute(cmd)
+            elif cmd.op == ServiceOp.SESSION:
+                return session.execute(cmd)
+            elif cmd.op == ServiceOp.TAG:
+                return tag.execute(cmd)
+            elif cmd.op == ServiceOp.THERMAL:
+                return thermal.execute(cmd)
+            elif cmd.op == ServiceOp.USER:
+                return user.execute(cmd)
+            else:
+                return ServiceCmdError(f'Unknown command "{cmd.op}" received.')
+        except (DeviceError, ServiceCmdError) as err:
+            logger.error(err)
+            return err
+
+    @classmethod
+    def _execute_batch(cls, batch: BatchServiceCmd) -> BatchResp:
+        logger.info(f'Servicing batch of {len(batch.cmds)} commands.')
+        resps = BatchResp()
+        for cmd in batch.cmds:
+            resp = cls._execute(cmd)
+            resps.append(cls._make_resp(resp))
+            if batch.stop_on_error and isinstance(resp, (DeviceError, ServiceCmdError)):
+                break
+        return resps
+
+    @staticmethod
+    def _make_resp(resp):
+        """Return a response in a form that the client can unpickle without the ORM."""
+        if isinstance(resp, SortedTable):
+            table_resp = resp.make_table_resp()
+            table_resp.extend(resp.iter_table_rows())
+            return table_resp
+        elif isinstance(resp, BaseTable):
+            return str(resp)
+        return resp
+
+    @staticmethod
+    def _put_resp(resp_q: RespQueue, resp):
+        if isinstance(resp, SortedTable):
+            # Tables are sent as plain typed rows, in chunks so that no one frame is large. The
+            # client does the rendering.
+            resp_q.put(resp.make_table_resp())
+            rows = resp.iter_table_rows()
+            while chunk := list(islice(rows, RESP_TABLE_CHUNK_ROWS)):
+                resp_q.put(TableRowsResp(chunk))
+        elif isinstance(resp, BaseTable):
+            # A single record is small. Render it here so that the client does not need to import
+            # the ORM to unpickle it.
+            resp_q.put(str(resp))
+        else:
+            # Errors, None and device protocol structures are sent as is.
+            resp_q.put(resp)
+
     def run(self):
         logger.info('Service start.')
+        # Tab completion of IDs and names is served from this index.
+        get_db_engine().enable_id_index()
+        # Repeated lookups, such as of a device on every read, are served from this cache.
+        get_db_engine().enable_cache()
+        # Retention drops whole months, so checking at start suffices.
+        get_db_engine().partition.apply_retention(get_cfg().database.retention_months)
         self._connect_all_active()
 
         done = False
         try:
             while not done:
                 for cmd in self._queue.get_w_timeout(QUEUE_GET_TIMEOUT_SEC):
-                    logger.info(f'Servicing {cmd.op} command.')
-                    with IDQueue(cmd.qid) as resp_q:
-                        try:
-                            if cmd.op == ServiceOp.CAL:
-                                resp = cal.execute(cmd)
-                            elif cmd.op == ServiceOp.DEVICE:
-                                resp = device.execute(cmd)
-                            elif cmd.op == ServiceOp.NVM:
-                                resp = nvm.execute(cmd)
-                            elif cmd.op == ServiceOp.PROJECT:
-                                resp = project.execute(cmd)
-                            elif cmd.op == ServiceOp.READ:
-                                resp = read.execute(cmd)
-                            elif cmd.op == ServiceOp.SESSION:
-                                resp = session.execute(cmd)
-                            elif cmd.op == ServiceOp.TAG:
-                                resp = tag.execute(cmd)
-                            elif cmd.op == ServiceOp.THERMAL:
-                                resp = thermal.execute(cmd)
-                            elif cmd.op == ServiceOp.USER:
-                                resp = user.execute(cmd)
-                            else:
-                                resp = ServiceCmdError(f'Unknown command "{cmd.op}" received.')
-                        except (DeviceError, ServiceCmdError) as err:
-                            logger.error(err)
-                            resp = err
-
-                        if isinstance(resp, Exception) or resp is None:
-                            resp_q.put(resp)
+                    with RespQueue(cmd.qid) as resp_q:
+                        if isinstance(cmd, BatchServiceCmd):
+                            resp = self._execute_batch(cmd)
                         else:
-                            resp_q.put(str(resp))
+                            resp = self._execute(cmd)
+
+                        try:
+                            self._put_resp(resp_q, resp)
+                        except OSError as err:
+                            logger.error(f'Unable to deliver response: {err}')
 
         except KeyboardInterrupt:
             pass
         get_pool().disconnect_all()
         get_pool().join_all()
+        logger.info(f'Entity cache: {get_db_engine().cache}')
         logger.info('Service exit.')
 
@@ -18,8 +18,11 @@ class Session(object):
         # Load configuration from file.
         self._cfg = get_cfg()
 
-        # Update the DB with account and gateway information input via configuration.
+        # Set up the database, and migrate it, ahead of using it.
         db_engine = get_db_engine()
+        db_engine.init()
+
+        # Update the DB with account and gateway information input via configuration.
         cfg_account = Account(**asdict(self._cfg.account))
         db_accounts = db_engine.account.get_multi(cfg_account.name)
         if db_accounts:
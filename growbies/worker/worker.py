@@ -10,6 +10,7 @@ from serial.serialutil import SerialException
 
 from growbies.constants import UINT8_MAX
 from growbies.db.engine import get_db_engine
+from growbies.db.models.device import ConnectionState
 from growbies.protocol.cmd import TDeviceCmd, ReadDeviceCmd
 from growbies.protocol.resp import (DeviceRespOp, DeviceError, ErrorDeviceResp,
                                     RespPacketHdr, TDeviceResp)
@@ -138,9 +139,9 @@ class Worker(Thread):
 
     def _record_datapoint(self, datapoint: DataPoint, cmd: ReadDeviceCmd | None = None):
         tare_id = self._db_engine.tare.insert(datapoint.tare).id
-        datapoint = self._db_engine.datapoint.insert(self._device_id, tare_id, datapoint, cmd)
-        for sess in self._db_engine.session.get_active_by_device_id(self._device_id):
-            self._db_engine.link.session_datapoint.add(sess.id, datapoint.id)
+        # The active sessions of the device record the datapoint by time interval, see
+        # :class:`growbies.db.models.membership.SessionDeviceInterval`.
+        self._db_engine.datapoint.insert(self._device_id, tare_id, datapoint, cmd)
 
     def _process_async(self, hdr: RespPacketHdr, resp: TDeviceResp | ErrorDeviceResp):
         if hdr.type == DeviceRespOp.ERROR:
@@ -227,11 +228,12 @@ class Worker(Thread):
             # Cleanup
             self._disconnect()
             logger.info('Device disconnected.')
-            self._db_engine.device.clear_connected(self._device.id)
-
-            # Reconnect
-            if not self._stop_event.is_set():
-                self._db_engine.device.set_error(self._device.id)
+            if self._stop_event.is_set():
+                self._db_engine.device.clear_connected(self._device.id)
+            else:
+                # Reconnect
+                self._db_engine.device.transition(self._device.id, set_=ConnectionState.ERROR,
+                                                  clear=ConnectionState.CONNECTED)
                 if not self._stop_event.wait(self._RECONNECT_RETRY_DELAY_SECONDS):
                     self._reconnect_attempt += 1
                     if self._do_report_reconnect():
@@ -0,0 +1,30 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import matplotlib.pyplot as plt
+
+from growbies.app.common.render import ImageFormat, Output, render
+from growbies.service.common import ServiceCmdError
+
+def _plot(name: str, output: Output):
+    if not name:
+        raise ValueError('No name.')
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [1, 0])
+    output.show(fig, name)
+
+class Test(TestCase):
+    def test_render(self):
+        with TemporaryDirectory() as directory:
+            output = Output(Path(directory) / 'out', ImageFormat.SVG)
+            names = ('a', 'b/c', 'd e')
+            for processes in (1, 2):
+                render([(_plot, (name, output)) for name in names], output, processes)
+                self.assertEqual(['a.svg', 'b_c.svg', 'd_e.svg'],
+                                 sorted(path.name for path in output.directory.iterdir()))
+
+            # The others are rendered, and then the failure raised.
+            with self.assertRaises(ServiceCmdError):
+                render([(_plot, ('', output)), (_plot, ('f', output))], output, 2)
+            self.assertTrue((output.directory / 'f.svg').exists())
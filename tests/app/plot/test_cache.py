@@ -0,0 +1,66 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import TestCase
+import uuid
+
+import numpy as np
+
+from growbies.app.plot.cache import PlotCache
+
+Row = namedtuple('Row', ('timestamp', 'mass', 'temperature', 'ref_mass'))
+SensorRow = namedtuple('SensorRow', ('timestamp', 'idx', 'mass', 'error', 'ref_mass'))
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+class _Engine:
+    """Datapoints a second apart, read from a list as the database would."""
+    def __init__(self):
+        self.rows = [Row(START + timedelta(seconds=sec), float(sec), 20.0, None)
+                     for sec in range(10)]
+        self.reads = list()
+        self.rewritten = False
+        self.datapoint = SimpleNamespace(get_device_datapoints=self.get_device_datapoints)
+        self.rewrite = SimpleNamespace(get_rewritten=lambda *args: (1, self.rewritten))
+
+    def get_device_datapoints(self, device_id, start_time, end_time):
+        self.reads.append(start_time)
+        rows = [row for row in self.rows if start_time <= row.timestamp <= end_time]
+        return rows, [SensorRow(row.timestamp, 0, row.mass, None, None) for row in rows], []
+
+class Test(TestCase):
+    def test_cache(self):
+        engine = _Engine()
+        device_id = uuid.uuid4()
+        with TemporaryDirectory() as directory:
+            cache = PlotCache(engine, directory)
+            end_time = START + timedelta(seconds=20)
+            datapoints, mass_sensors, temperature_sensors = cache.get(device_id, None, START,
+                                                                      end_time)
+            self.assertEqual(list(range(10)), datapoints['mass'].tolist())
+            self.assertEqual(10, len(mass_sensors['timestamp']))
+            self.assertEqual(dict(), temperature_sensors)
+
+            # Only what is past the high-water mark is read again.
+            engine.rows.append(Row(START + timedelta(seconds=10), 10.0, 20.0, 1.0))
+            datapoints, _, _ = cache.get(device_id, None, START + timedelta(seconds=5), end_time)
+            self.assertEqual(START + timedelta(seconds=9, microseconds=1), engine.reads[-1])
+            self.assertEqual(list(range(5, 11)), datapoints['mass'].tolist())
+            self.assertTrue(np.isnan(datapoints['ref_mass'][0]))
+
+            # The entry keeps what is cached before a later start.
+            datapoints, _, _ = cache.get(device_id, None, START, end_time)
+            self.assertEqual(START + timedelta(seconds=10, microseconds=1), engine.reads[-1])
+            self.assertEqual(list(range(11)), datapoints['mass'].tolist())
+
+            # Earlier than the entry, or rewritten since, is read anew.
+            cache.get(device_id, None, START - timedelta(seconds=1), end_time)
+            self.assertEqual(START - timedelta(seconds=1), engine.reads[-1])
+            engine.rewritten = True
+            cache.get(device_id, None, START + timedelta(seconds=1), end_time)
+            self.assertEqual(START + timedelta(seconds=1), engine.reads[-1])
+
+            # Evicted beyond the total size.
+            PlotCache(engine, directory, max_size=0).get(uuid.uuid4(), None, START, end_time)
+            self.assertEqual([], list(cache._directory.glob('*.npz')))
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+import numpy as np
+
+from growbies.app.plot.downsample import downsample, lttb, Method, min_max
+
+class Test(TestCase):
+    def setUp(self):
+        self.count = 10_000
+        self.x = np.datetime64('2026-01-01T00:00:00', 'ms') + np.arange(self.count) * 1000
+        self.y = np.sin(np.arange(self.count) / 100)
+        self.y[5000] = 10  # A spike
+
+    def test_lttb(self):
+        kept = lttb(self.x, self.y, 500)
+        self.assertEqual(500, len(kept))
+        self.assertEqual(0, kept[0])
+        self.assertEqual(self.count - 1, kept[-1])
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertIn(5000, kept)
+
+    def test_min_max(self):
+        kept = min_max(self.y, 500)
+        self.assertLessEqual(len(kept), 500)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertIn(5000, kept)
+        self.assertIn(int(np.argmin(self.y)), kept)
+
+    def test_downsample(self):
+        self.y[:10] = np.nan
+        for method in Method:
+            kept = downsample(method, self.x, self.y, 500)
+            self.assertTrue(np.all(np.isfinite(self.y[kept])))
+            if method == Method.NONE:
+                self.assertEqual(self.count - 10, len(kept))
+            else:
+                self.assertLessEqual(len(kept), 500)
+
+        # Within budget, all finite points are kept.
+        np.testing.assert_array_equal(np.arange(10, 100),
+                                      downsample(Method.LTTB, self.x[:100], self.y[:100], 500))
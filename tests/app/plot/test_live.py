@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+import numpy as np
+
+from growbies.app.plot.live import LiveBuffer
+
+def _times(start: int, stop: int) -> np.ndarray:
+    return np.datetime64('2026-01-01T00:00:00', 'us') + np.arange(start, stop) * 1_000_000
+
+class Test(TestCase):
+    def test_live_buffer(self):
+        buffer = LiveBuffer(4, _times(0, 2), np.arange(0, 2.0))
+        self.assertEqual([0, 1], buffer.values.tolist())
+
+        # The earliest are dropped beyond the capacity, within and across moves of the window.
+        for start in range(2, 20, 3):
+            buffer.append(_times(start, start + 3), np.arange(start, start + 3.0))
+            self.assertEqual(list(range(start - 1, start + 3)), buffer.values.tolist())
+            self.assertTrue(np.array_equal(_times(start - 1, start + 3), buffer.times))
+
+        buffer.append(_times(20, 30), np.arange(20, 30.0))
+        self.assertEqual([26, 27, 28, 29], buffer.values.tolist())
+
+        buffer.trim(_times(28, 29)[0])
+        self.assertEqual([28, 29], buffer.values.tolist())
+        buffer.append(_times(30, 31), np.arange(30, 31.0))
+        self.assertEqual([28, 29, 30], buffer.values.tolist())
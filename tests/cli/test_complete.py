@@ -0,0 +1,49 @@
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from growbies.cli.complete import autocomplete, make_parser, make_spec
+from growbies.cli.main import make_cli
+
+DEV_ID = '37d9b477-97c8-4cea-9f1a-6be448f35537'
+TAG_ID = 'bebff927-00f6-4b6b-aff1-f27476827e8e'
+
+def _read_id_index():
+    return {'device': [[DEV_ID, DEV_ID], ['48551d97-68e9-47b5-a9b1-bbc7d32be420', 'dev1']],
+            'tag': [[TAG_ID, 'mytag']]}
+
+class Test(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        parser, _ = make_cli()
+        cls.spec = make_spec(parser)
+
+    def _complete(self, line: str) -> dict[str, str]:
+        line = f'growbies {line}'
+        environ = {'_ARGCOMPLETE': '1', '_ARGCOMPLETE_IFS': '\n', '_ARGCOMPLETE_DFS': '\t',
+                   '_ARGCOMPLETE_SUPPRESS_SPACE': '1', 'COMP_LINE': line,
+                   'COMP_POINT': str(len(line))}
+        output = StringIO()
+        with (patch.dict('os.environ', environ),
+              patch('growbies.cli.complete.get_spec', return_value=self.spec),
+              patch('growbies.cli.complete._read_id_index', _read_id_index),
+              # Debug output goes to file descriptor 9, which pytest may have open.
+              patch('argcomplete.CompletionFinder._init_debug_stream')):
+            autocomplete(output, exit_method=lambda _: None)
+        return dict(completion.split('\t') for completion in output.getvalue().splitlines())
+
+    def test_cmds_and_options(self):
+        self.assertEqual(['device'], list(self._complete('de')))
+        self.assertIn('ls', self._complete('device '))
+        self.assertEqual(['--pcba'], list(self._complete('nvm id x --pc')))
+
+    def test_fuzzy_id(self):
+        # Options are completed along with positionals, as argcomplete does.
+        self.assertEqual({'37d9b47': '', 'dev1': '48551d9'},
+                         {name: help_ for name, help_ in self._complete('device ls ').items()
+                          if not name.startswith('-')})
+        self.assertEqual({'dev1': '48551d9'}, self._complete('nvm id d'))
+        self.assertEqual({'mytag': 'bebff92'}, self._complete('session add sess --tag '))
+        self.assertEqual({DEV_ID: ''}, self._complete(f'read {DEV_ID[:10]}'))
+        self.assertEqual([], [name for name in self._complete('user ls ')
+                              if not name.startswith('-')])
@@ -0,0 +1,77 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+import re
+import subprocess
+import sys
+
+# Packages that are slow to import, which the CLI must not import to start or to complete.
+HEAVY_PACKAGES = ('matplotlib', 'numpy', 'pyarrow', 'sqlalchemy', 'sqlmodel')
+RUNS = 3
+
+_REPO_ROOT = Path(__file__).parent.parent.parent
+_IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def _import_times(*args: str, env: dict = None) -> list[tuple[str, int, int]]:
+    """Return the name, cumulative import time in microseconds and depth of each import."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=_REPO_ROOT, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding='utf-8')
+    times = list()
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_TIME_RE.match(line)
+        if match:
+            times.append((match.group(4), int(match.group(2)), len(match.group(3))))
+    return times
+
+def _imported_packages(*args: str, env: dict = None) -> set[str]:
+    """Return the top level packages of every module imported."""
+    return {name.split('.')[0] for name, _, _ in _import_times(*args, env=env)}
+
+def _cli_import_time_us(*args: str, env: dict = None) -> int:
+    """Return the least, over a few runs, of the import time of the CLI."""
+    startup = {name for name, _, depth in _import_times('-c', 'pass', env=env) if depth == 1}
+    totals = list()
+    for _ in range(RUNS):
+        totals.append(sum(us for name, us, depth in _import_times('-m', 'growbies', *args, env=env)
+                          if depth == 1 and name not in startup))
+    return min(totals)
+
+def _make_completion_env(tmp_dir: str, comp_line: str) -> dict:
+    return dict(os.environ,
+                XDG_CACHE_HOME=tmp_dir,
+                COMP_LINE=comp_line,
+                COMP_POINT=str(len(comp_line)),
+                _ARGCOMPLETE='1',
+                _ARGCOMPLETE_IFS='\n',
+                _ARGCOMPLETE_STDOUT_FILENAME=os.path.join(tmp_dir, 'completions'))
+
+class Test(TestCase):
+    def test_imports(self):
+        imported = _imported_packages('-m', 'growbies')
+        for package in HEAVY_PACKAGES:
+            self.assertNotIn(package, imported, f'"python -m growbies" imported {package}.')
+
+    def test_completion_imports(self):
+        with TemporaryDirectory() as tmp_dir:
+            comp_line = 'growbies nvm id x --pc'
+            env = _make_completion_env(tmp_dir, comp_line)
+            # The first completion builds the cache.
+            _import_times('-m', 'growbies', env=env)
+
+            imported = _imported_packages('-m', 'growbies', env=env)
+            with open(env['_ARGCOMPLETE_STDOUT_FILENAME']) as file:
+                self.assertEqual('--pcba ', file.read())
+
+        for package in HEAVY_PACKAGES:
+            self.assertNotIn(package, imported,
+                             f'Tab completion of "{comp_line}" imported {package}.')
+
+if __name__ == '__main__':
+    # A manual benchmark of the import time, which varies too much by machine to test.
+    print(f'"python -m growbies": {_cli_import_time_us()} us')
+    with TemporaryDirectory() as _tmp_dir:
+        _comp_line = 'growbies nvm id x --pc'
+        _env = _make_completion_env(_tmp_dir, _comp_line)
+        _import_times('-m', 'growbies', env=_env)
+        print(f'Tab completion of "{_comp_line}": {_cli_import_time_us(env=_env)} us')
@@ -0,0 +1,39 @@
+from unittest import TestCase
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from growbies.db.models.account import Account, Accounts
+from growbies.db.models.datapoint import DataPoints
+from growbies.db.models.gateway import Gateway, Gateways
+from growbies.db.models.tag import TagEngine
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+
+class Test(TestCase):
+    def test_fuzzy_lookup_stmts(self):
+        engine = TagEngine.__new__(TagEngine)
+
+        id_ = uuid4()
+        exact = [_sql(stmt) for stmt in engine._make_exact_stmts(str(id_).upper())]
+        self.assertEqual(2, len(exact))
+        self.assertIn(f"tag.id = '{id_}'", exact[0])
+        self.assertIn(f"tag.name = '{str(id_).upper()}'", exact[1])
+
+        exact = [_sql(stmt) for stmt in engine._make_exact_stmts('my_tag')]
+        self.assertEqual(1, len(exact))
+
+        # Wildcards are escaped. The ID text is lower case.
+        fuzzy = engine._make_get_stmt('AB_%').compile(dialect=postgresql.dialect())
+        self.assertIn('CAST(tag.id AS TEXT) LIKE', str(fuzzy))
+        self.assertEqual({'%AB\\_\\%%', 'ab\\_\\%%'}, set(fuzzy.params.values()))
+
+    def test_sorted_table_str(self):
+        # Every table renders, as the service would send it.
+        tables = (Accounts([Account(name='b'), Account(name='a')]),
+                  Gateways([Gateway(name='gateway')]),
+                  DataPoints())
+        for table in tables:
+            self.assertIn(table.table_name(), str(table))
+        self.assertLess(str(tables[0]).index(' a '), str(tables[0]).index(' b '))
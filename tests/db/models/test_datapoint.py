@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Optional
+from unittest import TestCase
+
+import numpy as np
+
+from growbies.db.models.datapoint import DataPoint, DataPointColumns
+
+def _row(second: int, sensor_mass: Optional[list], ref_mass=None):
+    # A datapoint without sensor readings aggregates to NULL arrays.
+    count = len(sensor_mass) if sensor_mass else 0
+    return SimpleNamespace(
+        timestamp=datetime(2026, 1, 1, 0, 0, second, tzinfo=timezone.utc),
+        mass=float(second), temperature=20.0, ref_mass=ref_mass,
+        sensor_mass=sensor_mass, sensor_ref_mass=[ref_mass] * count or None,
+        sensor_mass_error=[None] * count or None,
+        sensor_temperature=[21.0], sensor_temperature_error=[0], tare=[0.0, float(second)])
+
+class Test(TestCase):
+    def test_from_rows(self):
+        columns = DataPointColumns.from_rows([_row(0, [1.0, 2.0], ref_mass=5.0),
+                                              _row(1, [3.0]),
+                                              _row(2, None)])
+        self.assertEqual(3, len(columns))
+        self.assertEqual(2, columns.mass_sensor_count)
+        self.assertEqual(1, columns.temperature_sensor_count)
+        self.assertEqual(np.datetime64('2026-01-01T00:00:01', 'ms'), columns.timestamp[1])
+
+        # Missing values are NaN.
+        np.testing.assert_array_equal([5.0, np.nan, np.nan], columns.ref_mass)
+        np.testing.assert_array_equal([[1.0, 2.0], [3.0, np.nan], [np.nan, np.nan]],
+                                      columns.sensor_mass)
+        self.assertTrue(np.isnan(columns.sensor_mass_error).all())
+        np.testing.assert_array_equal([0.0, 1.0, 2.0], columns.tare[:, 1])
+
+    def test_from_no_rows(self):
+        columns = DataPointColumns.from_rows([])
+        self.assertEqual(0, len(columns))
+        self.assertEqual((0, 0), columns.sensor_mass.shape)
+
+    def test_expand_sensor_arrays(self):
+        datapoint = DataPoint(timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc), mass=3.0,
+                              temperature=20.0, sensor_mass=[1.0, 2.0], sensor_mass_error=[None, 1],
+                              sensor_ref_mass=[5.0], sensor_temperature=[21.0],
+                              sensor_temperature_error=[0])
+        datapoint.expand_sensor_arrays()
+
+        self.assertEqual([0, 1], [sensor.idx for sensor in datapoint.mass_sensors])
+        self.assertEqual([1.0, 2.0], [sensor.mass for sensor in datapoint.mass_sensors])
+        self.assertEqual([None, 1], [sensor.error for sensor in datapoint.mass_sensors])
+        # Shorter arrays pad with None.
+        self.assertEqual([5.0, None], [sensor.ref_mass for sensor in datapoint.mass_sensors])
+        self.assertEqual([21.0], [sensor.temperature for sensor in datapoint.temperature_sensors])
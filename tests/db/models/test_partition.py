@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from growbies.db.models.partition import PartitionEngine, month_start, partition_name
+
+class Test(TestCase):
+    def test_month_start(self):
+        dt = datetime(2026, 12, 31, 23, 59, tzinfo=timezone.utc)
+        self.assertEqual(datetime(2026, 12, 1, tzinfo=timezone.utc), month_start(dt))
+        # Across years.
+        self.assertEqual(datetime(2027, 1, 1, tzinfo=timezone.utc), month_start(dt, 1))
+        self.assertEqual(datetime(2025, 12, 1, tzinfo=timezone.utc), month_start(dt, -12))
+        # In UTC.
+        local = datetime(2027, 1, 1, 1, tzinfo=timezone(timedelta(hours=2)))
+        self.assertEqual(datetime(2026, 12, 1, tzinfo=timezone.utc), month_start(local))
+
+    def test_partition_name(self):
+        self.assertEqual('datapoint_y2026m03',
+                         partition_name('datapoint', datetime(2026, 3, 1, tzinfo=timezone.utc)))
+
+    def test_init_unpartitioned(self):
+        # A database made before partitioning is left to "python -m growbies.db partition", and no
+        # partitions are made in it.
+        partition = PartitionEngine(MagicMock())
+        with patch.object(PartitionEngine, 'is_partitioned', new_callable=PropertyMock,
+                          return_value=False), \
+                patch.object(partition, 'migrate') as migrate, \
+                patch.object(partition, '_create') as create:
+            partition.init()
+            partition.ensure(datetime.now(timezone.utc))
+        migrate.assert_not_called()
+        create.assert_not_called()
+
+    def test_init_partitioned(self):
+        partition = PartitionEngine(MagicMock())
+        with patch.object(PartitionEngine, 'is_partitioned', new_callable=PropertyMock,
+                          return_value=True), \
+                patch.object(partition, 'migrate') as migrate, \
+                patch.object(partition, 'ensure'):
+            partition.init()
+        migrate.assert_not_called()
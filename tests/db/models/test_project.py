@@ -0,0 +1,20 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from sqlalchemy import literal
+from sqlalchemy.dialects import postgresql
+
+from growbies.db.models.project import Project, ProjectEngine
+
+class Test(TestCase):
+    def test_upsert_updated_at(self):
+        # The upsert bypasses the "before_update" event, so it sets "updated_at" itself, when the
+        # fields change.
+        engine = ProjectEngine(MagicMock())
+        set_ = engine._make_upsert_set({Project.Key.NAME: literal('name')})
+        self.assertIn(Project.Key.UPDATED_AT, set_)
+        sql = str(set_[Project.Key.UPDATED_AT].compile(dialect=postgresql.dialect()))
+        self.assertIn('IS DISTINCT FROM', sql)
+
+        # Nothing is updated, if no fields are.
+        self.assertEqual(dict(), engine._make_upsert_set(dict()))
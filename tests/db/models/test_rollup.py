@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from growbies.db.models.rollup import _MERGE_INSERTED_SQL, Resolution, RollupEngine
+
+class Test(TestCase):
+    def test_select(self):
+        end = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        # The coarsest resolution with enough points.
+        self.assertEqual(Resolution.DAY, Resolution.select(end - timedelta(days=3000), end))
+        self.assertEqual(Resolution.HOUR, Resolution.select(end - timedelta(days=90), end))
+        self.assertEqual(Resolution.MINUTE, Resolution.select(end - timedelta(days=7), end))
+        self.assertIsNone(Resolution.select(end - timedelta(hours=1), end))
+
+        self.assertEqual(Resolution.HOUR,
+                         Resolution.select(end - timedelta(days=7), end, min_points=100))
+
+    def test_merge_inserted_sql(self):
+        # One statement merges the bound values of an inserted datapoint into every rollup table,
+        # without reading the datapoint back.
+        sql = str(_MERGE_INSERTED_SQL)
+        for table in RollupEngine._ROLLUP_TABLES:
+            self.assertEqual(1, sql.count(f'INSERT INTO {table} '))
+        self.assertNotIn('FROM datapoint ', sql)
+        self.assertEqual({'device_id', 'timestamp', 'mass', 'temperature', 'sensor_mass',
+                          'sensor_temperature'}, set(_MERGE_INSERTED_SQL.compile().params))
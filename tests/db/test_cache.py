@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+from unittest import TestCase
+from uuid import uuid4
+
+from growbies.db.cache import EntityCache
+
+class Test(TestCase):
+    def test_cache(self):
+        cache = EntityCache(related={'device': ('session',)})
+        dev = SimpleNamespace(id=uuid4(), name='dev')
+        sess = SimpleNamespace(id=uuid4(), name='sess')
+
+        # Disabled until enabled.
+        cache.put('device', 'de', dev)
+        self.assertIsNone(cache.get('device', 'de'))
+        cache.enable()
+
+        cache.put('device', 'de', dev)
+        cache.put('session', 'sess', sess)
+        for key in ('de', 'dev', str(dev.id)):
+            self.assertIs(dev, cache.get('device', key))
+        self.assertIsNone(cache.get('device', 'other'))
+        self.assertEqual({'device': (3, 1)}, cache.stats())
+
+        # Writing a device drops it, and the sessions that may embed it.
+        cache.invalidate('device', dev.id)
+        self.assertIsNone(cache.get('device', 'dev'))
+        self.assertIsNone(cache.get('session', 'sess'))
+
+        # Unless only the record itself is stale, such as by a new link.
+        cache.put('device', 'dev', dev)
+        cache.put('session', 'sess', sess)
+        cache.invalidate('device', dev.id, related=False)
+        self.assertIs(sess, cache.get('session', 'sess'))
+
+        # Renaming a record drops the lookup keys, which could otherwise resolve to another record.
+        cache.put('device', 'dev', dev)
+        cache.invalidate('device', dev.id, keys=True)
+        other = SimpleNamespace(id=uuid4(), name='dev')
+        cache.put('device', 'dev', other)
+        self.assertIs(other, cache.get('device', 'dev'))
+
+        # Derived values are updated in place, and only of cached records.
+        cache.put('session', 'sess', sess)
+        cache.update('session', sess.id, datapoint_count=3)
+        cache.update('session', uuid4(), datapoint_count=4)
+        self.assertEqual(3, cache.get('session', 'sess').datapoint_count)
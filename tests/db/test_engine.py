@@ -0,0 +1,14 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlmodel import create_engine
+
+from growbies.db.engine import DBEngine
+
+class Test(TestCase):
+    def test_init_side_effect_free(self):
+        # Any connection to this database fails, so making an engine must not connect.
+        unreachable = create_engine('postgresql+psycopg2://nobody@/nothing?host=/nonexistent')
+        with patch.object(DBEngine, '_create_engine', return_value=unreachable):
+            engine = DBEngine()
+        self.assertIsNotNone(engine.datapoint)
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import TestCase
+import uuid
+
+from growbies.db.export import make_record_batch, make_schema
+
+def _row(second: int, sensor_mass: list, sensor_mass_error=None):
+    return SimpleNamespace(
+        timestamp=datetime(2026, 1, 1, 0, 0, second, tzinfo=timezone.utc),
+        device_id=uuid.UUID(int=1), mass=float(second), temperature=20.0, ref_mass=None,
+        sensor_mass=sensor_mass, sensor_ref_mass=None, sensor_mass_error=sensor_mass_error,
+        sensor_temperature=[21.0], sensor_temperature_error=[0], tare=[0.0, float(second)])
+
+class Test(TestCase):
+    def test_make_schema(self):
+        schema = make_schema(2, 1)
+        self.assertEqual(['timestamp', 'device_id', 'mass', 'temperature', 'ref_mass',
+                          'sensor_mass_0', 'sensor_ref_mass_0', 'sensor_mass_error_0',
+                          'sensor_mass_1', 'sensor_ref_mass_1', 'sensor_mass_error_1',
+                          'sensor_temperature_0', 'sensor_temperature_error_0', 'tare'],
+                         schema.names)
+
+    def test_make_record_batch(self):
+        batch = make_record_batch([_row(0, [1.0, 2.0], [None, 3]), _row(1, [4.0]), _row(2, None)],
+                                  make_schema(2, 1))
+        self.assertEqual(3, batch.num_rows)
+        self.assertEqual(str(uuid.UUID(int=1)), batch.column('device_id')[0].as_py())
+        # Readings missing from shorter sensor arrays are null.
+        self.assertEqual([2.0, None, None], batch.column('sensor_mass_1').to_pylist())
+        self.assertEqual([3, None, None], batch.column('sensor_mass_error_1').to_pylist())
+        self.assertEqual([None] * 3, batch.column('sensor_ref_mass_0').to_pylist())
+        self.assertEqual([0.0, 1.0], batch.column('tare')[1].as_py())
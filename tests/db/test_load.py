@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+import pyarrow as pa
+
+from growbies.db.export import make_record_batch, make_schema
+from growbies.db.load import _to_csv
+from tests.db.test_export import _row
+
+class Test(TestCase):
+    def test_to_csv(self):
+        batch = make_record_batch([_row(0, [1.0, 2.0], [None, 3]), _row(1, None)],
+                                  make_schema(2, 0))
+        batch = batch.select(['mass', 'sensor_mass_1', 'sensor_mass_error_1', 'tare'])
+        lines = _to_csv(batch).decode().splitlines()
+        # Nulls are empty, and lists are PostgreSQL arrays.
+        self.assertEqual(['0,2,3,"{0,0}"', '1,,,"{0,1}"'], lines)
+
+    def test_to_csv_empty_list(self):
+        batch = pa.RecordBatch.from_arrays([pa.array([[], None], type=pa.list_(pa.float64()))],
+                                           names=['tare'])
+        self.assertEqual(['"{}"', ''], _to_csv(batch).decode().splitlines())
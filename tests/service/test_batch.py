@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from growbies.service.common import BatchServiceCmd, ServiceCmd, ServiceCmdError
+from growbies.service.service import Service
+
+class Test(TestCase):
+    def test_batch(self):
+        cmds = [ServiceCmd(op='unknown0', kw={}), ServiceCmd(op='unknown1', kw={})]
+
+        resps = Service._execute_batch(BatchServiceCmd(cmds))
+        self.assertEqual(2, len(resps))
+        for cmd, resp in zip(cmds, resps):
+            self.assertIsInstance(resp, ServiceCmdError)
+            self.assertIn(cmd.op, str(resp))
+
+        resps = Service._execute_batch(BatchServiceCmd(cmds, stop_on_error=True))
+        self.assertEqual(1, len(resps))
+        self.assertIn(cmds[0].op, str(resps[0]))
@@ -0,0 +1,49 @@
+from io import StringIO
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+import uuid
+
+from growbies.cli.common import IMPORT, Param
+from growbies.cli.device import Action, ImportParam
+from growbies.service.client import Client, Shell
+from growbies.service.common import ServiceCmd, ServiceOp
+
+class _EchoClient:
+    def __init__(self):
+        self.lines = list()
+
+    def exec_line(self, line, stdout, **_):
+        self.lines.append(line)
+        stdout.write(f'{line}\n')
+        return len(self.lines) - 1
+
+class Test(TestCase):
+    def test_shell_line_protocol(self):
+        client = _EchoClient()
+        stdin = StringIO('device ls\n\n# comment\n  tag ls\nexit\nuser ls\n')
+        stdout = StringIO()
+
+        self.assertEqual(0, Shell(client, line_protocol=True).run(stdin, stdout))
+
+        self.assertEqual(['device ls', 'tag ls'], client.lines)
+        self.assertEqual(f'device ls\n{Shell.END_OF_RESP}0\ntag ls\n{Shell.END_OF_RESP}1\n',
+                         stdout.getvalue())
+
+    def test_import_recount(self):
+        # The import runs here, and the service, which caches the counts, recounts after.
+        device_id = uuid.uuid4()
+        engine = MagicMock()
+        engine.device.get.return_value = SimpleNamespace(id=device_id)
+        client = Client(parser=MagicMock())
+        cmd = ServiceCmd(ServiceOp.DEVICE, {Param.ACTION: IMPORT, Param.FUZZY_ID: 'dev',
+                                            ImportParam.PATH: 'dp.csv'})
+        with patch('growbies.service.cmd.load.get_db_engine', return_value=engine), \
+                patch('growbies.db.load.load_datapoints', return_value=(3, 2)), \
+                patch.object(client, 'run') as run:
+            self.assertEqual(0, client.exec_cmd(cmd, stdout=StringIO(), stderr=StringIO()))
+
+        recount, = run.call_args.args
+        self.assertEqual({Param.ACTION: Action.RECOUNT, Param.FUZZY_ID: str(device_id)},
+                         recount.kw)
+        engine.counter.reconcile_device.assert_not_called()
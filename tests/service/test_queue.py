@@ -0,0 +1,53 @@
+from threading import Thread
+from unittest import TestCase
+
+from growbies.service.queue import RespQueue
+from growbies.service.resp import TableResp, TableRowsResp
+
+class Test(TestCase):
+    def test_resp_queue(self):
+        exp = ['first', {'second': 2}, None]
+
+        def serve(qid):
+            with RespQueue(qid) as resp_q:
+                for item in exp:
+                    resp_q.put(item)
+
+        with RespQueue() as resp_q:
+            thread = Thread(target=serve, args=(resp_q.qid,))
+            thread.start()
+            obs = list(resp_q.get_w_timeout(timeout=5))
+            thread.join()
+
+        self.assertEqual(exp, obs)
+
+    def test_resp_queue_timeout(self):
+        with RespQueue() as resp_q:
+            self.assertEqual([], list(resp_q.get_w_timeout(timeout=0.01)))
+
+    def test_resp_queue_table_chunks(self):
+        rows = [[idx, f'name{idx}'] for idx in range(10)]
+        exp = TableResp('Title', ['id', 'name'], align='l', rows=list(rows))
+
+        def serve(qid):
+            with RespQueue(qid) as resp_q:
+                resp_q.put(TableResp('Title', ['id', 'name'], align='l'))
+                for start in range(0, len(rows), 3):
+                    resp_q.put(TableRowsResp(rows[start:start + 3]))
+
+        with RespQueue() as resp_q:
+            thread = Thread(target=serve, args=(resp_q.qid,))
+            thread.start()
+            obs = resp_q.get_resp(timeout=5)
+            thread.join()
+
+        self.assertEqual(rows, obs.rows)
+        self.assertEqual(str(exp), str(obs))
+
+    def test_resp_queue_stalled_client(self):
+        # The client is connected but never reads, so the send fails rather than blocking.
+        with RespQueue() as resp_q:
+            with RespQueue(resp_q.qid) as service_q:
+                service_q.SEND_TIMEOUT_SEC = 0.1
+                with self.assertRaises(OSError):
+                    service_q.put(bytes(16 * 1024 * 1024))